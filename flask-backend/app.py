@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import logging
 import os
@@ -8,13 +8,21 @@ from datetime import datetime
 import traceback
 
 # Import our custom modules
-from models.model_loader import ModelLoader
+from models.model_registry import ModelRegistry
 from utils.preprocessing import preprocessor
-from utils.validation import validate_prediction_input, PredictionValidationError
+from utils.validation import validate_prediction_input, validate_sweep_dimensions, PredictionValidationError
+from utils.prediction_cache import PredictionCache, prediction_cache_key
+from utils.market_index import MarketIndexes
+from models.neighbor_index import NeighborIndex
+from models.partial_dependence import PartialDependenceStore, build_partial_dependence
+from utils.prediction_factors import PredictionFactorExplainer
+from utils.micro_batcher import MicroBatcher
+from utils.shadow_scorer import ShadowScorer
+from utils.metrics import metrics
 from config import config
 
 # Import analytics blueprint
-from routes.analytics import analytics_bp
+from routes.analytics import analytics_bp, enable_response_cache, get_analytics_processor as get_market_analytics_processor
 
 try:
     from utils.analytics_processor import get_analytics_processor
@@ -50,33 +58,264 @@ def create_app(config_name='default'):
     # Register blueprints
     app.register_blueprint(analytics_bp)
     
-    # Initialize the model loader with config
-    model_loader = ModelLoader(config=app.config)
+    # Per-input intervals from the spread of the forest's trees (falls back to +/- MAE)
+    interval_quantiles = tuple(app.config.get('PREDICTION_INTERVAL_QUANTILES', (0.1, 0.5, 0.9)))
+    
+    pd_parameters = {
+        'sample_size': app.config.get('PARTIAL_DEPENDENCE_SAMPLE_SIZE', 500),
+        'grid_resolution': app.config.get('PARTIAL_DEPENDENCE_GRID_RESOLUTION', 20),
+        'ice_rows': app.config.get('PARTIAL_DEPENDENCE_ICE_ROWS', 50),
+        'seed': app.config.get('PARTIAL_DEPENDENCE_SEED', 0)
+    }
+    
+    def prepare_model(model):
+        """Serving state of a freshly loaded model version, built before it is activated"""
+        loader = model.loader
+        
+        # Agree on the feature schema once; the request path then only compares fingerprints
+        feature_schema = preprocessor.schema_fingerprint(loader.input_dtype)
+        if loader.is_loaded and not loader.accepts_schema(feature_schema):
+            raise ValueError("Preprocessor feature schema does not match the model's feature names")
+        
+        state = {
+            'feature_schema': feature_schema,
+            'tree_intervals': (app.config.get('PREDICTION_INTERVAL_MODE', 'trees') == 'trees'
+                               and loader.is_loaded and loader.supports_tree_quantiles),
+            # Opt-in anytime evaluation: stop adding trees once the estimate is stable or the budget is spent
+            'anytime': (app.config.get('ANYTIME_EVALUATION_ENABLED', False)
+                        and loader.is_loaded and loader.supports_tree_quantiles),
+            'factor_explainer': None,
+            'micro_batcher': None,
+            'partial_dependence': None
+        }
+        
+        # Prediction factors from each tree's decision path (falls back to fixed heuristics)
+        if (app.config.get('PREDICTION_FACTORS_METHOD', 'contributions') == 'contributions'
+                and loader.is_loaded and loader.supports_contributions):
+            state['factor_explainer'] = PredictionFactorExplainer(
+                loader.feature_names, preprocessor, top_n=app.config.get('PREDICTION_FACTORS_TOP_N', 4)
+            )
+        
+        # Opt-in coalescing of concurrent single predictions into one model call; one
+        # dispatcher per version, so queued rows are scored by the version they were queued for
+        if app.config.get('MICRO_BATCHING_ENABLED', False):
+            state['micro_batcher'] = MicroBatcher(
+                lambda features: predict_each(model, features),
+                max_batch_size=app.config.get('MICRO_BATCH_MAX_SIZE', 32),
+                max_wait_ms=app.config.get('MICRO_BATCH_WINDOW_MS', 2.0)
+            )
+        
+        # Partial dependence curves per feature, computed once per model in the background
+        if app.config.get('PARTIAL_DEPENDENCE_ENABLED', True) and loader.is_loaded:
+            partial_dependence = PartialDependenceStore(app.config['PARTIAL_DEPENDENCE_DIR'],
+                                                        loader.model_hash, pd_parameters)
+            if not partial_dependence.load():
+                partial_dependence.compute_async(lambda: build_partial_dependence(
+                    loader, app.config['NEIGHBORS_FEATURES_PATH'], **pd_parameters
+                ))
+            state['partial_dependence'] = partial_dependence
+        
+        return state
+    
+    def warm_model(model):
+        """Score sample inputs through the serving path; raises if the model cannot serve them"""
+        inputs = [dict(WARMUP_INPUT, experienceLevel=level, companySize=size)
+                  for level in preprocessor.experience_level_mapping
+                  for size in preprocessor.company_size_mapping]
+        features = preprocessor.preprocess_batch(inputs, dtype=model.loader.input_dtype)
+        predict_rows(model, features[:1])
+        predictions, _, _ = predict_rows(model, features)
+        explain_rows(model, inputs, features)
+        if not np.all(np.isfinite(predictions)) or np.any(predictions <= 0):
+            raise ValueError("Warmup predictions are not positive, finite salaries")
+    
+    def retire_model(model):
+        """Stop a replaced version's dispatcher once its queued rows are scored"""
+        if model.state.get('micro_batcher') is not None:
+            model.state['micro_batcher'].close()
+    
+    def predict_rows(model, features):
+        """Predictions for a feature matrix, per-row quantiles in tree-interval mode, and the trees used"""
+        loader, state = model.loader, model.state
+        if state['anytime']:
+            return loader.predict_anytime(
+                features,
+                budget_ms=app.config.get('ANYTIME_BUDGET_MS'),
+                tolerance=app.config.get('ANYTIME_TOLERANCE'),
+                quantiles=interval_quantiles if state['tree_intervals'] else None,
+                schema=state['feature_schema']
+            )
+        if state['tree_intervals']:
+            predictions, spreads = loader.predict_distribution(features, interval_quantiles,
+                                                               schema=state['feature_schema'])
+            return predictions, spreads, loader.n_trees
+        return loader.predict_batch(features, schema=state['feature_schema']), None, loader.n_trees
+    
+    def explain_rows(model, inputs, features, predictions=None):
+        """
+        (factors, baseline) per row from one vectorized contributions pass
+        
+        Without an explainer, rows get the heuristic factors for their predictions
+        (or None when no predictions are given) and no baseline.
+        """
+        factor_explainer = model.state['factor_explainer']
+        if factor_explainer is None:
+            if predictions is None:
+                return [(None, None)] * len(inputs)
+            return [(generate_prediction_factors(input_data, features[row:row + 1],
+                                                 int(np.round(predictions[row] / 1000) * 1000)), None)
+                    for row, input_data in enumerate(inputs)]
+        bias, contributions = model.loader.explain(features)
+        grouped = factor_explainer.group(contributions)
+        return [(factor_explainer.factors(input_data, grouped[row]), float(bias[row]))
+                for row, input_data in enumerate(inputs)]
+    
+    def predict_each(model, features):
+        """(prediction, quantiles, trees used) per row, the shape the micro-batcher hands back to callers"""
+        predictions, spreads, trees_used = predict_rows(model, features)
+        return [(prediction, None if spreads is None else spreads[row], trees_used)
+                for row, prediction in enumerate(predictions)]
+    
+    # Versioned model registry: changed artifacts are loaded, validated and warmed in
+    # the background, then swapped in atomically; requests keep the version they started on
+    model_registry = ModelRegistry(app.config, prepare=prepare_model, warmup=warm_model, retire=retire_model)
     
     # Load model on startup
     print(" Attempting to load model...")
-    if not model_loader.load_model():
+    initial_model = model_registry.load_initial()
+    if not initial_model.loader.is_loaded:
         logger.error("Failed to load model on startup")
         print("Model loading failed - check file paths and model files")
     else:
         print("Model loaded successfully!")
         # Print model info
-        model_info = model_loader.get_model_info()
+        model_info = initial_model.loader.get_model_info()
+        print(f"   Model Version: {initial_model.version}")
         print(f"   Model Type: {model_info.get('model_type')}")
         print(f"   Features: {model_info.get('feature_count')}")
         print(f"   Has Scaler: {model_info.get('has_scaler')}")
     
+    # Optional shadow model, scored against live traffic in the background and never served
+    shadow_scorer = None
+    shadow_model = model_registry.load_shadow()
+    if shadow_model is not None:
+        shadow_scorer = ShadowScorer(
+            lambda features: shadow_model.loader.predict_batch(
+                features, schema=preprocessor.schema_fingerprint(features.dtype)
+            ),
+            shadow_version=shadow_model.version,
+            max_queue=app.config.get('SHADOW_QUEUE_SIZE', 1024),
+            max_batch_size=app.config.get('SHADOW_BATCH_SIZE', 64),
+            recent=app.config.get('SHADOW_RECENT_PAIRS', 20)
+        )
+    
+    # Load the analytics dataset now rather than on the first analytics request
+    if app.config.get('PRELOAD_ANALYTICS', True):
+        try:
+            get_market_analytics_processor()
+        except Exception as e:
+            logger.warning(f"Analytics preload failed (will retry on first request): {str(e)}")
+    
+    # Precomputed dashboard aggregates; built before forking when the data is preloaded
+    if app.config.get('ANALYTICS_CUBE_ENABLED', True):
+        try:
+            get_market_analytics_processor().enable_cube(
+                max_rows=app.config.get('ANALYTICS_CUBE_MAX_ROWS', 2000000),
+                background=app.config.get('ANALYTICS_CUBE_BACKGROUND', False)
+            )
+        except Exception as e:
+            logger.warning(f"Analytics cube unavailable: {str(e)}")
+    
+    # Reproducible analytics responses, cached serialized and revalidated with ETags
+    analytics_response_cache = None
+    if app.config.get('ANALYTICS_DETERMINISTIC', True):
+        try:
+            get_market_analytics_processor().noise_seed = app.config.get('ANALYTICS_NOISE_SEED', 0)
+            if app.config.get('ANALYTICS_RESPONSE_CACHE_ENABLED', True):
+                analytics_response_cache = enable_response_cache(
+                    max_bytes=app.config.get('ANALYTICS_RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024),
+                    max_age=app.config.get('ANALYTICS_RESPONSE_MAX_AGE', 300)
+                )
+        except Exception as e:
+            logger.warning(f"Analytics response cache unavailable: {str(e)}")
+    
+    # Per-segment posting counts and salary distributions (similarJobs, marketPosition),
+    # rebuilt whenever the analytics dataset is reloaded
+    market_indexes = MarketIndexes(get_market_analytics_processor, preprocessor)
+    market_indexes.get()
+    
+    # Nearest real postings in the engineered feature space (/api/predict/neighbors)
+    neighbor_index = None
+    if app.config.get('NEIGHBORS_ENABLED', True):
+        try:
+            neighbor_index = NeighborIndex.from_files(
+                app.config['NEIGHBORS_FEATURES_PATH'],
+                app.config['NEIGHBORS_TARGET_PATH'],
+                preprocessor.expected_features,
+                postings_path=app.config.get('NEIGHBORS_POSTINGS_PATH'),
+                excluded_features=app.config.get('NEIGHBORS_EXCLUDED_FEATURES', ()),
+                leaf_size=app.config.get('NEIGHBORS_LEAF_SIZE', 40)
+            )
+        except Exception as e:
+            logger.warning(f"Neighbor index unavailable: {str(e)}")
+    
+    def neighbor_count(value):
+        """Requested k, capped at NEIGHBORS_MAX_K; None unless it is a positive integer"""
+        try:
+            k = int(value)
+        except (TypeError, ValueError):
+            return None
+        return min(k, app.config.get('NEIGHBORS_MAX_K', 50)) if k > 0 else None
+    
+    # Cache of model outputs for repeated inputs
+    prediction_cache = None
+    if app.config.get('PREDICTION_CACHE_ENABLED', True):
+        prediction_cache = PredictionCache(
+            max_size=app.config.get('PREDICTION_CACHE_SIZE', 4096),
+            ttl_seconds=app.config.get('PREDICTION_CACHE_TTL', 3600)
+        )
+    
+    # Request timings for every endpoint, including the analytics blueprint
+    metrics.enabled = app.config.get('METRICS_ENABLED', True)
+    if prediction_cache is not None:
+        metrics.register_gauges('prediction_cache', 'Prediction cache counters', prediction_cache.get_stats)
+    if app.config.get('MICRO_BATCHING_ENABLED', False):
+        metrics.register_gauges('micro_batching', 'Micro-batching counters',
+                                lambda: model_registry.active.state['micro_batcher'].get_stats())
+    if shadow_scorer is not None:
+        metrics.register_gauges('shadow_scoring', 'Shadow scoring counters', shadow_scorer.get_stats)
+    if analytics_response_cache is not None:
+        metrics.register_gauges('analytics_response_cache', 'Analytics response cache counters',
+                                analytics_response_cache.get_stats)
+    
+    @app.before_request
+    def start_request_timer():
+        rule = request.url_rule
+        metrics.begin_request(rule.rule if rule is not None else 'unmatched')
+        # Each worker process polls for new model artifacts on its own thread
+        model_registry.ensure_watcher()
+    
+    @app.after_request
+    def record_request_metrics(response):
+        metrics.end_request(request.method, response.status_code)
+        return response
+    
+    def model_cache_version(model):
+        """Identity of a model version, used to invalidate cached predictions"""
+        return f"{model.loader.model_version}:{model.loader.model_hash}"
+    
     # Health check endpoint
     @app.route('/health', methods=['GET'])
     def health_check():
         """Health check endpoint"""
+        model = model_registry.active
         return jsonify({
             'status': 'healthy',
             'timestamp': datetime.utcnow().isoformat(),
-            'model_loaded': model_loader.is_loaded,
+            'model_loaded': model.loader.is_loaded,
             'version': app.config.get('MODEL_VERSION', 'unknown'),
             'services': {
-                'prediction': 'available' if model_loader.is_loaded else 'unavailable',
+                'prediction': 'available' if model.loader.is_loaded else 'unavailable',
                 'analytics': 'available',
                 'model_info': 'available'
             },
@@ -84,15 +323,34 @@ def create_app(config_name='default'):
                 'model_path': app.config.get('MODEL_PATH'),
                 'scaler_path': app.config.get('SCALER_PATH'),
                 'feature_names_path': app.config.get('FEATURE_NAMES_PATH')
-            }
+            },
+            'prediction_cache': prediction_cache.get_stats() if prediction_cache is not None else {'enabled': False},
+            'micro_batching': (model.state['micro_batcher'].get_stats() if model.state['micro_batcher']
+                               else {'enabled': False}),
+            'market_indexes': market_indexes.get_stats(),
+            'analytics_cube': get_market_analytics_processor().get_cube_stats(),
+            'analytics_response_cache': (analytics_response_cache.get_stats()
+                                         if analytics_response_cache is not None else {'enabled': False}),
+            'neighbors': neighbor_index.get_stats() if neighbor_index else {'enabled': False},
+            'partial_dependence': (model.state['partial_dependence'].get_stats() if model.state['partial_dependence']
+                                   else {'enabled': False}),
+            'shadow_scoring': shadow_scorer.get_stats() if shadow_scorer else {'enabled': False},
+            'model_registry': model_registry.get_stats()
         })
     
+    # Prometheus metrics endpoint
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        """Request, stage and cache metrics in Prometheus text format"""
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+    
     # Model info endpoint
     @app.route('/api/model/info', methods=['GET'])
     def model_info():
         """Get model information and metadata"""
+        model = model_registry.active
         try:
-            if not model_loader.is_loaded:
+            if not model.loader.is_loaded:
                 return jsonify({
                     'error': 'Model not loaded',
                     'status': 'error',
@@ -103,7 +361,11 @@ def create_app(config_name='default'):
                     }
                 }), 503
             
-            info = model_loader.get_model_info()
+            info = model.loader.get_model_info()
+            info['versions'] = {
+                'active': model.describe(),
+                'previous': model_registry.previous
+            }
             return jsonify({
                 'status': 'success',
                 'data': info
@@ -121,9 +383,10 @@ def create_app(config_name='default'):
     @app.route('/api/predict', methods=['POST'])
     def predict_salary():
         """Main salary prediction endpoint with improved error handling"""
+        model = model_registry.active
         try:
             # Check if model is loaded
-            if not model_loader.is_loaded:
+            if not model.loader.is_loaded:
                 logger.warning("Prediction requested but model not loaded")
                 return jsonify({
                     'error': 'Model not available',
@@ -144,7 +407,8 @@ def create_app(config_name='default'):
             
             # Validate input data
             try:
-                validate_prediction_input(input_data)
+                with metrics.stage('validation'):
+                    validate_prediction_input(input_data)
                 logger.info("Input validation passed")
             except PredictionValidationError as e:
                 logger.warning(f"Invalid input data: {str(e)}")
@@ -154,69 +418,81 @@ def create_app(config_name='default'):
                     'status': 'error'
                 }), 400
             
-            # Preprocess input data using fixed preprocessor
-            try:
-                logger.info(" Starting preprocessing...")
-                features_df = preprocessor.preprocess_input(input_data)
-                logger.info(f"Preprocessing complete: {features_df.shape}")
-                logger.info(f"   Feature columns: {list(features_df.columns)[:5]}... (showing first 5)")
-            except Exception as e:
-                logger.error(f"Preprocessing failed: {str(e)}")
-                return jsonify({
-                    'error': 'Preprocessing failed',
-                    'message': 'Error occurred during feature preprocessing',
-                    'status': 'error',
-                    'details': str(e) if app.debug else None
-                }), 500
+            # Repeated inputs reuse the features and model output computed earlier
+            cache_key = None
+            cached = None
+            if prediction_cache is not None:
+                with metrics.stage('cache_lookup'):
+                    version = model_cache_version(model)
+                    prediction_cache.ensure_version(version)
+                    # Keyed by version too, so a request still finishing on a replaced model
+                    # cannot store its result for the new one
+                    cache_key = (version, prediction_cache_key(input_data))
+                    cached = prediction_cache.get(cache_key)
             
-            # Make prediction using the model loader's predict method
-            try:
-                logger.info(" Making prediction...")
-                prediction = model_loader.predict(features_df)
-                logger.info(f"Prediction successful: ${prediction:,.0f}")
-            except Exception as e:
-                logger.error(f"Prediction failed: {str(e)}")
-                return jsonify({
-                    'error': 'Model prediction failed',
-                    'message': 'Error occurred during model prediction',
-                    'status': 'error',
-                    'details': str(e) if app.debug else None
-                }), 500
+            if cached is not None:
+                features, prediction, spread, trees_used = cached
+                logger.info(f"Prediction cache hit: ${prediction:,.0f}")
+            else:
+                # Preprocess input data using fixed preprocessor
+                try:
+                    logger.info(" Starting preprocessing...")
+                    with metrics.stage('preprocessing'):
+                        features = preprocessor.preprocess_batch([input_data], dtype=model.loader.input_dtype)
+                    logger.info(f"Preprocessing complete: {features.shape}")
+                except Exception as e:
+                    logger.error(f"Preprocessing failed: {str(e)}")
+                    return jsonify({
+                        'error': 'Preprocessing failed',
+                        'message': 'Error occurred during feature preprocessing',
+                        'status': 'error',
+                        'details': str(e) if app.debug else None
+                    }), 500
+                
+                # Make prediction using the model loader's predict method
+                try:
+                    logger.info(" Making prediction...")
+                    with metrics.stage('model'):
+                        if model.state['micro_batcher'] is not None:
+                            prediction, spread, trees_used = model.state['micro_batcher'].predict(features)
+                        else:
+                            prediction, spread, trees_used = predict_each(model, features)[0]
+                    logger.info(f"Prediction successful: ${prediction:,.0f}")
+                except Exception as e:
+                    logger.error(f"Prediction failed: {str(e)}")
+                    return jsonify({
+                        'error': 'Model prediction failed',
+                        'message': 'Error occurred during model prediction',
+                        'status': 'error',
+                        'details': str(e) if app.debug else None
+                    }), 500
+                
+                # An anytime estimate cut short by the latency budget is not this input's answer
+                # once load drops, so only predictions from every tree are cached
+                if cache_key is not None and (trees_used is None or trees_used >= model.loader.n_trees):
+                    prediction_cache.put(cache_key, (features, prediction, spread, trees_used))
             
-            # Round prediction to nearest 1000
-            predicted_salary = int(np.round(prediction / 1000) * 1000)
+            # Hand the row to the shadow model; never waits, drops the row if its queue is full
+            if shadow_scorer is not None:
+                shadow_scorer.submit(features, prediction, model.version)
             
-            # Calculate confidence interval based on model's MAE
-            mae = app.config.get('MODEL_MAE', 22519)
-            confidence_interval = {
-                'lower': max(30000, predicted_salary - mae),
-                'upper': predicted_salary + mae
-            }
+            with metrics.stage('factors'):
+                factors, factors_baseline = explain_rows(model, [input_data], features, [prediction])[0]
             
-            # Determine market position
-            market_position = determine_market_position(predicted_salary)
-            
-            # Generate explanation factors
-            factors = generate_prediction_factors(input_data, features_df, predicted_salary)
-            
-            # Mock similar jobs count (enhance with real data if available)
-            similar_jobs = np.random.randint(150, 800)
-            
-            # Prepare response
-            result = {
-                'predictedSalary': predicted_salary,
-                'confidenceInterval': confidence_interval,
-                'similarJobs': similar_jobs,
-                'marketPosition': market_position,
-                'factors': factors,
-                'metadata': {
-                    'model_version': app.config.get('MODEL_VERSION', '1.0.0'),
-                    'model_type': model_loader.model_type,
-                    'model_accuracy': app.config.get('MODEL_ACCURACY', 0.7336),
-                    'prediction_timestamp': datetime.utcnow().isoformat(),
-                    'features_processed': features_df.shape[1]
-                }
-            }
+            # Build response payload
+            with metrics.stage('response'):
+                result = build_prediction_result(input_data, features, prediction, model.loader, app.config,
+                                                 spread=spread, trees_used=trees_used,
+                                                 market_indexes=market_indexes, factors=factors,
+                                                 factors_baseline=factors_baseline,
+                                                 model_version=model.version)
+            predicted_salary = result['predictedSalary']
+            
+            # Optional comparable postings: /api/predict?neighbors=k
+            k = neighbor_count(request.args.get('neighbors'))
+            if k is not None and neighbor_index is not None:
+                with metrics.stage('neighbors'):
+                    result['neighbors'] = neighbor_index.neighbors(features, k)[0]
             
             logger.info(f" Prediction complete: ${predicted_salary:,} for {input_data.get('jobTitle', 'Unknown')} role")
             
@@ -235,19 +511,363 @@ def create_app(config_name='default'):
                 'details': str(e) if app.debug else None
             }), 500
     
+    # Batch prediction endpoint
+    @app.route('/api/predict/batch', methods=['POST'])
+    def predict_salary_batch():
+        """Score many postings with a single model call"""
+        model = model_registry.active
+        try:
+            if not model.loader.is_loaded:
+                logger.warning("Batch prediction requested but model not loaded")
+                return jsonify({
+                    'error': 'Model not available',
+                    'message': 'The prediction model is currently not loaded. Please check server logs.',
+                    'status': 'error'
+                }), 503
+            
+            if not request.is_json:
+                return jsonify({
+                    'error': 'Invalid request format',
+                    'message': 'Request must be JSON',
+                    'status': 'error'
+                }), 400
+            
+            payload = request.get_json()
+            
+            # Accept either a bare array or {"inputs": [...]}
+            inputs = payload.get('inputs') if isinstance(payload, dict) else payload
+            if not isinstance(inputs, list) or len(inputs) == 0:
+                return jsonify({
+                    'error': 'Invalid request format',
+                    'message': 'Request must contain a non-empty "inputs" array',
+                    'status': 'error'
+                }), 400
+            
+            max_batch_size = app.config.get('MAX_BATCH_SIZE', 1000)
+            if len(inputs) > max_batch_size:
+                return jsonify({
+                    'error': 'Batch too large',
+                    'message': f'A batch may contain at most {max_batch_size} inputs',
+                    'status': 'error'
+                }), 413
+            
+            logger.info(f" Received batch prediction request with {len(inputs)} inputs")
+            
+            # Validate each input, collecting per-item errors
+            results = [None] * len(inputs)
+            valid_indices = []
+            with metrics.stage('validation'):
+                for index, input_data in enumerate(inputs):
+                    try:
+                        validate_prediction_input(input_data)
+                        valid_indices.append(index)
+                    except PredictionValidationError as e:
+                        results[index] = {
+                            'index': index,
+                            'status': 'error',
+                            'error': 'Invalid input data',
+                            'message': str(e)
+                        }
+            
+            if valid_indices:
+                # Preprocess valid inputs into one feature matrix
+                try:
+                    with metrics.stage('preprocessing'):
+                        features = preprocessor.preprocess_batch(
+                            [inputs[i] for i in valid_indices],
+                            dtype=model.loader.input_dtype
+                        )
+                except Exception as e:
+                    logger.error(f"Batch preprocessing failed: {str(e)}")
+                    return jsonify({
+                        'error': 'Preprocessing failed',
+                        'message': 'Error occurred during feature preprocessing',
+                        'status': 'error',
+                        'details': str(e) if app.debug else None
+                    }), 500
+                
+                # Single vectorized model call for the whole batch
+                try:
+                    with metrics.stage('model'):
+                        predictions, spreads, trees_used = predict_rows(model, features)
+                except Exception as e:
+                    logger.error(f"Batch prediction failed: {str(e)}")
+                    return jsonify({
+                        'error': 'Model prediction failed',
+                        'message': 'Error occurred during model prediction',
+                        'status': 'error',
+                        'details': str(e) if app.debug else None
+                    }), 500
+                
+                with metrics.stage('factors'):
+                    explanations = explain_rows(model, [inputs[i] for i in valid_indices], features, predictions)
+                
+                with metrics.stage('response'):
+                    for row, index in enumerate(valid_indices):
+                        results[index] = {
+                            'index': index,
+                            'status': 'success',
+                            'data': build_prediction_result(
+                                inputs[index],
+                                features[row:row + 1],
+                                predictions[row],
+                                model.loader,
+                                app.config,
+                                spread=None if spreads is None else spreads[row],
+                                trees_used=trees_used,
+                                market_indexes=market_indexes,
+                                factors=explanations[row][0],
+                                factors_baseline=explanations[row][1],
+                                model_version=model.version
+                            )
+                        }
+            
+            succeeded = len(valid_indices)
+            logger.info(f" Batch prediction complete: {succeeded}/{len(inputs)} inputs scored")
+            
+            return jsonify({
+                'status': 'success',
+                'data': {
+                    'results': results,
+                    'summary': {
+                        'total': len(inputs),
+                        'succeeded': succeeded,
+                        'failed': len(inputs) - succeeded
+                    }
+                }
+            })
+        
+        except Exception as e:
+            logger.error(f" Unexpected error in batch prediction: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({
+                'error': 'Batch prediction failed',
+                'message': 'An unexpected error occurred. Please check server logs.',
+                'status': 'error',
+                'details': str(e) if app.debug else None
+            }), 500
+    
+    # What-if sweep endpoint
+    @app.route('/api/predict/sweep', methods=['POST'])
+    def predict_sweep():
+        """Predictions over a grid of one or two swept input fields, scored with one model call"""
+        model = model_registry.active
+        try:
+            if not model.loader.is_loaded:
+                logger.warning("Sweep requested but model not loaded")
+                return jsonify({
+                    'error': 'Model not available',
+                    'message': 'The prediction model is currently not loaded. Please check server logs.',
+                    'status': 'error'
+                }), 503
+            
+            if not request.is_json:
+                return jsonify({
+                    'error': 'Invalid request format',
+                    'message': 'Request must be JSON',
+                    'status': 'error'
+                }), 400
+            
+            # {"input": {...}, "sweep": ["yearsExperience", {"field": "companySize", "values": [...]}]}
+            payload = request.get_json()
+            if not isinstance(payload, dict):
+                return jsonify({
+                    'error': 'Invalid request format',
+                    'message': 'Request must contain "input" and "sweep"',
+                    'status': 'error'
+                }), 400
+            input_data = payload.get('input')
+            
+            try:
+                with metrics.stage('validation'):
+                    validate_prediction_input(input_data)
+                    dimensions = validate_sweep_dimensions(
+                        payload.get('sweep'),
+                        preprocessor.sweep_options(),
+                        max_points=app.config.get('MAX_BATCH_SIZE', 1000)
+                    )
+            except PredictionValidationError as e:
+                logger.warning(f"Invalid sweep request: {str(e)}")
+                return jsonify({
+                    'error': 'Invalid input data',
+                    'message': str(e),
+                    'status': 'error'
+                }), 400
+            
+            # Preprocess the base input once and overwrite the swept columns per grid point
+            with metrics.stage('preprocessing'):
+                base = preprocessor.preprocess_batch([input_data], dtype=model.loader.input_dtype)
+                grid = preprocessor.expand_grid(base, dimensions)
+            
+            # The base row rides along so the chart can mark it
+            with metrics.stage('model'):
+                predictions, spreads, trees_used = predict_rows(model, np.vstack([base, grid]))
+            
+            with metrics.stage('response'):
+                shape = [len(values) for _, values in dimensions]
+                
+                def salary_grid(values):
+                    return (np.round(values[1:] / 1000) * 1000).astype(np.int64).reshape(shape).tolist()
+                
+                data = {
+                    'dimensions': [{'field': field, 'values': values} for field, values in dimensions],
+                    'shape': shape,
+                    'predictions': salary_grid(predictions),
+                    'basePrediction': int(np.round(predictions[0] / 1000) * 1000),
+                    'metadata': {
+                        'model_version': model.version or app.config.get('MODEL_VERSION', '1.0.0'),
+                        'model_type': model.loader.model_type,
+                        'grid_points': len(grid),
+                        'prediction_timestamp': datetime.utcnow().isoformat()
+                    }
+                }
+                if spreads is not None:
+                    data['lower'] = salary_grid(spreads[:, 0])
+                    data['upper'] = salary_grid(spreads[:, -1])
+                if trees_used is not None:
+                    data['metadata']['trees_used'] = int(trees_used)
+            
+            logger.info(f" Sweep complete: {len(grid)} grid points over {[field for field, _ in dimensions]}")
+            
+            return jsonify({
+                'status': 'success',
+                'data': data
+            })
+        
+        except Exception as e:
+            logger.error(f" Unexpected error in sweep: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({
+                'error': 'Sweep failed',
+                'message': 'An unexpected error occurred. Please check server logs.',
+                'status': 'error',
+                'details': str(e) if app.debug else None
+            }), 500
+    
+    # Comparable postings endpoint
+    @app.route('/api/predict/neighbors', methods=['POST'])
+    def predict_neighbors():
+        """The k training postings closest to one input, or to each input of a batch"""
+        try:
+            if neighbor_index is None:
+                return jsonify({
+                    'error': 'Neighbor index not available',
+                    'message': 'The comparable postings index is not loaded. Please check server logs.',
+                    'status': 'error'
+                }), 503
+            
+            if not request.is_json:
+                return jsonify({
+                    'error': 'Invalid request format',
+                    'message': 'Request must be JSON',
+                    'status': 'error'
+                }), 400
+            
+            payload = request.get_json()
+            
+            # A single input object, a bare array or {"inputs": [...], "k": 10}
+            single = isinstance(payload, dict) and 'inputs' not in payload
+            inputs = [payload] if single else (payload.get('inputs') if isinstance(payload, dict) else payload)
+            if not isinstance(inputs, list) or len(inputs) == 0:
+                return jsonify({
+                    'error': 'Invalid request format',
+                    'message': 'Request must be an input object or contain a non-empty "inputs" array',
+                    'status': 'error'
+                }), 400
+            
+            max_batch_size = app.config.get('MAX_BATCH_SIZE', 1000)
+            if len(inputs) > max_batch_size:
+                return jsonify({
+                    'error': 'Batch too large',
+                    'message': f'A batch may contain at most {max_batch_size} inputs',
+                    'status': 'error'
+                }), 413
+            
+            requested_k = request.args.get('k', payload.get('k') if isinstance(payload, dict) else None)
+            k = neighbor_count(requested_k if requested_k is not None else app.config.get('NEIGHBORS_DEFAULT_K', 10))
+            if k is None:
+                return jsonify({
+                    'error': 'Invalid request format',
+                    'message': 'k must be a positive integer',
+                    'status': 'error'
+                }), 400
+            
+            results = [None] * len(inputs)
+            valid_indices = []
+            with metrics.stage('validation'):
+                for index, input_data in enumerate(inputs):
+                    try:
+                        validate_prediction_input(input_data)
+                        valid_indices.append(index)
+                    except PredictionValidationError as e:
+                        results[index] = {
+                            'index': index,
+                            'status': 'error',
+                            'error': 'Invalid input data',
+                            'message': str(e)
+                        }
+            
+            if single and not valid_indices:
+                return jsonify({
+                    'error': 'Invalid input data',
+                    'message': results[0]['message'],
+                    'status': 'error'
+                }), 400
+            
+            if valid_indices:
+                with metrics.stage('preprocessing'):
+                    features = preprocessor.preprocess_batch([inputs[i] for i in valid_indices])
+                
+                # One batched tree query for every valid input
+                with metrics.stage('neighbors'):
+                    neighbors = neighbor_index.neighbors(features, k)
+                
+                for row, index in enumerate(valid_indices):
+                    results[index] = {'index': index, 'status': 'success', 'neighbors': neighbors[row]}
+            
+            if single:
+                return jsonify({
+                    'status': 'success',
+                    'data': {'k': k, 'neighbors': results[0]['neighbors']}
+                })
+            
+            return jsonify({
+                'status': 'success',
+                'data': {
+                    'k': k,
+                    'results': results,
+                    'summary': {
+                        'total': len(inputs),
+                        'succeeded': len(valid_indices),
+                        'failed': len(inputs) - len(valid_indices)
+                    }
+                }
+            })
+        
+        except Exception as e:
+            logger.error(f" Unexpected error in neighbor search: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({
+                'error': 'Neighbor search failed',
+                'message': 'An unexpected error occurred. Please check server logs.',
+                'status': 'error',
+                'details': str(e) if app.debug else None
+            }), 500
+    
     # Feature importance endpoint
     @app.route('/api/model/features', methods=['GET'])
     def feature_importance():
         """Get feature importance from the model"""
+        model = model_registry.active
         try:
-            if not model_loader.is_loaded:
+            if not model.loader.is_loaded:
                 return jsonify({
                     'error': 'Model not available',
                     'status': 'error'
                 }), 503
             
             # Get feature importance using model loader method
-            importance_data = model_loader.get_feature_importance()
+            importance_data = model.loader.get_feature_importance()
             
             if importance_data is None:
                 return jsonify({
@@ -260,7 +880,7 @@ def create_app(config_name='default'):
                 'status': 'success',
                 'data': {
                     'feature_importance': importance_data,
-                    'model_type': model_loader.model_type,
+                    'model_type': model.loader.model_type,
                     'total_features': len(importance_data)
                 }
             })
@@ -272,6 +892,74 @@ def create_app(config_name='default'):
                 'status': 'error'
             }), 500
     
+    # Partial dependence endpoint
+    @app.route('/api/model/partial-dependence', methods=['GET'])
+    def partial_dependence_curves():
+        """Precomputed partial dependence curves for all features, or one with ?feature="""
+        model = model_registry.active
+        partial_dependence = model.state['partial_dependence']
+        if partial_dependence is None:
+            return jsonify({
+                'error': 'Partial dependence not available',
+                'message': 'Partial dependence curves are disabled or the model is not loaded',
+                'status': 'error'
+            }), 503
+        
+        feature = request.args.get('feature') or None
+        ice = request.args.get('ice', 'false').lower() in ('1', 'true', 'yes')
+        try:
+            body = partial_dependence.response(feature, ice)
+        except KeyError:
+            return jsonify({
+                'error': 'Unknown feature',
+                'message': f"'{feature}' is not a model feature",
+                'features': partial_dependence.features,
+                'status': 'error'
+            }), 404
+        
+        if body is None:
+            if partial_dependence.status == 'failed':
+                return jsonify({
+                    'error': 'Partial dependence computation failed',
+                    'message': 'Please check server logs.',
+                    'status': 'error',
+                    'details': partial_dependence.error if app.debug else None
+                }), 503
+            response = jsonify({
+                'status': 'pending',
+                'message': 'Partial dependence curves are being computed; retry shortly'
+            })
+            response.status_code = 202
+            response.headers['Retry-After'] = '5'
+            return response
+        
+        return Response(body, mimetype='application/json')
+    
+    # Shadow model comparison
+    @app.route('/api/model/shadow-report', methods=['GET'])
+    def shadow_report():
+        """How the shadow model's predictions differ from the served ones on live traffic"""
+        if shadow_scorer is None:
+            return jsonify({
+                'error': 'Shadow scoring not enabled',
+                'message': 'Set SHADOW_MODEL_PATH to score requests with a shadow model.',
+                'status': 'error'
+            }), 503
+        
+        try:
+            return jsonify({
+                'status': 'success',
+                'data': shadow_scorer.report()
+            })
+        except Exception as e:
+            logger.error(f"Shadow report failed: {str(e)}")
+            return jsonify({
+                'error': 'Failed to build shadow report',
+                'message': 'Please check server logs.',
+                'status': 'error',
+                'details': str(e) if app.debug else None
+            }), 500
+    
     # API endpoints listing
     @app.route('/api', methods=['GET'])
     def api_endpoints():
@@ -279,8 +967,13 @@ def create_app(config_name='default'):
         endpoints = {
             'prediction': {
                 'predict': 'POST /api/predict',
+                'predict_batch': 'POST /api/predict/batch',
+                'predict_neighbors': 'POST /api/predict/neighbors',
+                'predict_sweep': 'POST /api/predict/sweep',
                 'model_info': 'GET /api/model/info',
-                'feature_importance': 'GET /api/model/features'
+                'feature_importance': 'GET /api/model/features',
+                'partial_dependence': 'GET /api/model/partial-dependence',
+                'shadow_report': 'GET /api/model/shadow-report'
             },
             'analytics': {
                 'overview': 'GET /api/analytics/overview',
@@ -292,6 +985,7 @@ def create_app(config_name='default'):
             },
             'system': {
                 'health': 'GET /health',
+                'metrics': 'GET /metrics',
                 'debug': 'GET /debug'
             }
         }
@@ -308,9 +1002,10 @@ def create_app(config_name='default'):
     @app.route('/debug', methods=['GET'])
     def debug_info():
         """Debug endpoint to check configuration and model state"""
+        model = model_registry.active
         debug_data = {
             'flask_config_keys': list(app.config.keys()),
-            'model_loaded': model_loader.is_loaded,
+            'model_loaded': model.loader.is_loaded,
             'paths': {
                 'model_path': app.config.get('MODEL_PATH'),
                 'scaler_path': app.config.get('SCALER_PATH'),
@@ -325,15 +1020,15 @@ def create_app(config_name='default'):
             'script_directory': os.path.dirname(os.path.abspath(__file__)),
             'preprocessor_features': len(preprocessor.expected_features) if hasattr(preprocessor, 'expected_features') else 'unknown',
             'services': {
-                'prediction': model_loader.is_loaded,
+                'prediction': model.loader.is_loaded,
                 'analytics': True,
-                'model_info': model_loader.is_loaded
+                'model_info': model.loader.is_loaded
             }
         }
         
         # Add model info if loaded
-        if model_loader.is_loaded:
-            debug_data['model_info'] = model_loader.get_model_info()
+        if model.loader.is_loaded:
+            debug_data['model_info'] = model.loader.get_model_info()
         
         return jsonify(debug_data)
     
@@ -426,8 +1121,118 @@ def create_app(config_name='default'):
     
     return app
 
+# Sample input scored by every model version before it is activated
+WARMUP_INPUT = {
+    'jobTitle': 'Data Scientist',
+    'yearsExperience': 5,
+    'companyLocation': 'United States',
+    'remoteRatio': 50,
+    'requiredSkills': ['Python', 'SQL'],
+    'benefits': ['Health Insurance'],
+    'jobDescription': 'Build and deploy machine learning models'
+}
+
+def build_prediction_result(input_data, features, prediction, model_loader, app_config, spread=None,
+                            trees_used=None, market_indexes=None, factors=None, factors_baseline=None,
+                            model_version=None):
+    """Build the response payload for a single prediction
+    
+    factors are the model's own per-prediction factors (see PredictionFactorExplainer);
+    without them the fixed heuristics of generate_prediction_factors are used.
+    model_version is the registry version that scored the row (defaults to MODEL_VERSION).
+    """
+    # Round prediction to nearest 1000
+    predicted_salary = int(np.round(prediction / 1000) * 1000)
+    
+    if spread is not None:
+        # Interval from the individual trees, bounded by the outer quantiles
+        levels = app_config.get('PREDICTION_INTERVAL_QUANTILES', (0.1, 0.5, 0.9))
+        rounded = [int(np.round(value / 1000) * 1000) for value in spread]
+        confidence_interval = {
+            'lower': rounded[0],
+            'upper': rounded[-1],
+            'quantiles': {f'p{level * 100:g}': value for level, value in zip(levels, rounded)},
+            'method': 'tree_quantiles'
+        }
+    else:
+        # Calculate confidence interval based on model's MAE
+        mae = app_config.get('MODEL_MAE', 22519)
+        confidence_interval = {
+            'lower': max(30000, predicted_salary - mae),
+            'upper': predicted_salary + mae,
+            'method': 'mae'
+        }
+    
+    similar_jobs_index, salary_percentiles = market_indexes.get() if market_indexes else (None, None)
+    
+    # Market position from the salary's percentile among comparable postings
+    market_percentile = None
+    if salary_percentiles is not None:
+        market_percentile = salary_percentiles.lookup(predicted_salary, input_data)
+        min_size = app_config.get('MARKET_SEGMENT_MIN_SIZE', 20)
+        basis = 'segment' if market_percentile['segmentSize'] >= min_size else 'global'
+        market_percentile['basis'] = basis
+        market_position = market_position_from_percentile(
+            market_percentile[basis], app_config.get('MARKET_POSITION_PERCENTILES', (25, 60, 80))
+        )
+    else:
+        market_position = determine_market_position(predicted_salary)
+    
+    # Contributions come with the forest's average prediction; heuristic factors do not
+    factors_method = 'tree_contributions' if factors_baseline is not None else 'heuristic'
+    if factors is None:
+        factors = generate_prediction_factors(input_data, features, predicted_salary)
+    
+    # Postings in the same segment of the analytics dataset (coarser segments if it is empty)
+    similar_jobs, similar_jobs_segment = None, None
+    if similar_jobs_index is not None:
+        similar_jobs, similar_jobs_segment = similar_jobs_index.lookup(input_data)
+    
+    result = {
+        'predictedSalary': predicted_salary,
+        'confidenceInterval': confidence_interval,
+        'similarJobs': similar_jobs,
+        'marketPosition': market_position,
+        'marketPercentile': market_percentile,
+        'factors': factors,
+        'metadata': {
+            'model_version': model_version or app_config.get('MODEL_VERSION', '1.0.0'),
+            'model_type': model_loader.model_type,
+            'model_accuracy': app_config.get('MODEL_ACCURACY', 0.7336),
+            'prediction_timestamp': datetime.utcnow().isoformat(),
+            'features_processed': features.shape[1],
+            'factors_method': factors_method
+        }
+    }
+    
+    # Factor impacts are relative to the forest's average prediction
+    if factors_baseline is not None:
+        result['metadata']['factors_baseline'] = int(np.round(factors_baseline))
+    
+    if similar_jobs_segment is not None:
+        result['metadata']['similar_jobs_segment'] = list(similar_jobs_segment)
+    
+    # Forests report how much of the ensemble produced the estimate
+    if trees_used is not None:
+        result['metadata']['trees_used'] = int(trees_used)
+        result['metadata']['trees_total'] = model_loader.n_trees
+    
+    return result
+
+def market_position_from_percentile(percentile, cutoffs=(25, 60, 80)):
+    """Market position from a percentile and the cut points between the four positions"""
+    below_average, average, above_average = cutoffs
+    if percentile < below_average:
+        return 'Below Average'
+    elif percentile < average:
+        return 'Average'
+    elif percentile < above_average:
+        return 'Above Average'
+    else:
+        return 'Top Tier'
+
 def determine_market_position(salary):
-    """Determine market position based on salary ranges"""
+    """Determine market position based on salary ranges (used when no salary data is loaded)"""
     if salary < 80000:
         return 'Below Average'
     elif salary < 120000:
@@ -437,8 +1242,8 @@ def determine_market_position(salary):
     else:
         return 'Top Tier'
 
-def generate_prediction_factors(input_data, features_df, predicted_salary):
-    """Generate explanation factors for the prediction"""
+def generate_prediction_factors(input_data, features, predicted_salary):
+    """Heuristic explanation factors, for models that cannot be decomposed into feature contributions"""
     factors = []
     
     # Experience factor
@@ -517,6 +1322,7 @@ if __name__ == '__main__':
     print(" Starting AI Salary Prediction API with Analytics...")
     print(" Available services:")
     print("   • Salary Prediction: /api/predict")
+    print("   • Batch Prediction: /api/predict/batch")
     print("   • Market Analytics: /api/analytics/*")
     print("   • Model Information: /api/model/info")
     print("   • Health Check: /health")
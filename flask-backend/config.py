@@ -25,6 +25,114 @@ class Config:
     MODEL_ACCURACY = 0.7336  # 73.36% accuracy
     MODEL_MAE = 22519  # Mean Absolute Error in USD
     
+    # Inference engine: 'compiled' (flattened NumPy forest) or 'sklearn'
+    INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'compiled')
+    COMPILED_FOREST_MAX_ROWS = 64  # Larger batches go to sklearn's threaded predict (crossover: scripts/check_forest_parity.py)
+    COMPILED_FOREST_PATH = str(MODELS_DIR / 'compiled_forest')  # Memory-mapped .npy bundle, written on first compile
+    
+    # Precomputed prediction table (build with: python -m scripts.build_prediction_table).
+    # Approximate: job_desc_log is bucketed, so answers can differ from the forest by thousands
+    # of dollars. Opt-in; when enabled it replaces the forest for point estimates. Only loaded with
+    # PREDICTION_INTERVAL_MODE='mae' and anytime evaluation off, where every path scores through it
+    PREDICTION_TABLE_ENABLED = os.environ.get('PREDICTION_TABLE_ENABLED', 'false').lower() == 'true'
+    PREDICTION_TABLE_PATH = str(MODELS_DIR / 'prediction_table.npy')
+    PREDICTION_TABLE_DESC_BUCKETS = 16  # Resolution of the job_desc_log axis
+    
+    # Prediction intervals: 'trees' uses quantiles of the forest's per-tree predictions,
+    # 'mae' adds and subtracts MODEL_MAE
+    PREDICTION_INTERVAL_MODE = os.environ.get('PREDICTION_INTERVAL_MODE', 'trees')
+    PREDICTION_INTERVAL_QUANTILES = (0.1, 0.5, 0.9)  # Ascending; the outer two bound the interval
+    
+    # Anytime evaluation: trees run in chunks and stop early once the running mean is
+    # stable or the latency budget is spent (response metadata reports trees_used)
+    ANYTIME_EVALUATION_ENABLED = os.environ.get('ANYTIME_EVALUATION_ENABLED', 'false').lower() == 'true'
+    ANYTIME_BUDGET_MS = 5.0  # Per model call, measured from the start of tree evaluation
+    ANYTIME_TOLERANCE = None  # USD; stop once every row's standard error is within it (None: budget only)
+    ANYTIME_CHUNK_TREES = 10  # Trees evaluated between checks
+    
+    # Market position: percentile of the prediction among postings in the same segment
+    # (job category x experience level x country group), or among all postings when
+    # the segment is smaller than MARKET_SEGMENT_MIN_SIZE
+    MARKET_POSITION_PERCENTILES = (25, 60, 80)  # Below Average | Average | Above Average | Top Tier
+    MARKET_SEGMENT_MIN_SIZE = 20
+    
+    # Comparable postings: KD-tree over the standardized training feature matrix
+    NEIGHBORS_ENABLED = True
+    NEIGHBORS_FEATURES_PATH = str(BASE_DIR.parent / 'dataset' / 'modeling' / 'X_features_for_modeling.csv')
+    NEIGHBORS_TARGET_PATH = str(BASE_DIR.parent / 'dataset' / 'modeling' / 'y_target_for_modeling.csv')
+    NEIGHBORS_POSTINGS_PATH = str(BASE_DIR / 'ai_jobs_data_cleaned.csv')  # Same rows, in the same order
+    # The training matrix encodes these differently from the preprocessor (premium scale,
+    # description characters vs words, remote 0/2/3 vs 0/1/2), so they would skew distances
+    NEIGHBORS_EXCLUDED_FEATURES = ('location_salary_premium', 'job_desc_log', 'remote_category')
+    NEIGHBORS_DEFAULT_K = 10
+    NEIGHBORS_MAX_K = 50
+    NEIGHBORS_LEAF_SIZE = 40
+    
+    # Prediction factors: 'contributions' decomposes each forest prediction along its
+    # trees' decision paths; 'heuristic' (and non-forest models) use fixed rules of thumb
+    PREDICTION_FACTORS_METHOD = os.environ.get('PREDICTION_FACTORS_METHOD', 'contributions')
+    PREDICTION_FACTORS_TOP_N = 4
+    
+    # Model hot-swap: each worker polls the artifacts every MODEL_WATCH_INTERVAL seconds (0 disables)
+    # and swaps in a changed, validated and warmed model without a restart. With MODEL_REGISTRY_DIR
+    # set, the newest version directory in it (by sorted name) is served instead of MODEL_PATH etc.
+    MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 5.0))
+    MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR') or None
+    
+    # Shadow scoring: a candidate model scores each /api/predict row on a background thread
+    # and /api/model/shadow-report compares it with the served predictions. Feature names
+    # default to the served model's; without SHADOW_SCALER_PATH the shadow is unscaled
+    SHADOW_MODEL_PATH = os.environ.get('SHADOW_MODEL_PATH') or None
+    SHADOW_SCALER_PATH = os.environ.get('SHADOW_SCALER_PATH') or None
+    SHADOW_FEATURE_NAMES_PATH = os.environ.get('SHADOW_FEATURE_NAMES_PATH') or None
+    SHADOW_QUEUE_SIZE = 1024  # Rows waiting for the shadow model; new rows are dropped when full
+    SHADOW_BATCH_SIZE = 64  # Rows per shadow model call
+    SHADOW_RECENT_PAIRS = 20  # (served, shadow) pairs kept for the report
+    
+    # Partial dependence curves (/api/model/partial-dependence), computed in the background
+    # over a sample of the training feature matrix and cached per model file hash
+    PARTIAL_DEPENDENCE_ENABLED = True
+    PARTIAL_DEPENDENCE_DIR = str(MODELS_DIR / 'partial_dependence')
+    PARTIAL_DEPENDENCE_SAMPLE_SIZE = 500  # Background rows averaged at each grid value
+    PARTIAL_DEPENDENCE_GRID_RESOLUTION = 20  # Maximum grid values per feature
+    PARTIAL_DEPENDENCE_ICE_ROWS = 50  # Individual (ICE) curves kept per feature; 0 disables them
+    PARTIAL_DEPENDENCE_SEED = 0
+    
+    # Prediction cache (repeated inputs skip preprocessing and the model)
+    PREDICTION_CACHE_ENABLED = True
+    PREDICTION_CACHE_SIZE = 4096  # Maximum cached inputs (LRU eviction)
+    PREDICTION_CACHE_TTL = 3600  # Seconds before a cached prediction expires
+    
+    # Micro-batching: concurrent /api/predict calls share one model call.
+    # Only useful when a worker serves requests on several threads (GUNICORN_THREADS)
+    MICRO_BATCHING_ENABLED = os.environ.get('MICRO_BATCHING_ENABLED', 'false').lower() == 'true'
+    MICRO_BATCH_MAX_SIZE = 32  # Rows per coalesced model call
+    MICRO_BATCH_WINDOW_MS = 2.0  # Longest a request waits for others to join its batch
+    
+    # Batch prediction
+    MAX_BATCH_SIZE = 1000  # Maximum inputs accepted by /api/predict/batch
+    
+    # Request/stage timings exposed on /metrics
+    METRICS_ENABLED = True
+    
+    # Load the analytics dataset in create_app instead of on the first request,
+    # so a preloading server (see gunicorn.conf.py) does it once before forking
+    PRELOAD_ANALYTICS = True
+    
+    # Analytics cube: every dashboard section precomputed for every filter combination, so
+    # /api/analytics requests are lookups. Larger datasets are aggregated per request instead
+    ANALYTICS_CUBE_ENABLED = os.environ.get('ANALYTICS_CUBE_ENABLED', 'true').lower() == 'true'
+    ANALYTICS_CUBE_MAX_ROWS = int(os.environ.get('ANALYTICS_CUBE_MAX_ROWS', 2000000))
+    ANALYTICS_CUBE_BACKGROUND = False  # Build on a thread (per worker) instead of during startup
+    
+    # Deterministic analytics: the mock noise fields are seeded per filters and section, so each
+    # response depends only on the dataset, filters and sections and can be cached with an ETag
+    ANALYTICS_DETERMINISTIC = os.environ.get('ANALYTICS_DETERMINISTIC', 'true').lower() == 'true'
+    ANALYTICS_NOISE_SEED = int(os.environ.get('ANALYTICS_NOISE_SEED', 0))
+    ANALYTICS_RESPONSE_CACHE_ENABLED = True  # Needs ANALYTICS_DETERMINISTIC
+    ANALYTICS_RESPONSE_CACHE_MAX_BYTES = 32 * 1024 * 1024  # Serialized + gzipped bodies (LRU eviction)
+    ANALYTICS_RESPONSE_MAX_AGE = 300  # Cache-Control max-age (seconds); clients revalidate with the ETag after it
+    
     # Logging
     LOG_LEVEL = 'INFO'
     
@@ -83,6 +191,11 @@ class ProductionConfig(Config):
     MODEL_PATH = os.environ.get('MODEL_PATH') or Config.MODEL_PATH
     SCALER_PATH = os.environ.get('SCALER_PATH') or Config.SCALER_PATH
     FEATURE_NAMES_PATH = os.environ.get('FEATURE_NAMES_PATH') or Config.FEATURE_NAMES_PATH
+    PREDICTION_TABLE_PATH = os.environ.get('PREDICTION_TABLE_PATH') or Config.PREDICTION_TABLE_PATH
+    COMPILED_FOREST_PATH = os.environ.get('COMPILED_FOREST_PATH') or Config.COMPILED_FOREST_PATH
+    NEIGHBORS_FEATURES_PATH = os.environ.get('NEIGHBORS_FEATURES_PATH') or Config.NEIGHBORS_FEATURES_PATH
+    NEIGHBORS_TARGET_PATH = os.environ.get('NEIGHBORS_TARGET_PATH') or Config.NEIGHBORS_TARGET_PATH
+    PARTIAL_DEPENDENCE_DIR = os.environ.get('PARTIAL_DEPENDENCE_DIR') or Config.PARTIAL_DEPENDENCE_DIR
     
     # Production logging
     LOG_LEVEL = 'WARNING'
@@ -0,0 +1,34 @@
+"""
+Gunicorn settings for the production container.
+
+The app is imported once in the master (preload_app) so the model, compiled
+forest, lookup table (when enabled) and analytics data are loaded a single time. Workers are
+forked from that process and share those pages copy-on-write; the large
+NumPy artifacts are memory-mapped files, so they stay shared regardless.
+
+Usage (from flask-backend/):
+    gunicorn -c gunicorn.conf.py "app:create_app('production')"
+"""
+import gc
+import os
+import time
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 3))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))  # >1 lets MICRO_BATCHING_ENABLED coalesce requests
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+_started_at = time.monotonic()
+
+def when_ready(server):
+    """Runs in the master after the app is loaded, right before workers are forked"""
+    if preload_app:
+        # Move everything allocated so far out of the collector's reach, so the
+        # workers' GC passes don't write to (and un-share) the master's objects
+        gc.collect()
+        gc.freeze()
+        server.log.info(f"Froze {gc.get_freeze_count()} objects before forking workers")
+
+def post_worker_init(worker):
+    worker.log.info(f"Worker ready (pid {worker.pid}) {time.monotonic() - _started_at:.2f}s after master start")
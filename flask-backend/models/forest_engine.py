@@ -0,0 +1,291 @@
+import json
+import logging
+import os
+import time
+import numpy as np
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CompiledForest:
+    """Random forest flattened into contiguous node arrays for pure-NumPy inference
+    
+    Every node of every tree lives in the same set of arrays. Leaves point at
+    themselves, so a batch of rows can walk all trees level by level until
+    every (row, tree) pair has reached a leaf.
+    """
+    
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, value: np.ndarray, roots: np.ndarray,
+                 max_depth: int, n_features: int):
+        # Memory-mapped arrays are kept as plain ndarray views of the same pages:
+        # np.memmap's Python-level __getitem__ would otherwise run on every gather
+        self.feature = np.asarray(feature).view(np.ndarray)
+        self.threshold = np.asarray(threshold).view(np.ndarray)
+        self.left = np.asarray(left).view(np.ndarray)
+        self.right = np.asarray(right).view(np.ndarray)
+        self.value = np.asarray(value).view(np.ndarray)
+        self.roots = np.asarray(roots).view(np.ndarray)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.is_leaf = left == np.arange(len(left), dtype=left.dtype)
+    
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+    
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left,
+                                      self.right, self.value, self.roots))
+    
+    @staticmethod
+    def supports(model) -> bool:
+        """Whether the model is a single-output forest of sklearn trees"""
+        estimators = getattr(model, 'estimators_', None)
+        if not estimators or getattr(model, 'n_outputs_', 1) != 1:
+            return False
+        return all(hasattr(tree, 'tree_') for tree in estimators)
+    
+    @classmethod
+    def from_sklearn(cls, model) -> 'CompiledForest':
+        """Flatten a fitted sklearn forest (e.g. RandomForestRegressor)"""
+        if not cls.supports(model):
+            raise ValueError(f"Cannot compile {type(model).__name__}: not a single-output tree ensemble")
+        
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        counts = np.array([tree.node_count for tree in trees], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        
+        feature = np.empty(counts.sum(), dtype=np.int32)
+        threshold = np.empty(counts.sum(), dtype=np.float64)
+        left = np.empty(counts.sum(), dtype=np.int32)
+        right = np.empty(counts.sum(), dtype=np.int32)
+        value = np.empty(counts.sum(), dtype=np.float64)
+        
+        for tree, offset, count in zip(trees, offsets, counts):
+            nodes = slice(offset, offset + count)
+            own = np.arange(offset, offset + count, dtype=np.int32)
+            leaf = tree.children_left == -1
+            
+            # Leaves loop back onto themselves and read feature 0 harmlessly
+            feature[nodes] = np.where(leaf, 0, tree.feature)
+            threshold[nodes] = np.where(leaf, np.inf, tree.threshold)
+            left[nodes] = np.where(leaf, own, tree.children_left + offset)
+            right[nodes] = np.where(leaf, own, tree.children_right + offset)
+            value[nodes] = tree.value[:, 0, 0]
+        
+        max_depth = max(tree.max_depth for tree in trees)
+        compiled = cls(feature, threshold, left, right, value,
+                       offsets.astype(np.int32), max_depth, model.n_features_in_)
+        logger.info(f"Compiled forest: {compiled.n_trees} trees, {compiled.n_nodes} nodes, "
+                    f"depth {compiled.max_depth}, {compiled.nbytes / 1e6:.1f} MB")
+        return compiled
+    
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    
+    ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+    
+    def save(self, path: str, model_hash: Optional[str] = None):
+        """
+        Write the node arrays as a directory of raw .npy files plus meta.json
+        
+        Each file is written beside its target and renamed over it, so processes
+        still memory-mapping an older bundle keep reading the old file. meta.json
+        goes last: once it names a model, the arrays are that model's.
+        """
+        os.makedirs(path, exist_ok=True)
+        
+        def replace(name: str, write):
+            target = os.path.join(path, name)
+            tmp_path = f'{target}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, target)
+        
+        for name in self.ARRAYS:
+            replace(f'{name}.npy', lambda f: np.save(f, getattr(self, name)))
+        replace('meta.json', lambda f: f.write(json.dumps({
+            'model_hash': model_hash,
+            'max_depth': self.max_depth,
+            'n_features': self.n_features
+        }).encode('utf-8')))
+        logger.info(f"Compiled forest saved to {path} ({self.nbytes / 1e6:.1f} MB)")
+    
+    @classmethod
+    def load(cls, path: str, model_hash: Optional[str] = None,
+             mmap_mode: Optional[str] = 'r') -> Optional['CompiledForest']:
+        """
+        Load a saved bundle, memory-mapped by default so forked workers share the pages
+        
+        Returns None if the bundle is missing or was built from a different model file.
+        """
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            if model_hash is not None and meta.get('model_hash') != model_hash:
+                logger.info("Compiled forest bundle was built for a different model file - ignoring it")
+                return None
+            
+            arrays = [np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode) for name in cls.ARRAYS]
+            compiled = cls(*arrays, meta['max_depth'], meta['n_features'])
+            logger.info(f"Compiled forest loaded from {path}: {compiled.n_trees} trees, "
+                        f"{compiled.n_nodes} nodes ({'memory-mapped' if mmap_mode else 'in memory'})")
+            return compiled
+        except Exception as e:
+            logger.warning(f"Failed to load compiled forest bundle: {str(e)}")
+            return None
+    
+    def _prepare(self, X) -> np.ndarray:
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input of shape (n, {self.n_features}), got {X.shape}")
+        return X
+    
+    def apply(self, X, roots: Optional[np.ndarray] = None) -> np.ndarray:
+        """Leaf node index reached by each row in each tree, shape (n_rows, n_trees)"""
+        X = self._prepare(X)
+        roots = self.roots if roots is None else roots
+        nodes = np.repeat(roots[np.newaxis, :], X.shape[0], axis=0)
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        
+        # Level-synchronous walk: every (row, tree) pair advances one level per step
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            if self.is_leaf[nodes].all():
+                break
+        return nodes
+    
+    def predict_trees(self, X) -> np.ndarray:
+        """Per-tree predictions, shape (n_rows, n_trees)"""
+        return self.value[self.apply(X)]
+    
+    def predict(self, X) -> np.ndarray:
+        """Forest mean, accumulated tree by tree in the same order as sklearn"""
+        return self.mean_of(self.predict_trees(X))
+    
+    def contributions(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Split each row's prediction into per-feature contributions (Saabas)
+        
+        Walking down a tree, every split moves the running estimate from the
+        node's mean to the child's; that change is credited to the split's
+        feature. Averaged over trees, bias + contributions.sum(axis=1) equals
+        predict(X). All (row, tree) paths advance together, level by level, as
+        in apply(); leaves loop onto themselves and add nothing.
+        
+        Returns:
+            (bias, contributions): the forest's mean root value per row, shape
+            (n_rows,), and the contribution of each feature, shape (n_rows, n_features)
+        """
+        X = self._prepare(X)
+        n_rows = X.shape[0]
+        nodes = np.repeat(self.roots[np.newaxis, :], n_rows, axis=0)
+        rows = np.arange(n_rows)[:, np.newaxis]
+        cells = rows * self.n_features  # Flat (row, feature) index base
+        totals = np.zeros(n_rows * self.n_features, dtype=np.float64)
+        values = self.value[nodes]
+        
+        for _ in range(self.max_depth):
+            features = self.feature[nodes]
+            go_left = X[rows, features] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            child_values = self.value[nodes]
+            totals += np.bincount((cells + features).ravel(), weights=(child_values - values).ravel(),
+                                  minlength=len(totals))
+            values = child_values
+            if self.is_leaf[nodes].all():
+                break
+        
+        bias = np.full(n_rows, self.value[self.roots].mean())
+        return bias, totals.reshape(n_rows, self.n_features) / self.n_trees
+    
+    @staticmethod
+    def mean_of(per_tree: np.ndarray) -> np.ndarray:
+        """Mean over the tree axis, summed in tree order so it matches sklearn bit for bit"""
+        return np.cumsum(per_tree, axis=1)[:, -1] / per_tree.shape[1]
+    
+    def predict_trees_progressive(self, X, chunk_size: int = 10, tolerance: Optional[float] = None,
+                                  deadline: Optional[float] = None) -> np.ndarray:
+        """
+        Per-tree predictions for a prefix of the forest, evaluated chunk by chunk
+        
+        After each chunk the running mean and variance of every row are updated.
+        Evaluation stops once every row's standard error of the mean is within
+        tolerance, or before a chunk that would run past deadline (a
+        time.perf_counter() value). At least chunk_size trees are evaluated.
+        
+        Each chunk costs one walk of max_depth levels however few trees it
+        holds, so chunks double in size while the tolerance is being checked,
+        and without a tolerance the rest of the forest runs in one chunk. Either
+        way a chunk is cut to the number of trees the remaining time allows at
+        the per-tree cost measured so far.
+        
+        Returns:
+            np.ndarray: (n_rows, trees_used) predictions of the trees that ran
+        """
+        X = self._prepare(X)
+        started = time.perf_counter()
+        step = max(1, int(chunk_size))
+        chunks = []
+        count, mean, m2 = 0, None, None
+        
+        while count < self.n_trees:
+            per_tree = self.value[self.apply(X, self.roots[count:count + step])]
+            chunks.append(per_tree)
+            
+            # Merge the chunk's statistics into the running ones (Chan et al.)
+            n = per_tree.shape[1]
+            chunk_mean = per_tree.mean(axis=1)
+            chunk_m2 = ((per_tree - chunk_mean[:, np.newaxis]) ** 2).sum(axis=1)
+            if mean is None:
+                mean, m2 = chunk_mean, chunk_m2
+            else:
+                delta = chunk_mean - mean
+                mean = mean + delta * n / (count + n)
+                m2 = m2 + chunk_m2 + delta ** 2 * count * n / (count + n)
+            count += n
+            
+            if count >= self.n_trees:
+                break
+            if tolerance is not None and count > 1:
+                standard_error = np.sqrt(m2 / (count - 1) / count)
+                if standard_error.max() <= tolerance:
+                    break
+            
+            step = step * 2 if tolerance is not None else self.n_trees - count
+            if deadline is not None:
+                now = time.perf_counter()
+                seconds_per_tree = (now - started) / count
+                step = min(step, int((deadline - now) / seconds_per_tree))
+                if step < 1:
+                    break
+        
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks, axis=1)
+    
+    def sample_inputs(self, n_rows: int, seed: int = 0) -> np.ndarray:
+        """Synthetic rows that sit on and around split thresholds, for parity checks"""
+        rng = np.random.default_rng(seed)
+        X = np.zeros((n_rows, self.n_features), dtype=np.float32)
+        splits = ~self.is_leaf
+        for f in range(self.n_features):
+            thresholds = self.threshold[splits & (self.feature == f)]
+            if len(thresholds) == 0:
+                continue
+            picks = rng.choice(thresholds, size=n_rows).astype(np.float32)
+            nudges = rng.integers(-1, 2, size=n_rows)
+            X[:, f] = np.where(nudges < 0, np.nextafter(picks, np.float32(-np.inf)),
+                               np.where(nudges > 0, np.nextafter(picks, np.float32(np.inf)), picks))
+        return X
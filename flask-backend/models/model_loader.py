@@ -1,13 +1,34 @@
 import joblib
+import hashlib
+import math
 import json
 import os
+import time
 import logging
 import pandas as pd
 import numpy as np
-from typing import Optional, List, Dict, Any
+import warnings
+from typing import Optional, List, Dict, Any, Tuple, Union
+
+from models.forest_engine import CompiledForest
+from models.prediction_table import PredictionLookupTable
+from utils.metrics import metrics
+from utils.preprocessing import schema_fingerprint
 
 logger = logging.getLogger(__name__)
 
+# Feature matrices arrive as plain arrays in the model's feature order, which is
+# checked against the model's fitted feature names once at load time
+warnings.filterwarnings('ignore', message='X does not have valid feature names', category=UserWarning)
+
+def file_sha256(path: str) -> str:
+    """Content hash of an artifact file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 class ModelLoader:
     """Enhanced model loader with proper feature validation"""
     
@@ -17,11 +38,15 @@ class ModelLoader:
         self.feature_names = None
         self.is_loaded = False
         self.config = config or {}
+        self.compiled_forest = None
+        self.prediction_table = None
+        self._schema_dtypes = {}
         
         # Model metadata
         self.model_version = None
         self.model_type = None
         self.training_accuracy = None
+        self.model_hash = None
         
         logger.info("ModelLoader initialized")
     
@@ -47,6 +72,7 @@ class ModelLoader:
                 self.model = joblib.load(model_path)
                 logger.info(f"Model loaded successfully: {type(self.model).__name__}")
                 self.model_type = type(self.model).__name__
+                self.model_hash = file_sha256(model_path)
             except Exception as e:
                 logger.error(f"Failed to load model: {str(e)}")
                 return False
@@ -76,6 +102,28 @@ class ModelLoader:
                 logger.error(f"Feature names file not found: {feature_names_path}")
                 return False
             
+            # Arrays are passed without column names, so the order must match the fit
+            fitted_names = getattr(self.model, 'feature_names_in_', None)
+            if fitted_names is not None and list(fitted_names) != list(self.feature_names):
+                logger.error("Model was fitted with a different feature order than feature_names.json")
+                return False
+            
+            # Feature matrices tagged with one of these fingerprints skip the per-call name checks
+            self._schema_dtypes = {
+                schema_fingerprint(self.feature_names, dtype): np.dtype(dtype)
+                for dtype in (np.float32, np.float64)
+            }
+            
+            # Flatten tree ensembles for the pure-NumPy inference engine
+            self.compiled_forest = None
+            if self.config.get('INFERENCE_ENGINE', 'compiled') == 'compiled':
+                self.compiled_forest = self._compile_forest()
+            
+            # Opt-in precomputed lookup table, consulted before the forest (approximate, see get_model_info)
+            self.prediction_table = None
+            if self.compiled_forest is not None and self.config.get('PREDICTION_TABLE_ENABLED', False):
+                self._load_prediction_table()
+            
             # Set model metadata
             self.model_version = self.config.get('MODEL_VERSION', '1.0.0')
             self.training_accuracy = self.config.get('MODEL_ACCURACY', 0.7336)
@@ -100,8 +148,89 @@ class ModelLoader:
             logger.error(f"Unexpected error loading model: {str(e)}")
             return False
     
-    def validate_features(self, features_df: pd.DataFrame) -> bool:
-        """Validate that input features match model expectations"""
+    def _compile_forest(self) -> Optional[CompiledForest]:
+        """Compile the loaded forest and confirm it reproduces the model's predictions"""
+        if self.scaler is not None or not CompiledForest.supports(self.model):
+            logger.info(f"{self.model_type} is not a compilable forest - using sklearn inference")
+            return None
+        
+        try:
+            # Reuse the memory-mapped bundle when it matches this model file
+            bundle_path = self.config.get('COMPILED_FOREST_PATH')
+            compiled = CompiledForest.load(bundle_path, model_hash=self.model_hash) if bundle_path else None
+            if compiled is None:
+                compiled = CompiledForest.from_sklearn(self.model)
+                if bundle_path:
+                    compiled = self._save_compiled_forest(compiled, bundle_path)
+            
+            # Parity check on rows that straddle the split thresholds
+            sample = compiled.sample_inputs(256)
+            expected = self.model.predict(sample)
+            actual = compiled.predict(sample)
+            if not np.allclose(actual, expected, rtol=1e-12, atol=0):
+                max_diff = float(np.abs(actual - expected).max())
+                logger.warning(f"Compiled forest disagrees with sklearn (max diff {max_diff}) - using sklearn inference")
+                return None
+            
+            logger.info("Compiled forest inference engine enabled")
+            return compiled
+        except Exception as e:
+            logger.warning(f"Failed to compile forest - using sklearn inference: {str(e)}")
+            return None
+    
+    def _save_compiled_forest(self, compiled: CompiledForest, bundle_path: str) -> CompiledForest:
+        """Persist a freshly compiled forest and switch to the memory-mapped copy"""
+        try:
+            compiled.save(bundle_path, model_hash=self.model_hash)
+            return CompiledForest.load(bundle_path, model_hash=self.model_hash) or compiled
+        except Exception as e:
+            logger.warning(f"Could not save compiled forest bundle (using in-memory copy): {str(e)}")
+            return compiled
+    
+    @property
+    def inference_engine(self) -> str:
+        """Name of the engine serving predictions"""
+        return 'compiled' if self.compiled_forest is not None else 'sklearn'
+    
+    @property
+    def input_dtype(self):
+        """Dtype the model consumes natively (tree ensembles work in float32)"""
+        if self.scaler is None and hasattr(self.model, 'estimators_'):
+            return np.float32
+        return np.float64
+    
+    def accepts_schema(self, schema: Optional[str]) -> bool:
+        """Whether matrices with this schema fingerprint match the model's feature order"""
+        return schema in self._schema_dtypes
+    
+    def validate_features(self, features: Union[pd.DataFrame, np.ndarray],
+                          schema: Optional[str] = None) -> bool:
+        """
+        Validate that input features match model expectations
+        
+        Arrays tagged with a schema fingerprint accepted at load time only get a
+        single finiteness pass; everything else (and any failure) goes through the
+        full check with a detailed report. An array tagged with an unknown schema
+        is rejected: its columns carry no names, so their order cannot be checked.
+        """
+        if schema is not None and self.is_loaded:
+            dtype = self._schema_dtypes.get(schema)
+            if dtype is None:
+                if isinstance(features, np.ndarray):
+                    logger.error("Feature schema fingerprint not recognized - column order cannot be verified")
+                    return False
+                logger.warning("Feature schema fingerprint not recognized - running full validation")
+            elif (isinstance(features, np.ndarray) and features.dtype == dtype
+                    and features.ndim == 2 and features.shape[1] == len(self.feature_names)):
+                # One reduction, no boolean temporaries: any NaN/inf makes the sum non-finite.
+                # An overflowing sum just falls through to the full check below
+                if math.isfinite(features.sum()):
+                    return True
+        
+        return self._validate_features_full(features)
+    
+    def _validate_features_full(self, features: Union[pd.DataFrame, np.ndarray]) -> bool:
+        """Column-by-column validation with diagnostics for mismatches"""
         try:
             if not self.is_loaded:
                 logger.error("Model not loaded - cannot validate features")
@@ -113,39 +242,42 @@ class ModelLoader:
             
             # Check feature count
             expected_count = len(self.feature_names)
-            actual_count = features_df.shape[1]
+            actual_count = features.shape[1] if features.ndim == 2 else -1
             
             if actual_count != expected_count:
                 logger.error(f"Feature count mismatch: expected {expected_count}, got {actual_count}")
                 return False
             
-            # Check feature names and order
-            expected_features = self.feature_names
-            actual_features = list(features_df.columns)
-            
-            if actual_features != expected_features:
-                logger.error("Feature names or order mismatch")
-                logger.error(f"Expected: {expected_features[:5]}... (showing first 5)")
-                logger.error(f"Actual: {actual_features[:5]}... (showing first 5)")
-                
-                # Try to identify specific mismatches
-                missing_features = set(expected_features) - set(actual_features)
-                extra_features = set(actual_features) - set(expected_features)
+            if isinstance(features, pd.DataFrame):
+                # Check feature names and order
+                expected_features = self.feature_names
+                actual_features = list(features.columns)
                 
-                if missing_features:
-                    logger.error(f"Missing features: {missing_features}")
-                if extra_features:
-                    logger.error(f"Extra features: {extra_features}")
+                if actual_features != expected_features:
+                    logger.error("Feature names or order mismatch")
+                    logger.error(f"Expected: {expected_features[:5]}... (showing first 5)")
+                    logger.error(f"Actual: {actual_features[:5]}... (showing first 5)")
+                    
+                    # Try to identify specific mismatches
+                    missing_features = set(expected_features) - set(actual_features)
+                    extra_features = set(actual_features) - set(expected_features)
+                    
+                    if missing_features:
+                        logger.error(f"Missing features: {missing_features}")
+                    if extra_features:
+                        logger.error(f"Extra features: {extra_features}")
+                    
+                    return False
                 
-                return False
-            
-            # Check for any NaN or infinite values
-            if features_df.isnull().any().any():
-                logger.error("Features contain NaN values")
-                return False
+                values = features.to_numpy(dtype=np.float64)
+            else:
+                values = np.asarray(features, dtype=np.float64)
             
-            if np.isinf(features_df.values).any():
-                logger.error("Features contain infinite values")
+            # Check for any NaN or infinite values, naming the offending columns
+            finite = np.isfinite(values)
+            if not finite.all():
+                bad_columns = [self.feature_names[i] for i in np.flatnonzero(~finite.all(axis=0))]
+                logger.error(f"Features contain NaN or infinite values in: {bad_columns}")
                 return False
             
             logger.info("Feature validation passed")
@@ -155,26 +287,22 @@ class ModelLoader:
             logger.error(f"Error validating features: {str(e)}")
             return False
     
-    def predict(self, features_df: pd.DataFrame) -> Optional[float]:
+    def predict(self, features_df: Union[pd.DataFrame, np.ndarray],
+                schema: Optional[str] = None) -> Optional[float]:
         """Make a prediction with proper feature validation"""
         try:
             if not self.is_loaded:
                 raise ValueError("Model not loaded")
             
             # Validate features first
-            if not self.validate_features(features_df):
+            with metrics.stage('feature_validation'):
+                valid = self.validate_features(features_df, schema=schema)
+            if not valid:
                 raise ValueError("Feature validation failed")
             
             # Make prediction
-            if self.scaler is not None:
-                # Scale features if scaler is available
-                logger.info("Scaling features before prediction")
-                features_scaled = self.scaler.transform(features_df)
-                prediction = self.model.predict(features_scaled)[0]
-            else:
-                # Use raw features (typical for Random Forest)
-                logger.info("Using raw features for prediction")
-                prediction = self.model.predict(features_df)[0]
+            with metrics.stage('inference'):
+                prediction = self._predict_rows(features_df)[0]
             
             logger.info(f"Prediction made successfully: ${prediction:,.0f}")
             return float(prediction)
@@ -183,6 +311,201 @@ class ModelLoader:
             logger.error(f"Prediction error: {str(e)}")
             raise
     
+    def predict_batch(self, features_df: Union[pd.DataFrame, np.ndarray],
+                      schema: Optional[str] = None) -> np.ndarray:
+        """Make predictions for many rows with a single model call"""
+        try:
+            if not self.is_loaded:
+                raise ValueError("Model not loaded")
+            
+            # Validate the whole feature matrix once
+            with metrics.stage('feature_validation'):
+                valid = self.validate_features(features_df, schema=schema)
+            if not valid:
+                raise ValueError("Feature validation failed")
+            
+            with metrics.stage('inference'):
+                predictions = self._predict_rows(features_df)
+            
+            logger.info(f"Batch prediction made successfully for {len(predictions)} rows")
+            return np.asarray(predictions, dtype=np.float64)
+        
+        except Exception as e:
+            logger.error(f"Batch prediction error: {str(e)}")
+            raise
+    
+    @property
+    def supports_tree_quantiles(self) -> bool:
+        """Whether per-estimator predictions are available for interval estimates"""
+        return self.compiled_forest is not None or (
+            self.model is not None and CompiledForest.supports(self.model)
+        )
+    
+    def predict_distribution(self, features_df: Union[pd.DataFrame, np.ndarray],
+                             quantiles=(0.1, 0.5, 0.9),
+                             schema: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Forest mean plus quantiles of the individual trees' predictions
+        
+        Returns:
+            (mean, spread): mean of shape (n,) and quantiles of shape (n, len(quantiles))
+        """
+        try:
+            if not self.is_loaded:
+                raise ValueError("Model not loaded")
+            if not self.supports_tree_quantiles:
+                raise ValueError(f"{self.model_type} does not expose per-estimator predictions")
+            
+            with metrics.stage('feature_validation'):
+                valid = self.validate_features(features_df, schema=schema)
+            if not valid:
+                raise ValueError("Feature validation failed")
+            
+            with metrics.stage('inference'):
+                per_tree = self._predict_trees(features_df)
+                mean = CompiledForest.mean_of(per_tree)
+                spread = np.quantile(per_tree, quantiles, axis=1).T
+            
+            logger.info(f"Distribution prediction made successfully for {len(mean)} rows")
+            return mean, spread
+        
+        except Exception as e:
+            logger.error(f"Distribution prediction error: {str(e)}")
+            raise
+    
+    @property
+    def n_trees(self) -> Optional[int]:
+        """Number of trees in the forest, or None for other model types"""
+        if self.compiled_forest is not None:
+            return self.compiled_forest.n_trees
+        estimators = getattr(self.model, 'estimators_', None)
+        return len(estimators) if estimators is not None else None
+    
+    def predict_anytime(self, features_df: Union[pd.DataFrame, np.ndarray],
+                        budget_ms: Optional[float] = None, tolerance: Optional[float] = None,
+                        quantiles=None, schema: Optional[str] = None
+                        ) -> Tuple[np.ndarray, Optional[np.ndarray], int]:
+        """
+        Evaluate the forest in chunks of trees, stopping early once the estimate is stable
+        
+        Evaluation stops when every row's standard error of the mean is within
+        tolerance (in salary units) or when budget_ms has elapsed, whichever
+        comes first. Without a compiled forest every tree is evaluated.
+        
+        Returns:
+            (mean, spread, trees_used): spread holds the requested quantiles of the
+            evaluated trees' predictions, or None if quantiles is None
+        """
+        try:
+            if not self.is_loaded:
+                raise ValueError("Model not loaded")
+            if not self.supports_tree_quantiles:
+                raise ValueError(f"{self.model_type} does not support progressive evaluation")
+            
+            deadline = time.perf_counter() + budget_ms / 1000 if budget_ms is not None else None
+            
+            with metrics.stage('feature_validation'):
+                valid = self.validate_features(features_df, schema=schema)
+            if not valid:
+                raise ValueError("Feature validation failed")
+            
+            with metrics.stage('inference'):
+                per_tree = self._predict_trees(features_df, tolerance=tolerance, deadline=deadline)
+                mean = CompiledForest.mean_of(per_tree)
+                spread = np.quantile(per_tree, quantiles, axis=1).T if quantiles is not None else None
+            
+            logger.info(f"Anytime prediction made for {len(mean)} rows "
+                        f"using {per_tree.shape[1]}/{self.n_trees} trees")
+            return mean, spread, per_tree.shape[1]
+        
+        except Exception as e:
+            logger.error(f"Anytime prediction error: {str(e)}")
+            raise
+    
+    @property
+    def supports_contributions(self) -> bool:
+        """Whether predictions can be decomposed into per-feature contributions"""
+        return self.compiled_forest is not None
+    
+    def explain(self, features: Union[pd.DataFrame, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-feature contributions to the full forest's prediction for already-validated rows
+        
+        Returns:
+            (bias, contributions): bias (n_rows,) plus the row sums of
+            contributions (n_rows, n_features) give the forest's prediction
+        """
+        if not self.supports_contributions:
+            raise ValueError(f"{self.model_type} does not support feature contributions")
+        return self.compiled_forest.contributions(features)
+    
+    def _predict_trees(self, features: Union[pd.DataFrame, np.ndarray],
+                       tolerance: Optional[float] = None, deadline: Optional[float] = None) -> np.ndarray:
+        """Per-tree predictions, shape (n_rows, n_trees), or fewer trees if evaluated progressively"""
+        if self.scaler is not None:
+            features = self.scaler.transform(features)
+        
+        if self.compiled_forest is not None:
+            if tolerance is not None or deadline is not None:
+                return self.compiled_forest.predict_trees_progressive(
+                    features,
+                    chunk_size=self.config.get('ANYTIME_CHUNK_TREES', 10),
+                    tolerance=tolerance,
+                    deadline=deadline
+                )
+            # Every tree in one level-synchronous pass over the whole batch
+            return self.compiled_forest.predict_trees(features)
+        
+        # Uncompiled forests (e.g. INFERENCE_ENGINE=sklearn) ask each estimator
+        X = np.asarray(features, dtype=np.float32)
+        return np.column_stack([tree.predict(X) for tree in self.model.estimators_])
+    
+    def _load_prediction_table(self):
+        """
+        Load the lookup table, unless the API would never read it
+        
+        Tree-interval and anytime serving take their point estimates from the
+        per-tree predictions, so only predict_batch callers (score.py) would
+        consult the table and disagree with the API.
+        """
+        if (self.config.get('PREDICTION_INTERVAL_MODE', 'trees') == 'trees'
+                or self.config.get('ANYTIME_EVALUATION_ENABLED', False)):
+            logger.warning("Prediction table not loaded: tree-interval and anytime serving read the forest's "
+                           "per-tree predictions, so set PREDICTION_INTERVAL_MODE=mae to serve from the table")
+            return
+        self.prediction_table = PredictionLookupTable.load(
+            self.config.get('PREDICTION_TABLE_PATH', 'prediction_table.npy'),
+            model_hash=self.model_hash,
+            feature_names=self.feature_names
+        )
+    
+    def _predict_rows(self, features: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        """Run the active inference engine over already-validated rows"""
+        if self.scaler is not None:
+            # Scale features if scaler is available
+            logger.info("Scaling features before prediction")
+            features = self.scaler.transform(features)
+        
+        # Answer what we can from the lookup table, then run the forest on the rest
+        if self.prediction_table is not None:
+            predictions, hits = self.prediction_table.lookup(features)
+            if hits.all():
+                return predictions
+            misses = np.flatnonzero(~hits)
+            predictions[misses] = self._predict_forest(np.asarray(features, dtype=np.float64)[misses])
+            return predictions
+        
+        return self._predict_forest(features)
+    
+    def _predict_forest(self, features: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        """Evaluate the forest itself"""
+        # Small batches skip sklearn's per-call overhead; large ones use its thread pool
+        max_rows = self.config.get('COMPILED_FOREST_MAX_ROWS', 64)
+        if self.compiled_forest is not None and len(features) <= max_rows:
+            return self.compiled_forest.predict(features)
+        
+        return np.asarray(self.model.predict(features), dtype=np.float64)
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Get comprehensive model information"""
         if not self.is_loaded:
@@ -194,10 +517,23 @@ class ModelLoader:
             'training_accuracy': self.training_accuracy,
             'is_loaded': self.is_loaded,
             'has_scaler': self.scaler is not None,
+            'inference_engine': self.inference_engine,
+            'model_hash': self.model_hash,
             'feature_count': len(self.feature_names) if self.feature_names else 0,
             'feature_names': self.feature_names
         }
         
+        if self.prediction_table is not None:
+            info['prediction_table'] = {
+                'shape': list(self.prediction_table.table.shape),
+                'size_mb': round(self.prediction_table.nbytes / 1e6, 1),
+                # Bucketed axes share one table cell across different forest outputs
+                'exact': False,
+                'approximate_features': [dim['name'] for dim in self.prediction_table.dims
+                                         if dim['kind'] == 'bucketed'],
+                'accuracy': self.prediction_table.meta.get('accuracy')
+            }
+        
         # Add model-specific information
         if hasattr(self.model, 'n_estimators'):
             info['n_estimators'] = self.model.n_estimators
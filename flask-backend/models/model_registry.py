@@ -0,0 +1,307 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from models.model_loader import ModelLoader
+
+logger = logging.getLogger(__name__)
+
+# Artifact settings that make up one model version
+ARTIFACT_KEYS = ('MODEL_PATH', 'SCALER_PATH', 'FEATURE_NAMES_PATH')
+# Settings of the optional shadow model, by the artifact setting they stand in for
+SHADOW_ARTIFACT_KEYS = {
+    'MODEL_PATH': 'SHADOW_MODEL_PATH',
+    'SCALER_PATH': 'SHADOW_SCALER_PATH',
+    'FEATURE_NAMES_PATH': 'SHADOW_FEATURE_NAMES_PATH'
+}
+
+class ModelVersion:
+    """One loaded artifact set and the serving state derived from it
+    
+    A version is never modified after it is activated; requests take a
+    reference to the active version once and use it until they finish.
+    """
+    
+    def __init__(self, loader: ModelLoader, paths: Dict[str, str], signature: Tuple):
+        self.loader = loader
+        self.paths = paths
+        self.signature = signature
+        self.state: Dict[str, Any] = {}
+        self.loaded_at = datetime.utcnow().isoformat()
+        self.activated_at = None
+        self.warmup_ms = None
+    
+    @property
+    def version(self) -> Optional[str]:
+        """Configured model version plus a short content hash, e.g. '1.0.0+5fcb2e732e5f'"""
+        if self.loader.model_hash is None:
+            return None
+        return f"{self.loader.model_version}+{self.loader.model_hash[:12]}"
+    
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'model_hash': self.loader.model_hash,
+            'model_type': self.loader.model_type,
+            'model_path': self.paths.get('MODEL_PATH'),
+            'loaded_at': self.loaded_at,
+            'activated_at': self.activated_at,
+            'warmup_ms': self.warmup_ms
+        }
+
+class ModelRegistry:
+    """Holds the active model version and swaps in new artifacts without a restart
+    
+    The registry watches MODEL_PATH / SCALER_PATH / FEATURE_NAMES_PATH, or, when
+    MODEL_REGISTRY_DIR is set, the newest version directory inside it (names
+    sorted, e.g. 2024-06-01 or v0003, each holding files named like the
+    configured ones). When the artifacts change and have stopped changing for
+    one poll, a background thread loads them into a new ModelLoader, builds the
+    serving state with prepare(), runs warmup() and only then replaces the
+    active version. Artifacts that fail any step are skipped until they change
+    again, and the current version keeps serving.
+    
+    Threads do not survive fork, so each worker process starts its own watcher
+    on first use (ensure_watcher()).
+    
+    A shadow model (SHADOW_MODEL_PATH) can be loaded next to the active one
+    with load_shadow(); it is never served, only compared against it.
+    """
+    
+    def __init__(self, config: Dict[str, Any],
+                 prepare: Optional[Callable[['ModelVersion'], Dict[str, Any]]] = None,
+                 warmup: Optional[Callable[[ModelVersion], None]] = None,
+                 retire: Optional[Callable[[ModelVersion], None]] = None):
+        self.config = config
+        self.prepare = prepare
+        self.warmup = warmup
+        self.retire = retire
+        self.watch_interval = float(config.get('MODEL_WATCH_INTERVAL', 5.0))
+        self.registry_dir = config.get('MODEL_REGISTRY_DIR')
+        
+        self._active: Optional[ModelVersion] = None
+        self.shadow: Optional[ModelVersion] = None
+        self.previous: Optional[Dict[str, Any]] = None
+        self._reload_lock = threading.Lock()
+        self._watch_lock = threading.Lock()
+        self._watcher = None
+        self._pid = None
+        self._pending_signature = None
+        self._rejected_signature = None
+        
+        # Counters
+        self.swaps = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_check = None
+    
+    @property
+    def active(self) -> Optional[ModelVersion]:
+        return self._active
+    
+    # ------------------------------------------------------------------
+    # Artifacts
+    # ------------------------------------------------------------------
+    
+    def artifact_paths(self) -> Dict[str, str]:
+        """Paths of the artifact set that should be serving"""
+        paths = {key: self.config.get(key) for key in ARTIFACT_KEYS}
+        if not self.registry_dir or not os.path.isdir(self.registry_dir):
+            return paths
+        
+        model_file = os.path.basename(paths['MODEL_PATH'])
+        versions = sorted(
+            entry.path for entry in os.scandir(self.registry_dir)
+            if entry.is_dir() and os.path.exists(os.path.join(entry.path, model_file))
+        )
+        if not versions:
+            return paths
+        
+        latest = versions[-1]
+        versioned = {key: os.path.join(latest, os.path.basename(path)) for key, path in paths.items()}
+        # A version may reuse the configured feature names
+        if not os.path.exists(versioned['FEATURE_NAMES_PATH']):
+            versioned['FEATURE_NAMES_PATH'] = paths['FEATURE_NAMES_PATH']
+        return versioned
+    
+    @staticmethod
+    def signature(paths: Dict[str, str]) -> Tuple:
+        """(path, size, mtime) of every artifact; missing files are (path, None, None)"""
+        entries = []
+        for key in ARTIFACT_KEYS:
+            path = paths[key]
+            try:
+                stat = os.stat(path)
+                entries.append((path, stat.st_size, stat.st_mtime_ns))
+            except (OSError, TypeError):
+                entries.append((path, None, None))
+        return tuple(entries)
+    
+    # ------------------------------------------------------------------
+    # Loading and swapping
+    # ------------------------------------------------------------------
+    
+    def _load(self, paths: Dict[str, str], require_loaded: bool = True) -> ModelVersion:
+        """Load and prepare an artifact set without touching the active version"""
+        signature = self.signature(paths)
+        loader = ModelLoader(config={**self.config, **paths})
+        if not loader.load_model() and require_loaded:
+            raise ValueError("model artifacts failed to load")
+        version = ModelVersion(loader, paths, signature)
+        if self.prepare is not None:
+            try:
+                version.state = self.prepare(version)
+            except Exception as e:
+                if require_loaded:
+                    raise
+                # At startup a rejected model still becomes active, unloaded, and serves 503s
+                logger.error(f"Model artifacts rejected: {str(e)}")
+                loader.is_loaded = False
+                version.state = self.prepare(version)
+        return version
+    
+    def _warm(self, version: ModelVersion):
+        if self.warmup is None or not version.loader.is_loaded:
+            return
+        started = time.perf_counter()
+        self.warmup(version)
+        version.warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+    
+    def load_initial(self) -> ModelVersion:
+        """Load the configured artifacts at startup; a failed or rejected load still becomes active (and serves 503s)"""
+        version = self._load(self.artifact_paths(), require_loaded=False)
+        try:
+            self._warm(version)
+        except Exception as e:
+            logger.error(f"Model warmup failed: {str(e)}")
+        self._activate(version)
+        return version
+    
+    def reload(self, paths: Optional[Dict[str, str]] = None) -> bool:
+        """
+        Load, validate and warm an artifact set, then make it the active version
+        
+        Returns:
+            bool: True if the new version is now active
+        """
+        paths = paths or self.artifact_paths()
+        with self._reload_lock:
+            started = time.perf_counter()
+            logger.info(f"Loading model artifacts from {paths['MODEL_PATH']}")
+            version = None
+            try:
+                version = self._load(paths)
+                self._warm(version)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                self._rejected_signature = self.signature(paths)
+                logger.error(f"Model reload rejected, keeping {self._active.version if self._active else None}: {str(e)}")
+                if version is not None:
+                    self._retire(version)
+                return False
+            
+            previous = self._active
+            self._activate(version)
+            self.swaps += 1
+            self.last_error = None
+            logger.info(f"Model {version.version} active after {time.perf_counter() - started:.2f}s "
+                        f"(was {previous.version if previous else None})")
+            if previous is not None:
+                self._retire(previous)
+            return True
+    
+    def load_shadow(self) -> Optional[ModelVersion]:
+        """Load the configured shadow model, if any; failures are logged and leave no shadow"""
+        if not self.config.get('SHADOW_MODEL_PATH'):
+            return None
+        paths = {key: self.config.get(shadow_key) or (self.config.get(key) if key == 'FEATURE_NAMES_PATH' else '')
+                 for key, shadow_key in SHADOW_ARTIFACT_KEYS.items()}
+        # Compiled in memory only: the bundle and prediction table on disk belong to the served model
+        loader = ModelLoader(config={**self.config, **paths, 'COMPILED_FOREST_PATH': None,
+                                     'PREDICTION_TABLE_ENABLED': False})
+        if not loader.load_model():
+            logger.error(f"Shadow model {paths['MODEL_PATH']} failed to load - shadow scoring disabled")
+            return None
+        self.shadow = ModelVersion(loader, paths, self.signature(paths))
+        self.shadow.activated_at = self.shadow.loaded_at
+        logger.info(f"Shadow model {self.shadow.version} loaded from {paths['MODEL_PATH']}")
+        return self.shadow
+    
+    def _retire(self, version: ModelVersion):
+        """Release a version's background resources (requests still holding it keep working)"""
+        if self.retire is None:
+            return
+        try:
+            self.retire(version)
+        except Exception as e:
+            logger.warning(f"Failed to retire model {version.version}: {str(e)}")
+    
+    def _activate(self, version: ModelVersion):
+        version.activated_at = datetime.utcnow().isoformat()
+        if self._active is not None:
+            self.previous = self._active.describe()
+        # Single reference assignment: requests see either the old version or the new one
+        self._active = version
+    
+    def check_for_update(self) -> bool:
+        """Reload if the artifacts changed and have been stable since the previous check"""
+        self.last_check = datetime.utcnow().isoformat()
+        paths = self.artifact_paths()
+        signature = self.signature(paths)
+        active = self._active
+        if active is not None and signature == active.signature:
+            self._pending_signature = None
+            return False
+        if signature == self._rejected_signature or signature[0][1] is None:
+            return False
+        
+        # Files still being copied keep changing; wait for one unchanged poll
+        if signature != self._pending_signature:
+            self._pending_signature = signature
+            return False
+        self._pending_signature = None
+        return self.reload(paths)
+    
+    # ------------------------------------------------------------------
+    # Watcher
+    # ------------------------------------------------------------------
+    
+    def ensure_watcher(self):
+        """Start the polling thread lazily, and again in each forked worker"""
+        if self.watch_interval <= 0:
+            return
+        if self._watcher is not None and self._pid == os.getpid() and self._watcher.is_alive():
+            return
+        with self._watch_lock:
+            if self._watcher is not None and self._pid == os.getpid() and self._watcher.is_alive():
+                return
+            self._pid = os.getpid()
+            self._watcher = threading.Thread(target=self._watch, name='model-registry', daemon=True)
+            self._watcher.start()
+            logger.info(f"Watching model artifacts every {self.watch_interval:g}s")
+    
+    def _watch(self):
+        while True:
+            time.sleep(self.watch_interval)
+            try:
+                self.check_for_update()
+            except Exception as e:
+                logger.error(f"Model artifact check failed: {str(e)}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'active': self._active.describe() if self._active else None,
+            'previous': self.previous,
+            'shadow': self.shadow.describe() if self.shadow else None,
+            'watching': self._watcher is not None and self._pid == os.getpid() and self._watcher.is_alive(),
+            'watch_interval_seconds': self.watch_interval,
+            'registry_dir': self.registry_dir,
+            'swaps': self.swaps,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'last_check': self.last_check
+        }
@@ -0,0 +1,137 @@
+import logging
+import time
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Columns of the raw postings CSV returned with each neighbor, keyed by response field
+POSTING_FIELDS = {
+    'jobTitle': 'job_title',
+    'experienceLevel': 'experience_level',
+    'companyLocation': 'company_location',
+    'companySize': 'company_size',
+    'remoteRatio': 'remote_ratio',
+    'yearsExperience': 'years_experience',
+    'industry': 'industry'
+}
+
+class NeighborIndex:
+    """KD-tree over the standardized engineered features of the training postings
+    
+    Rows of the feature matrix line up with the salary target and, optionally,
+    with the raw postings CSV, so a query returns real postings and their
+    salaries. Queries are feature matrices from the preprocessor, in the
+    model's feature order; excluded columns are dropped before scaling.
+    """
+    
+    def __init__(self, X: np.ndarray, salaries: np.ndarray, feature_names: List[str],
+                 columns: Sequence[int], postings: Optional[pd.DataFrame] = None, leaf_size: int = 40):
+        started = time.perf_counter()
+        self.feature_names = list(feature_names)
+        self.columns = np.asarray(columns, dtype=np.intp)
+        
+        X = X[:, self.columns] if len(self.columns) != X.shape[1] else X
+        self.mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        # Constant columns cannot separate postings; leave them unscaled
+        self.scale = np.where(scale > 0, scale, 1.0)
+        scaled = X - self.mean
+        scaled /= self.scale
+        self.tree = KDTree(scaled, leaf_size=leaf_size)
+        
+        self.salaries = np.asarray(salaries, dtype=np.float64)
+        self.postings = postings
+        self.build_seconds = time.perf_counter() - started
+        
+        # Query timing
+        self.queries = 0
+        self.query_rows = 0
+        self.query_seconds = 0.0
+        
+        logger.info(f"Neighbor index built over {self.n_rows:,} postings x {len(self.columns)} features "
+                    f"in {self.build_seconds:.2f}s ({self.nbytes / 1e6:.1f} MB)")
+    
+    @classmethod
+    def from_files(cls, features_path: str, target_path: str, feature_names: List[str],
+                   postings_path: Optional[str] = None, excluded_features: Sequence[str] = (),
+                   leaf_size: int = 40) -> 'NeighborIndex':
+        """
+        Build from X_features_for_modeling.csv / y_target_for_modeling.csv
+        
+        The postings CSV is only attached when it has one row per feature row.
+        """
+        X = pd.read_csv(features_path)[feature_names].to_numpy(dtype=np.float64)
+        salaries = pd.read_csv(target_path).iloc[:, 0].to_numpy(dtype=np.float64)
+        if len(salaries) != len(X):
+            raise ValueError(f"{target_path} has {len(salaries)} rows, expected {len(X)}")
+        
+        postings = None
+        if postings_path:
+            raw = pd.read_csv(postings_path, usecols=lambda name: name in POSTING_FIELDS.values())
+            if len(raw) == len(X):
+                postings = raw
+            else:
+                logger.warning(f"{postings_path} has {len(raw)} rows, not {len(X)} - neighbors will omit posting details")
+        
+        columns = [i for i, name in enumerate(feature_names) if name not in set(excluded_features)]
+        return cls(X, salaries, feature_names, columns, postings, leaf_size)
+    
+    @property
+    def n_rows(self) -> int:
+        return len(self.salaries)
+    
+    @property
+    def nbytes(self) -> int:
+        """Tree arrays (including the scaled data it holds) plus the salaries"""
+        return sum(a.nbytes for a in self.tree.get_arrays()) + self.salaries.nbytes
+    
+    def query(self, features: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Distances and row indices of the k nearest postings, each of shape (n, k)"""
+        started = time.perf_counter()
+        X = np.asarray(features, dtype=np.float64)[:, self.columns]
+        distances, indices = self.tree.query((X - self.mean) / self.scale, k=min(k, self.n_rows))
+        
+        self.queries += 1
+        self.query_rows += len(X)
+        self.query_seconds += time.perf_counter() - started
+        return distances, indices
+    
+    def neighbors(self, features: np.ndarray, k: int = 10) -> List[List[Dict[str, Any]]]:
+        """The k nearest postings for each row, closest first"""
+        distances, indices = self.query(features, k)
+        
+        # Posting details for every neighbor in one positional take per column
+        details = {}
+        if self.postings is not None:
+            rows = self.postings.iloc[indices.ravel()]
+            details = {field: rows[column].tolist() for field, column in POSTING_FIELDS.items()
+                       if column in rows}
+        
+        results = []
+        for i, (row_distances, row_indices) in enumerate(zip(distances, indices)):
+            row_neighbors = []
+            for j, (distance, index) in enumerate(zip(row_distances, row_indices)):
+                neighbor = {
+                    'row': int(index),
+                    'distance': round(float(distance), 4),
+                    'salary': int(self.salaries[index])
+                }
+                position = i * indices.shape[1] + j
+                for field, values in details.items():
+                    neighbor[field] = values[position]
+                row_neighbors.append(neighbor)
+            results.append(row_neighbors)
+        return results
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'postings': self.n_rows,
+            'features': len(self.columns),
+            'memory_bytes': self.nbytes,
+            'build_seconds': round(self.build_seconds, 3),
+            'queries': self.queries,
+            'mean_query_ms': round(self.query_seconds / self.queries * 1000, 3) if self.queries else 0.0
+        }
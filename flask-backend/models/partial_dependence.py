@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+def feature_grid(column: np.ndarray, grid_resolution: int = 20,
+                 percentiles: tuple = (0.05, 0.95)) -> np.ndarray:
+    """
+    Values a feature is swept over
+    
+    Discrete columns (one-hot flags, ordinal codes) use every distinct value;
+    continuous ones use evenly spaced quantiles between the given percentiles,
+    so the grid follows the data rather than its outliers.
+    """
+    values = np.unique(column)
+    if len(values) <= grid_resolution:
+        return values
+    return np.unique(np.quantile(column, np.linspace(percentiles[0], percentiles[1], grid_resolution)))
+
+def compute_partial_dependence(predict: Callable[[np.ndarray], np.ndarray], background: np.ndarray,
+                               feature_names: List[str], grid_resolution: int = 20,
+                               ice_rows: int = 0, grid_source: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    Partial dependence (and ICE) curves for every feature
+    
+    For each feature the background sample is tiled once per grid value with that
+    column overwritten, and the whole (grid x sample) matrix goes through a single
+    predict call. The curve is the mean over the sample at each grid value; the
+    ICE curves are the per-row predictions of the first ice_rows sample rows.
+    
+    Args:
+        predict: maps a feature matrix to one prediction per row
+        background: sample rows, in feature_names order
+        grid_source: rows the grids are taken from (defaults to the sample)
+    """
+    background = np.asarray(background, dtype=np.float64)
+    grid_source = background if grid_source is None else np.asarray(grid_source, dtype=np.float64)
+    n_rows = len(background)
+    ice_rows = min(max(int(ice_rows), 0), n_rows)
+    
+    curves = {}
+    for column, name in enumerate(feature_names):
+        grid = feature_grid(grid_source[:, column], grid_resolution)
+        X = np.tile(background, (len(grid), 1))
+        X[:, column] = np.repeat(grid, n_rows)
+        predictions = np.asarray(predict(X), dtype=np.float64).reshape(len(grid), n_rows)
+        
+        curves[name] = {
+            'grid': [round(float(value), 6) for value in grid],
+            'average': [round(float(value), 2) for value in predictions.mean(axis=1)]
+        }
+        if ice_rows:
+            curves[name]['ice'] = np.rint(predictions[:, :ice_rows].T).astype(int).tolist()
+    return curves
+
+def build_partial_dependence(model_loader, features_path: str, sample_size: int = 500,
+                             grid_resolution: int = 20, ice_rows: int = 50, seed: int = 0) -> Dict[str, Any]:
+    """Curves for the loaded model over a random sample of the training feature matrix"""
+    started = time.perf_counter()
+    X = pd.read_csv(features_path)[model_loader.feature_names].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    sample = X[np.sort(rng.choice(len(X), size=min(sample_size, len(X)), replace=False))]
+    
+    curves = compute_partial_dependence(
+        model_loader.predict_batch, sample, model_loader.feature_names,
+        grid_resolution=grid_resolution, ice_rows=ice_rows, grid_source=X
+    )
+    seconds = time.perf_counter() - started
+    logger.info(f"Partial dependence computed for {len(curves)} features over {len(sample)} rows in {seconds:.1f}s")
+    return {
+        'model_hash': model_loader.model_hash,
+        'parameters': {
+            'sample_size': int(sample_size),
+            'grid_resolution': int(grid_resolution),
+            'ice_rows': int(ice_rows),
+            'seed': int(seed)
+        },
+        'background_rows': len(sample),
+        'computed_at': datetime.utcnow().isoformat(),
+        'compute_seconds': round(seconds, 2),
+        'features': curves
+    }
+
+class PartialDependenceStore:
+    """Partial dependence curves of one model, cached on disk and served pre-serialized
+    
+    The cache file is named after the model file hash, so a retrained model never
+    picks up stale curves. Responses are serialized once when the curves arrive;
+    a request then costs one dict lookup. Curves are computed on a background
+    thread of the process that created the store; forked workers pick up the
+    file that thread writes.
+    """
+    
+    def __init__(self, cache_dir: str, model_hash: str, parameters: Dict[str, int]):
+        self.cache_dir = Path(cache_dir)
+        self.model_hash = model_hash
+        self.parameters = dict(parameters)
+        self._lock = threading.Lock()
+        self._responses: Optional[Dict[Optional[str], Dict[bool, bytes]]] = None
+        self._thread = None
+        self._pid = None
+        self.error = None
+        self.loaded_at = None
+        self.compute_seconds = None
+    
+    @property
+    def path(self) -> Path:
+        return self.cache_dir / f"{self.model_hash[:16]}.json"
+    
+    @property
+    def status(self) -> str:
+        if self._responses is not None:
+            return 'ready'
+        if self.error is not None:
+            return 'failed'
+        return 'computing' if self._thread is not None else 'idle'
+    
+    @property
+    def features(self) -> List[str]:
+        return [name for name in (self._responses or {}) if name is not None]
+    
+    def load(self) -> bool:
+        """Use the cached curves for this model, if they exist and match the parameters"""
+        try:
+            with open(self.path, 'r') as f:
+                result = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Could not read partial dependence cache {self.path}: {str(e)}")
+            return False
+        
+        if result.get('model_hash') != self.model_hash or result.get('parameters') != self.parameters:
+            logger.info(f"Partial dependence cache {self.path} was built with other settings - recomputing")
+            return False
+        self._publish(result)
+        return True
+    
+    def save(self, result: Dict[str, Any]):
+        """Write atomically, so workers polling the file never read half of it"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f)
+        os.replace(tmp_path, self.path)
+    
+    def compute_async(self, compute: Callable[[], Dict[str, Any]]):
+        """Run compute() on a background thread, then save and publish its result"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self.error = None
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, args=(compute,),
+                                            name='partial-dependence', daemon=True)
+            self._thread.start()
+    
+    def _run(self, compute: Callable[[], Dict[str, Any]]):
+        try:
+            result = compute()
+            self.save(result)
+            self._publish(result)
+            logger.info(f"Partial dependence curves cached at {self.path}")
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Partial dependence computation failed: {str(e)}")
+    
+    def _publish(self, result: Dict[str, Any]):
+        """Serialize every response variant (all features or one, with or without ICE)"""
+        summary = {key: result.get(key) for key in
+                   ('model_hash', 'parameters', 'background_rows', 'computed_at')}
+        
+        def encode(data: Dict[str, Any]) -> bytes:
+            return json.dumps({'status': 'success', 'data': data}).encode('utf-8')
+        
+        def without_ice(curve: Dict[str, Any]) -> Dict[str, Any]:
+            return {key: value for key, value in curve.items() if key != 'ice'}
+        
+        curves = result['features']
+        responses = {
+            None: {
+                True: encode({**summary, 'features': curves}),
+                False: encode({**summary, 'features': {name: without_ice(curve) for name, curve in curves.items()}})
+            }
+        }
+        for name, curve in curves.items():
+            responses[name] = {
+                True: encode({**summary, 'feature': name, **curve}),
+                False: encode({**summary, 'feature': name, **without_ice(curve)})
+            }
+        
+        self.compute_seconds = result.get('compute_seconds')
+        self.loaded_at = datetime.utcnow().isoformat()
+        self._responses = responses
+    
+    def response(self, feature: Optional[str] = None, ice: bool = False) -> Optional[bytes]:
+        """
+        Serialized response body, or None while the curves are not available
+        
+        Raises:
+            KeyError: for a feature the model does not have
+        """
+        if self._responses is None and self._pid != os.getpid():
+            # A forked worker: the curves are computed by the parent, which writes the cache file
+            self.load()
+        if self._responses is None:
+            return None
+        return self._responses[feature][ice]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'status': self.status,
+            'path': str(self.path),
+            'features': len(self.features),
+            'compute_seconds': self.compute_seconds,
+            'loaded_at': self.loaded_at,
+            'error': self.error
+        }
@@ -0,0 +1,377 @@
+import itertools
+import json
+import logging
+import os
+import time
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.forest_engine import CompiledForest
+
+logger = logging.getLogger(__name__)
+
+class PredictionLookupTable:
+    """Precomputed forest output over the reachable, discretized feature space
+    
+    Each table axis is one dimension of the preprocessor's output:
+      - 'scalar':   a discrete feature; values are mapped to the forest's split
+                    intervals, so every reachable value gets the exact answer
+      - 'bucketed': a continuous feature (job_desc_log) cut at a configurable
+                    number of the forest's own thresholds
+      - 'one_hot':  a one-hot group (country, job category), one slot per state
+    Rows that fall outside the grid are reported as misses so the caller can
+    fall back to the forest.
+    """
+    
+    def __init__(self, table: np.ndarray, dims: List[Dict[str, Any]],
+                 fixed: Dict[int, float], meta: Dict[str, Any]):
+        self.table = table
+        self.dims = dims
+        self.fixed = fixed
+        self.meta = meta
+        self._prepare_dims()
+    
+    def _prepare_dims(self):
+        """Fuse the JSON-friendly axis specs into a few flat lookup arrays"""
+        shape = self.table.shape
+        strides = [int(np.prod(shape[i + 1:])) for i in range(len(shape))]
+        scalar = [(d, s) for d, s in zip(self.dims, strides) if d['kind'] != 'one_hot']
+        one_hot = [(d, s) for d, s in zip(self.dims, strides) if d['kind'] == 'one_hot']
+        
+        # Scalar axes share one searchsorted: each axis is shifted into its own
+        # span and preceded by a sentinel edge so class ranges never overlap
+        lows = [float(dim['range'][0]) for dim, _ in scalar]
+        highs = [float(dim['range'][1]) for dim, _ in scalar]
+        span = max([h - l for l, h in zip(lows, highs)] + [0.0]) + 1.0
+        
+        # Index 0 is unreachable: it sits below the first sentinel
+        fused_edges, fused_slots = [], [np.array([-1], dtype=np.intp)]
+        for axis, (dim, stride) in enumerate(scalar):
+            edges = np.asarray(dim['edges'], dtype=np.float64)
+            slot_of_class = np.asarray(dim['slot_of_class'], dtype=np.intp)
+            below = int(np.count_nonzero(edges < lows[axis]))
+            kept = edges[(edges >= lows[axis]) & (edges <= highs[axis])]
+            shift = axis * span - lows[axis]
+            fused_edges.append(np.concatenate([[axis * span - 0.5], kept + shift]))
+            slots = slot_of_class[below:below + len(kept) + 1]
+            fused_slots.append(np.where(slots >= 0, slots * stride, -1))
+        
+        self._scalar_cols = np.asarray([d['columns'][0] for d, _ in scalar], dtype=np.intp)
+        self._scalar_low = np.asarray(lows)
+        self._scalar_high = np.asarray(highs)
+        self._scalar_shift = np.arange(len(scalar)) * span - self._scalar_low
+        self._scalar_edges = np.concatenate(fused_edges) if fused_edges else np.empty(0)
+        self._scalar_offsets = np.concatenate(fused_slots)
+        
+        # One-hot groups: a matmul recovers each group's active column
+        cols = [c for d, _ in one_hot for c in d['columns']]
+        self._one_hot_cols = np.asarray(cols, dtype=np.intp)
+        self._one_hot_member = np.zeros((len(cols), len(one_hot)))
+        self._one_hot_position = np.zeros((len(cols), len(one_hot)))
+        self._one_hot_offsets = []
+        row = 0
+        for group, (dim, stride) in enumerate(one_hot):
+            k = len(dim['columns'])
+            self._one_hot_member[row:row + k, group] = 1
+            self._one_hot_position[row:row + k, group] = np.arange(k)
+            slot_of_state = np.asarray(dim['slot_of_state'], dtype=np.intp)
+            self._one_hot_offsets.append(np.where(slot_of_state >= 0, slot_of_state * stride, -1))
+            row += k
+        
+        self._fixed_cols = np.asarray(list(self.fixed), dtype=np.intp)
+        self._fixed_values = np.asarray(list(self.fixed.values()), dtype=np.float64)
+    
+    @property
+    def model_hash(self) -> Optional[str]:
+        return self.meta.get('model_hash')
+    
+    @property
+    def nbytes(self) -> int:
+        return int(self.table.nbytes)
+    
+    def lookup(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Look up predictions for a feature matrix
+        
+        Returns:
+            (values, hits): predictions (valid where hits is True) and hit mask
+        """
+        # Same float32 view of the inputs that the trees compare against
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        
+        # Scalar axes: out-of-range values miss, the rest map to slot offsets
+        values = X[:, self._scalar_cols]
+        hits = ((values >= self._scalar_low) & (values <= self._scalar_high)).all(axis=1)
+        classes = np.searchsorted(self._scalar_edges, values + self._scalar_shift, side='left')
+        offsets = self._scalar_offsets[classes]
+        
+        # One-hot groups: exactly zero or one active column per group
+        group = X[:, self._one_hot_cols]
+        hits &= ((group == 0) | (group == 1)).all(axis=1)
+        active = group @ self._one_hot_member
+        position = (group @ self._one_hot_position).astype(np.intp)
+        hits &= (active <= 1).all(axis=1)
+        for g, slot_offsets in enumerate(self._one_hot_offsets):
+            state = np.where(active[:, g] == 1, position[:, g], len(slot_offsets) - 1)
+            offsets = np.column_stack([offsets, slot_offsets[state]])
+        
+        hits &= (offsets >= 0).all(axis=1)
+        if len(self._fixed_cols):
+            hits &= (X[:, self._fixed_cols] == self._fixed_values).all(axis=1)
+        
+        flat = np.where(hits, offsets.sum(axis=1), 0)
+        predictions = np.asarray(self.table.reshape(-1)[flat], dtype=np.float64)
+        return predictions, hits
+    
+    # ------------------------------------------------------------------
+    # Offline build
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _split_thresholds(forest: CompiledForest, col: int) -> np.ndarray:
+        return np.unique(forest.threshold[~forest.is_leaf & (forest.feature == col)])
+    
+    @classmethod
+    def _build_dims(cls, forest: CompiledForest, feature_names: List[str],
+                    domains: Dict[str, Any], desc_buckets: int):
+        """Derive the table axes from the preprocessor's reachable domains"""
+        index = {name: i for i, name in enumerate(feature_names)}
+        dims = []
+        covered = set()
+        
+        for name, reachable in domains['discrete'].items():
+            if name not in index:
+                continue
+            col = index[name]
+            edges = cls._split_thresholds(forest, col)
+            values = np.asarray(reachable, dtype=np.float32).astype(np.float64)
+            classes = np.searchsorted(edges, values, side='left')
+            unique_classes, first = np.unique(classes, return_index=True)
+            slot_of_class = np.full(len(edges) + 1, -1, dtype=np.intp)
+            slot_of_class[unique_classes] = np.arange(len(unique_classes))
+            dims.append({
+                'name': name,
+                'kind': 'scalar',
+                'columns': [col],
+                'range': [float(values.min()), float(values.max())],
+                'edges': edges.tolist(),
+                'slot_of_class': slot_of_class.tolist(),
+                'reps': [[float(reachable[i])] for i in first],
+            })
+            covered.add(col)
+        
+        for name, (lo, hi) in domains['continuous'].items():
+            if name not in index:
+                continue
+            col = index[name]
+            thresholds = cls._split_thresholds(forest, col)
+            thresholds = thresholds[(thresholds >= lo) & (thresholds < hi)]
+            if len(thresholds) > desc_buckets - 1:
+                picks = np.unique(np.round(np.linspace(0, len(thresholds) - 1, desc_buckets - 1)).astype(int))
+                thresholds = thresholds[picks]
+            # Outer slots are exact; inner slots use the interval midpoint
+            bounds = np.concatenate([[lo], thresholds, [hi]])
+            reps = [lo] + [float((a + b) / 2) for a, b in zip(bounds[1:-2], bounds[2:-1])] + [hi]
+            if len(thresholds) == 0:
+                reps = [lo]
+            dims.append({
+                'name': name,
+                'kind': 'bucketed',
+                'columns': [col],
+                'range': [lo, hi],
+                'edges': thresholds.tolist(),
+                'slot_of_class': list(range(len(thresholds) + 1)),
+                'reps': [[float(r)] for r in reps],
+            })
+            covered.add(col)
+        
+        for name, (columns, none_reachable) in domains['one_hot'].items():
+            cols = [index[c] for c in columns if c in index]
+            if not cols:
+                continue
+            states = list(range(len(cols))) + ([len(cols)] if none_reachable else [])
+            slot_of_state = np.full(len(cols) + 1, -1, dtype=np.intp)
+            slot_of_state[states] = np.arange(len(states))
+            reps = []
+            for state in states:
+                row = [0.0] * len(cols)
+                if state < len(cols):
+                    row[state] = 1.0
+                reps.append(row)
+            dims.append({
+                'name': name,
+                'kind': 'one_hot',
+                'columns': cols,
+                'slot_of_state': slot_of_state.tolist(),
+                'reps': reps,
+            })
+            covered.update(cols)
+        
+        # Anything the preprocessor never writes stays at zero
+        fixed = {col: 0.0 for col in range(len(feature_names)) if col not in covered}
+        return dims, fixed
+    
+    @staticmethod
+    def _as_slices(slots: np.ndarray) -> List[slice]:
+        """Split sorted slot indices into contiguous runs so table updates stay views"""
+        breaks = np.flatnonzero(np.diff(slots) != 1) + 1
+        starts = np.concatenate([[0], breaks])
+        ends = np.concatenate([breaks, [len(slots)]])
+        return [slice(int(slots[a]), int(slots[b - 1]) + 1) for a, b in zip(starts, ends)]
+    
+    @classmethod
+    def build(cls, forest: CompiledForest, feature_names: List[str],
+              domains: Dict[str, Any], desc_buckets: int = 16,
+              model_hash: Optional[str] = None) -> 'PredictionLookupTable':
+        """
+        Fill the table by partitioning the grid down each tree
+        
+        Every leaf owns a box of the grid (a subset of slots per axis), so each
+        tree adds its leaf values to the table box by box. Trees are added in
+        order, matching the forest's own accumulation.
+        """
+        start = time.perf_counter()
+        dims, fixed = cls._build_dims(forest, feature_names, domains, desc_buckets)
+        shape = tuple(len(dim['reps']) for dim in dims)
+        
+        # Per column: (axis, position within the axis' representative rows)
+        axis_of = {}
+        reps32 = []
+        for axis, dim in enumerate(dims):
+            reps32.append(np.asarray(dim['reps'], dtype=np.float32).astype(np.float64))
+            for pos, col in enumerate(dim['columns']):
+                axis_of[col] = (axis, pos)
+        
+        logger.info(f"Building prediction table with shape {shape} ({int(np.prod(shape)):,} cells)")
+        table = np.zeros(shape, dtype=np.float64)
+        full_box = [np.arange(size) for size in shape]
+        
+        for root in forest.roots:
+            stack = [(int(root), full_box)]
+            while stack:
+                node, box = stack.pop()
+                if forest.is_leaf[node]:
+                    for region in itertools.product(*(cls._as_slices(slots) for slots in box)):
+                        table[region] += forest.value[node]
+                    continue
+                
+                col = int(forest.feature[node])
+                threshold = forest.threshold[node]
+                if col not in axis_of:
+                    child = forest.left[node] if np.float32(fixed.get(col, 0.0)) <= threshold else forest.right[node]
+                    stack.append((int(child), box))
+                    continue
+                
+                axis, pos = axis_of[col]
+                slots = box[axis]
+                go_left = reps32[axis][slots, pos] <= threshold
+                for child, mask in ((forest.left[node], go_left), (forest.right[node], ~go_left)):
+                    if mask.any():
+                        child_box = list(box)
+                        child_box[axis] = slots[mask]
+                        stack.append((int(child), child_box))
+        
+        table /= forest.n_trees
+        meta = {
+            'model_hash': model_hash,
+            'feature_names': list(feature_names),
+            'desc_buckets': desc_buckets,
+            'shape': list(shape),
+            'build_seconds': round(time.perf_counter() - start, 2),
+        }
+        logger.info(f"Prediction table built in {meta['build_seconds']}s")
+        return cls(table.astype(np.float32), dims, fixed, meta)
+    
+    def evaluate(self, forest: CompiledForest, domains: Dict[str, Any],
+                 n_samples: int = 20000, seed: int = 0) -> Dict[str, float]:
+        """Compare table lookups with the live forest on random reachable inputs"""
+        rng = np.random.default_rng(seed)
+        X = np.zeros((n_samples, forest.n_features))
+        index = {name: i for i, name in enumerate(self.meta['feature_names'])}
+        
+        for name, reachable in domains['discrete'].items():
+            if name in index:
+                X[:, index[name]] = rng.choice(reachable, size=n_samples)
+        for name, (lo, hi) in domains['continuous'].items():
+            if name in index:
+                # Word counts drawn log-uniformly over the reachable range
+                X[:, index[name]] = rng.uniform(lo, hi, size=n_samples)
+        for name, (columns, none_reachable) in domains['one_hot'].items():
+            cols = [index[c] for c in columns if c in index]
+            states = rng.integers(0, len(cols) + (1 if none_reachable else 0), size=n_samples)
+            chosen = states < len(cols)
+            X[np.flatnonzero(chosen), np.asarray(cols)[states[chosen]]] = 1
+        
+        values, hits = self.lookup(X)
+        expected = forest.predict(X)
+        diff = np.abs(values[hits] - expected[hits])
+        report = {
+            'samples': n_samples,
+            'hit_rate': float(hits.mean()),
+            'mean_abs_delta': float(diff.mean()) if len(diff) else 0.0,
+            'p99_abs_delta': float(np.percentile(diff, 99)) if len(diff) else 0.0,
+            'max_abs_delta': float(diff.max()) if len(diff) else 0.0,
+            'within_one_dollar': float((diff < 1.0).mean()) if len(diff) else 1.0,
+        }
+        self.meta['accuracy'] = report
+        return report
+    
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _meta_path(path: str) -> str:
+        return os.path.splitext(path)[0] + '.json'
+    
+    def save(self, path: str):
+        """
+        Write the table (.npy) and its axes/metadata (.json) side by side
+        
+        Each file is written beside its target and renamed over it, so processes
+        still memory-mapping an older table keep reading the old file. The .json
+        goes last: once it names a model, the table is that model's.
+        """
+        def replace(target: str, write):
+            tmp_path = f'{target}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, target)
+        
+        dims = [{k: v for k, v in dim.items() if not k.startswith('_')} for dim in self.dims]
+        replace(path, lambda f: np.save(f, self.table))
+        replace(self._meta_path(path), lambda f: f.write(json.dumps({
+            'meta': self.meta,
+            'dims': dims,
+            'fixed': {str(col): value for col, value in self.fixed.items()},
+        }).encode('utf-8')))
+        logger.info(f"Prediction table saved to {path} ({self.nbytes / 1e6:.1f} MB)")
+    
+    @classmethod
+    def load(cls, path: str, model_hash: Optional[str] = None,
+             feature_names: Optional[List[str]] = None) -> Optional['PredictionLookupTable']:
+        """Memory-map a saved table; returns None if missing or built for another model"""
+        meta_path = cls._meta_path(path)
+        if not os.path.exists(path) or not os.path.exists(meta_path):
+            logger.info(f"No prediction table found at {path}")
+            return None
+        
+        try:
+            with open(meta_path, 'r') as f:
+                saved = json.load(f)
+            meta = saved['meta']
+            if model_hash is not None and meta.get('model_hash') != model_hash:
+                logger.warning("Prediction table was built for a different model file - ignoring it")
+                return None
+            if feature_names is not None and meta.get('feature_names') != list(feature_names):
+                logger.warning("Prediction table feature names do not match the model - ignoring it")
+                return None
+            
+            table = np.load(path, mmap_mode='r')
+            fixed = {int(col): value for col, value in saved['fixed'].items()}
+            lookup_table = cls(table, saved['dims'], fixed, meta)
+            logger.info(f"Prediction table loaded: shape {table.shape}, {lookup_table.nbytes / 1e6:.1f} MB (memory-mapped)")
+            return lookup_table
+        except Exception as e:
+            logger.warning(f"Failed to load prediction table: {str(e)}")
+            return None
@@ -1,14 +1,49 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify
+import hashlib
+import time
 import traceback
+import zlib
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import logging
 import os
-from typing import Dict, Any, List, Optional
+import sys
+import threading
+from typing import Callable, Collection, Dict, Any, Hashable, List, Optional
 
 # Import the analytics processor
 from utils.analytics_processor import get_analytics_processor
+from utils.row_index import RowIndex
+from utils.analytics_cube import AnalyticsCube
+from utils.fused_aggregation import FusedAggregator
+from utils.response_cache import ResponseCache, response_etag
+
+# Columns the dashboard aggregations read; filtered views gather only these
+ANALYTICS_COLUMNS = ['salary_usd', 'location_clean', 'experience_level', 'company_size', 'job_category', 'job_title']
+# Columns the dashboard sections group salaries by
+GROUP_COLUMNS = ['location_clean', 'experience_level', 'company_size', 'job_category']
+
+# Dashboard sections in response order
+ANALYTICS_SECTIONS = ['salaryDistribution', 'geographicData', 'experienceData', 'skillsData',
+                      'companySizeData', 'trendData', 'jobTitleData']
+
+# Section -> grouped statistic it is formatted from (every section also sees the row count and mean)
+SECTION_STATS = {
+    'salaryDistribution': 'distribution',
+    'geographicData': 'geographic',
+    'experienceData': 'experience',
+    'companySizeData': 'company_size',
+    'jobTitleData': 'job_titles'
+}
+
+# Grouped statistic -> (grouping column, quantiles per group) for fused aggregation
+STAT_GROUPS = {
+    'geographic': ('location_clean', (0.5,)),
+    'experience': ('experience_level', (0.25, 0.5, 0.75)),
+    'company_size': ('company_size', ()),
+    'job_titles': ('job_category', ())
+}
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +54,26 @@ class AnalyticsProcessor:
         self.csv_path = csv_path
         self.df = None
         self.original_columns = None
+        self.analytics_df = None
+        self.row_index = None
+        self.aggregator = None
+        
+        # Content hash of the analytics columns and modification time of the dataset, identifying the data responses are built from
+        self.data_version = None
+        self.data_updated_at = None
+        # Seed for the mock noise fields (growth, benefits, trends); None draws from the global RNG
+        self.noise_seed = None
+        
+        # Optional precomputed aggregates (enable_cube())
+        self.cube = None
+        self.cube_enabled = False
+        self.cube_max_rows = 0
+        self.cube_background = False
+        self.cube_status = 'disabled'
+        self._cube_lock = threading.Lock()
+        self._cube_thread = None
+        self._cube_pid = None
+        
         self.load_data()
     
     def load_data(self):
@@ -49,6 +104,7 @@ class AnalyticsProcessor:
             
             logger.info(f" Loading data from {self.csv_path}")
             self.df = pd.read_csv(self.csv_path)
+            self.data_updated_at = datetime.utcfromtimestamp(os.path.getmtime(self.csv_path)).isoformat()
             self.original_columns = list(self.df.columns)
             
             logger.info(f"Raw data loaded: {len(self.df)} records, {len(self.df.columns)} columns")
@@ -70,6 +126,8 @@ class AnalyticsProcessor:
         
         np.random.seed(42)  # For reproducible results
         n_samples = 1000
+        # Generated data has no modification time; a fixed one keeps it identical in every worker
+        self.data_updated_at = datetime.utcfromtimestamp(0).isoformat()
         
         experience_levels = ['Entry Level', 'Mid Level', 'Senior Level', 'Executive']
         company_sizes = ['Small', 'Medium', 'Large', 'Enterprise']
@@ -235,6 +293,15 @@ class AnalyticsProcessor:
         
         logger.info(f" Final cleaning: {before_cleaning} → {len(self.df)} records")
         logger.info(f"Data preprocessing complete: {original_count} → {len(self.df)} valid records ({(len(self.df)/original_count)*100:.1f}% retained)")
+        
+        # Index the filter columns once so each request selects rows instead of copying the frame
+        self.analytics_df = self.df[[column for column in ANALYTICS_COLUMNS if column in self.df.columns]]
+        self.row_index = RowIndex(self.df)
+        self.aggregator = FusedAggregator(self.analytics_df, GROUP_COLUMNS)
+        self.cube = None
+        self.data_version = hashlib.sha256(
+            pd.util.hash_pandas_object(self.analytics_df, index=False).to_numpy().tobytes()
+        ).hexdigest()[:16]
     
     def _categorize_job_title(self, title: str) -> str:
         """Categorize job titles into main categories with comprehensive coverage"""
@@ -313,63 +380,48 @@ class AnalyticsProcessor:
         
         return location_mapping.get(location_clean, location_clean)
     
+    def filter_rows(self, filters: Dict[str, str]) -> Optional[np.ndarray]:
+        """Row positions matching the filters from the bitmap index (None when nothing is filtered)"""
+        return self.row_index.select(filters)
+    
     def apply_filters(self, filters: Dict[str, str]) -> pd.DataFrame:
         """Apply filters to the dataset with better error handling"""
-        if self.df is None or self.df.empty:
+        if self.df is None or self.df.empty or self.row_index is None:
             logger.warning("No data available for filtering")
             return pd.DataFrame()
         
-        filtered_df = self.df.copy()
-        original_count = len(filtered_df)
-        
-        # Apply location filter
-        if filters.get('location') and filters['location'] != 'All':
-            if 'location_clean' in filtered_df.columns:
-                filtered_df = filtered_df[filtered_df['location_clean'] == filters['location']]
-                logger.info(f" Location filter '{filters['location']}': {len(filtered_df)} records")
-        
-        # Apply experience level filter
-        if filters.get('experienceLevel') and filters['experienceLevel'] != 'All':
-            if 'experience_level' in filtered_df.columns:
-                filtered_df = filtered_df[filtered_df['experience_level'] == filters['experienceLevel']]
-                logger.info(f"‍ Experience filter '{filters['experienceLevel']}': {len(filtered_df)} records")
-        
-        # Apply company size filter
-        if filters.get('companySize') and filters['companySize'] != 'All':
-            if 'company_size' in filtered_df.columns:
-                filtered_df = filtered_df[filtered_df['company_size'] == filters['companySize']]
-                logger.info(f" Company size filter '{filters['companySize']}': {len(filtered_df)} records")
-        
-        # Apply salary range filter
-        if filters.get('salaryRange') and filters['salaryRange'] != 'All':
-            if 'salary_usd' in filtered_df.columns:
-                salary_ranges = {
-                    '50k-100k': (50000, 100000),
-                    '100k-150k': (100000, 150000),
-                    '150k+': (150000, float('inf'))
-                }
-                if filters['salaryRange'] in salary_ranges:
-                    min_sal, max_sal = salary_ranges[filters['salaryRange']]
-                    filtered_df = filtered_df[
-                        (filtered_df['salary_usd'] >= min_sal) & 
-                        (filtered_df['salary_usd'] <= max_sal)
-                    ]
-                    logger.info(f" Salary filter '{filters['salaryRange']}': {len(filtered_df)} records")
-        
-        logger.info(f" Total filter result: {original_count} → {len(filtered_df)} records")
+        rows = self.filter_rows(filters)
+        filtered_df = self.df if rows is None else self.df.iloc[rows]
+        logger.info(f" Total filter result: {len(self.df)} → {len(filtered_df)} records")
         return filtered_df
     
+    def filtered_view(self, filters: Dict[str, str]) -> pd.DataFrame:
+        """The analytics columns of the rows matching the filters; the unfiltered view is shared, not copied"""
+        if self.analytics_df is None or self.analytics_df.empty or self.row_index is None:
+            logger.warning("No data available for filtering")
+            return pd.DataFrame()
+        
+        rows = self.filter_rows(filters)
+        filtered_df = self.analytics_df if rows is None else self.analytics_df.take(rows)
+        logger.info(f" Total filter result: {len(self.analytics_df)} → {len(filtered_df)} records")
+        return filtered_df
+    
+    def salary_bins(self, max_salary: float) -> range:
+        """$20k histogram bins from $30k up to the highest salary"""
+        return range(30000, int(max_salary) + 20000, 20000)
+    
     def get_salary_distribution(self, filtered_df: pd.DataFrame) -> List[Dict]:
         """Generate salary distribution data"""
         if filtered_df.empty or 'salary_usd' not in filtered_df.columns:
             return []
         
         # Create salary bins
-        bins = range(30000, int(filtered_df['salary_usd'].max()) + 20000, 20000)
-        labels = [f'${i//1000}k-{(i+20000)//1000}k' for i in bins[:-1]]
-        
+        bins = self.salary_bins(filtered_df['salary_usd'].max())
         hist, _ = np.histogram(filtered_df['salary_usd'], bins=bins)
-        total = len(filtered_df)
+        return self._format_salary_distribution(bins, hist, len(filtered_df))
+    
+    def _format_salary_distribution(self, bins, hist, total: int) -> List[Dict]:
+        labels = [f'${int(i)//1000}k-{(int(i)+20000)//1000}k' for i in bins[:-1]]
         
         return [
             {
@@ -395,48 +447,48 @@ class AnalyticsProcessor:
             
             # Group by location and calculate statistics
             location_stats = filtered_df.groupby('location_clean').agg({
-                'salary_usd': ['mean', 'median', 'count', 'min', 'max']
+                'salary_usd': ['mean', 'median', 'count']
             })
             
             # Flatten column names
-            location_stats.columns = ['avg_salary', 'median_salary', 'count', 'min_salary', 'max_salary']
-            
-            result = []
-            for location in location_stats.index:
-                avg_salary = location_stats.loc[location, 'avg_salary']
-                median_salary = location_stats.loc[location, 'median_salary']
-                job_count = location_stats.loc[location, 'count']
-                
-                # Validate the data
-                if pd.isna(avg_salary) or avg_salary <= 0:
-                    logger.warning(f"Invalid avg_salary for {location}: {avg_salary}")
-                    continue
-                    
-                # Calculate growth (mock for now, would need historical data)
-                growth = round(np.random.normal(8, 5), 1)
-                
-                location_data = {
-                    'location': str(location),
-                    'averageSalary': int(round(avg_salary)),
-                    'medianSalary': int(round(median_salary)),
-                    'jobCount': int(job_count),
-                    'growth': str(growth)
-                }
-                
-                logger.info(f"Location data for {location}: {location_data}")
-                result.append(location_data)
-            
-            # Sort by average salary (descending)
-            result = sorted(result, key=lambda x: x['averageSalary'], reverse=True)
+            location_stats.columns = ['avg_salary', 'median_salary', 'count']
             
-            logger.info(f"Generated geographic data for {len(result)} locations")
-            return result
+            return self._format_geographic_data(location_stats.itertuples(name=None))
             
         except Exception as e:
             logger.error(f"Error in geographic analysis: {str(e)}")
             logger.error(f"DataFrame info: shape={filtered_df.shape}, columns={list(filtered_df.columns)}")
             return []
     
+    def _format_geographic_data(self, location_stats, rng=np.random) -> List[Dict]:
+        """Dashboard rows from (location, mean, median, count) tuples in location order"""
+        result = []
+        for location, avg_salary, median_salary, job_count in location_stats:
+            # Validate the data
+            if pd.isna(avg_salary) or avg_salary <= 0:
+                logger.warning(f"Invalid avg_salary for {location}: {avg_salary}")
+                continue
+            
+            # Calculate growth (mock for now, would need historical data)
+            growth = round(rng.normal(8, 5), 1)
+            
+            location_data = {
+                'location': str(location),
+                'averageSalary': int(round(avg_salary)),
+                'medianSalary': int(round(median_salary)),
+                'jobCount': int(job_count),
+                'growth': str(growth)
+            }
+            
+            logger.info(f"Location data for {location}: {location_data}")
+            result.append(location_data)
+        
+        # Sort by average salary (descending)
+        result = sorted(result, key=lambda x: x['averageSalary'], reverse=True)
+        
+        logger.info(f"Generated geographic data for {len(result)} locations")
+        return result
+    
     def get_experience_data(self, filtered_df: pd.DataFrame) -> List[Dict]:
         """Generate experience level analysis"""
         if filtered_df.empty or 'experience_level' not in filtered_df.columns:
@@ -445,38 +497,43 @@ class AnalyticsProcessor:
         try:
             exp_stats = filtered_df.groupby('experience_level').agg({
                 'salary_usd': ['mean', 'count'],
-            }).round(0)
+            })
             
-            result = []
+            rows = []
             for level in exp_stats.index:
                 avg_salary = exp_stats.loc[level, ('salary_usd', 'mean')]
                 job_count = exp_stats.loc[level, ('salary_usd', 'count')]
                 
                 # Calculate quartiles
                 level_data = filtered_df[filtered_df['experience_level'] == level]['salary_usd']
-                q25 = level_data.quantile(0.25) if len(level_data) > 0 else avg_salary * 0.8
-                median = level_data.quantile(0.5) if len(level_data) > 0 else avg_salary * 0.9
-                q75 = level_data.quantile(0.75) if len(level_data) > 0 else avg_salary * 1.2
-                
-                result.append({
-                    'level': level,
-                    'averageSalary': int(avg_salary),
-                    'jobCount': int(job_count),
-                    'q25': int(q25),
-                    'median': int(median),
-                    'q75': int(q75)
-                })
-            
-            # Ensure proper order
-            order = ['Entry Level', 'Mid Level', 'Senior Level', 'Executive']
-            result = sorted(result, key=lambda x: order.index(x['level']) if x['level'] in order else 999)
+                rows.append((level, avg_salary, job_count, level_data.quantile(0.25),
+                             level_data.quantile(0.5), level_data.quantile(0.75)))
             
-            return result
+            return self._format_experience_data(rows)
         except Exception as e:
             logger.error(f"Error in experience analysis: {str(e)}")
             return []
     
-    def get_skills_data(self, filtered_df: pd.DataFrame) -> List[Dict]:
+    def _format_experience_data(self, exp_stats) -> List[Dict]:
+        """Dashboard rows from (level, mean, count, q25, median, q75) tuples"""
+        result = []
+        for level, avg_salary, job_count, q25, median, q75 in exp_stats:
+            result.append({
+                'level': level,
+                'averageSalary': int(np.round(avg_salary)),
+                'jobCount': int(job_count),
+                'q25': int(q25),
+                'median': int(median),
+                'q75': int(q75)
+            })
+        
+        # Ensure proper order
+        order = ['Entry Level', 'Mid Level', 'Senior Level', 'Executive']
+        result = sorted(result, key=lambda x: order.index(x['level']) if x['level'] in order else 999)
+        
+        return result
+    
+    def get_skills_data(self, filtered_df: pd.DataFrame, rng=np.random) -> List[Dict]:
         """Generate skills impact analysis (simplified)"""
         # Since skills data might not be in the CSV, we'll generate based on job titles
         skills_impact = {
@@ -493,15 +550,15 @@ class AnalyticsProcessor:
         result = []
         for skill, base_impact in skills_impact.items():
             # Add some variation based on actual data
-            actual_impact = base_impact + np.random.randint(-3000, 5000)
-            frequency = np.random.randint(30, 80)
-            growth = round(np.random.normal(12, 8), 1)
+            actual_impact = base_impact + rng.randint(-3000, 5000)
+            frequency = rng.randint(30, 80)
+            growth = round(rng.normal(12, 8), 1)
             
             result.append({
                 'skill': skill,
                 'salaryBoost': actual_impact,
                 'frequency': frequency,
-                'demand': round(np.random.normal(7, 2), 1),
+                'demand': round(rng.normal(7, 2), 1),
                 'growth': str(growth)
             })
         
@@ -516,50 +573,55 @@ class AnalyticsProcessor:
             size_stats = filtered_df.groupby('company_size').agg({
                 'salary_usd': 'mean',
                 'job_category': 'count'
-            }).round(0)
-            
-            result = []
-            for size in size_stats.index:
-                avg_salary = size_stats.loc[size, 'salary_usd']
-                job_count = size_stats.loc[size, 'job_category']
-                
-                # Mock benefits and remote ratio (would need additional data)
-                benefits = round(np.random.normal(6.5, 1.5), 1)
-                remote_ratio = np.random.randint(40, 80)
-                
-                result.append({
-                    'size': size,
-                    'averageSalary': int(avg_salary),
-                    'jobCount': int(job_count),
-                    'benefits': benefits,
-                    'remoteRatio': remote_ratio
-                })
-            
-            # Ensure proper order
-            order = ['Small', 'Medium', 'Large', 'Enterprise']
-            result = sorted(result, key=lambda x: order.index(x['size']) if x['size'] in order else 999)
+            })
             
-            return result
+            return self._format_company_size_data(size_stats.itertuples(name=None))
         except Exception as e:
             logger.error(f"Error in company size analysis: {str(e)}")
             return []
     
+    def _format_company_size_data(self, size_stats, rng=np.random) -> List[Dict]:
+        """Dashboard rows from (size, mean, count) tuples in size order"""
+        result = []
+        for size, avg_salary, job_count in size_stats:
+            # Mock benefits and remote ratio (would need additional data)
+            benefits = round(rng.normal(6.5, 1.5), 1)
+            remote_ratio = rng.randint(40, 80)
+            
+            result.append({
+                'size': size,
+                'averageSalary': int(np.round(avg_salary)),
+                'jobCount': int(job_count),
+                'benefits': benefits,
+                'remoteRatio': remote_ratio
+            })
+        
+        # Ensure proper order
+        order = ['Small', 'Medium', 'Large', 'Enterprise']
+        result = sorted(result, key=lambda x: order.index(x['size']) if x['size'] in order else 999)
+        
+        return result
+    
     def get_trend_data(self, filtered_df: pd.DataFrame) -> List[Dict]:
         """Generate trend data (mock historical data)"""
+        return self._format_trend_data(filtered_df['salary_usd'].mean() if not filtered_df.empty else None,
+                                       len(filtered_df))
+    
+    def _format_trend_data(self, mean_salary: Optional[float], count: int, rng=np.random) -> List[Dict]:
         months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
                  'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
         
         # Base on current data but add temporal variation
-        base_salary = filtered_df['salary_usd'].mean() if not filtered_df.empty else 100000
-        base_jobs = max(len(filtered_df) // 12, 10)
+        base_salary = mean_salary if mean_salary is not None else 100000
+        base_jobs = max(count // 12, 10)
         
         result = []
         for i, month in enumerate(months):
             # Add seasonal variation
             seasonal_factor = 1 + 0.1 * np.sin(i * np.pi / 6)
-            avg_salary = int(base_salary * seasonal_factor + np.random.normal(0, 5000))
-            job_postings = int(base_jobs * seasonal_factor + np.random.normal(0, 10))
-            applications = job_postings * np.random.randint(4, 8)
+            avg_salary = int(base_salary * seasonal_factor + rng.normal(0, 5000))
+            job_postings = int(base_jobs * seasonal_factor + rng.normal(0, 10))
+            applications = job_postings * rng.randint(4, 8)
             
             result.append({
                 'month': month,
@@ -579,60 +641,208 @@ class AnalyticsProcessor:
             title_stats = filtered_df.groupby('job_category').agg({
                 'job_category': 'count',
                 'salary_usd': 'mean'
-            }).round(0)
-            
-            result = []
-            for title in title_stats.index:
-                count = title_stats.loc[title, 'job_category']
-                avg_salary = title_stats.loc[title, 'salary_usd']
-                growth = round(np.random.normal(10, 8), 1)
-                
-                result.append({
-                    'title': title,
-                    'count': int(count),
-                    'averageSalary': int(avg_salary),
-                    'growth': str(growth)
-                })
+            })
             
-            return sorted(result, key=lambda x: x['count'], reverse=True)
+            return self._format_job_title_data(title_stats.itertuples(name=None))
         except Exception as e:
             logger.error(f"Error in job title analysis: {str(e)}")
             return []
     
-    def get_analytics_data(self, filters: Dict[str, str] = None) -> Dict[str, Any]:
-        """Get complete analytics data with filters applied"""
+    def _format_job_title_data(self, title_stats, rng=np.random) -> List[Dict]:
+        """Dashboard rows from (category, count, mean) tuples in category order"""
+        result = []
+        for title, count, avg_salary in title_stats:
+            growth = round(rng.normal(10, 8), 1)
+            
+            result.append({
+                'title': title,
+                'count': int(count),
+                'averageSalary': int(np.round(avg_salary)),
+                'growth': str(growth)
+            })
+        
+        return sorted(result, key=lambda x: x['count'], reverse=True)
+    
+    def section_stats(self, filters: Dict[str, str], include: Optional[Collection[str]] = None) -> Dict[str, Any]:
+        """
+        Statistics behind the dashboard sections for the filtered rows
+        
+        One fused pass per grouping column over the rows selected by the row
+        index, in the same shape as AnalyticsCube.lookup(); the get_*_data
+        methods compute the same values with one pandas groupby each. include
+        names the statistics to compute besides count and mean (all when None);
+        the others are left empty.
+        """
+        if include is None:
+            include = list(STAT_GROUPS) + ['distribution']
+        groupings = [STAT_GROUPS[stat] for stat in STAT_GROUPS if stat in include]
+        fused = self.aggregator.aggregate(
+            self.filter_rows(filters),
+            quantiles={column: quantiles for column, quantiles in groupings if quantiles},
+            dimensions=[column for column, _ in groupings]
+        )
+        groups = fused['groups']
+        stats = {
+            'count': fused['count'],
+            'mean': fused['mean'],
+            'distribution': None,
+            'geographic': [(location, mean, median, count)
+                           for location, count, mean, median in groups.get('location_clean', [])],
+            'experience': [(level, mean, count, q25, median, q75)
+                           for level, count, mean, q25, median, q75 in groups.get('experience_level', [])],
+            'company_size': [(size, mean, count) for size, count, mean in groups.get('company_size', [])],
+            'job_titles': groups.get('job_category', [])
+        }
+        if fused['count'] and 'distribution' in include:
+            bins = self.salary_bins(fused['values'].max())
+            hist, _ = np.histogram(fused['values'], bins=bins)
+            stats['distribution'] = (bins, hist)
+        return stats
+    
+    # ------------------------------------------------------------------
+    # Analytics cube
+    # ------------------------------------------------------------------
+    
+    def enable_cube(self, max_rows: int = 2000000, background: bool = False):
+        """Answer dashboard requests from an AnalyticsCube, built now or on a background thread"""
+        self.cube_enabled = True
+        self.cube_max_rows = int(max_rows)
+        self.cube_background = background
+        self._ensure_cube()
+    
+    def _ensure_cube(self) -> Optional[AnalyticsCube]:
+        """The cube for the current data, starting its build if needed (once per process)"""
+        cube = self.cube
+        if cube is not None or not self.cube_enabled or self.analytics_df is None or self.analytics_df.empty:
+            return cube
+        if len(self.analytics_df) > self.cube_max_rows:
+            if self.cube_status != 'skipped':
+                logger.info(f"Analytics cube skipped: {len(self.analytics_df)} rows > {self.cube_max_rows}")
+                self.cube_status = 'skipped'
+            return None
+        if not self.cube_background:
+            self._build_cube(self.analytics_df)
+            return self.cube
+        with self._cube_lock:
+            if self._cube_thread is None or self._cube_pid != os.getpid() or not self._cube_thread.is_alive():
+                self._cube_pid = os.getpid()
+                self._cube_thread = threading.Thread(target=self._build_cube, args=(self.analytics_df,),
+                                                     name='analytics-cube', daemon=True)
+                self._cube_thread.start()
+        return None
+    
+    def _build_cube(self, analytics_df: pd.DataFrame):
+        self.cube_status = 'building'
+        try:
+            cube = AnalyticsCube(analytics_df, self.salary_bins)
+        except Exception as e:
+            logger.error(f"Analytics cube build failed, aggregating per request: {str(e)}")
+            self.cube_status = 'failed'
+            self.cube_enabled = False
+            return
+        # Data reloaded while building: the next request builds for the new data
+        if analytics_df is self.analytics_df:
+            self.cube = cube
+            self.cube_status = 'ready'
+    
+    def get_cube_stats(self) -> Dict[str, Any]:
+        if self.cube is not None:
+            return self.cube.get_stats()
+        return {'status': self.cube_status}
+    
+    def _noise_rng(self, filters: Dict[str, str], section: str):
+        """RNG for a section's mock noise: the global one, or seeded per filters and section"""
+        if self.noise_seed is None:
+            return np.random
+        # A section draws the same noise whether it is requested alone or with others
+        key = repr((self.noise_seed, sorted(filters.items()), section)).encode('utf-8')
+        return np.random.RandomState(zlib.crc32(key))
+    
+    def get_analytics_data(self, filters: Dict[str, str] = None, sections: Optional[Collection[str]] = None,
+                           timed: bool = False) -> Dict[str, Any]:
+        """
+        Get analytics data with filters applied
+        
+        sections limits the response to those ANALYTICS_SECTIONS (all when
+        None); only the statistics they format are aggregated. timed adds
+        per-step milliseconds to the metadata. With a noise_seed, the mock
+        noise of each section is seeded from the seed, filters and section, and
+        lastUpdated is the dataset's modification time, so the result only
+        depends on the data, filters and sections.
+        """
         if filters is None:
             filters = {}
+        requested = ANALYTICS_SECTIONS if sections is None else [
+            section for section in ANALYTICS_SECTIONS if section in sections]
+        unknown = set(sections or ()) - set(ANALYTICS_SECTIONS)
+        if unknown:
+            raise ValueError(f"Unknown analytics sections: {', '.join(sorted(unknown))}")
         
         try:
-            # Apply filters
-            filtered_df = self.apply_filters(filters)
+            timings = {}
+            started = time.perf_counter()
             
-            # Generate all analytics data
-            analytics_data = {
-                'salaryDistribution': self.get_salary_distribution(filtered_df),
-                'geographicData': self.get_geographic_data(filtered_df),
-                'experienceData': self.get_experience_data(filtered_df),
-                'skillsData': self.get_skills_data(filtered_df),
-                'companySizeData': self.get_company_size_data(filtered_df),
-                'trendData': self.get_trend_data(filtered_df),
-                'jobTitleData': self.get_job_title_data(filtered_df),
-                'metadata': {
-                    'lastUpdated': datetime.utcnow().isoformat(),
-                    'totalRecords': len(self.df) if self.df is not None else 0,
-                    'filteredRecords': len(filtered_df),
-                    'dataQuality': 98.5,
-                    'modelAccuracy': 73.4,
-                    'appliedFilters': filters
-                }
+            # Precomputed for this filter combination, or aggregated from the filtered rows
+            include = {SECTION_STATS[section] for section in requested if section in SECTION_STATS}
+            cube = self._ensure_cube()
+            stats = cube.lookup(filters, include) if cube is not None else self.section_stats(filters, include)
+            timings['aggregation'] = time.perf_counter() - started
+            
+            formatters = {
+                'salaryDistribution': lambda rng: (
+                    self._format_salary_distribution(*stats['distribution'], stats['count'])
+                    if stats['count'] else []),
+                'geographicData': lambda rng: self._format_geographic_data(stats['geographic'], rng),
+                'experienceData': lambda rng: self._format_experience_data(stats['experience']),
+                'skillsData': lambda rng: self.get_skills_data(None, rng),
+                'companySizeData': lambda rng: self._format_company_size_data(stats['company_size'], rng),
+                'trendData': lambda rng: self._format_trend_data(stats['mean'], stats['count'], rng),
+                'jobTitleData': lambda rng: self._format_job_title_data(stats['job_titles'], rng)
             }
             
+            # Generate the requested analytics data
+            analytics_data = {}
+            for section in requested:
+                started = time.perf_counter()
+                analytics_data[section] = formatters[section](self._noise_rng(filters, section))
+                timings[section] = time.perf_counter() - started
+            
+            analytics_data['metadata'] = {
+                'lastUpdated': self.data_updated_at if self.noise_seed is not None else datetime.utcnow().isoformat(),
+                'totalRecords': len(self.df) if self.df is not None else 0,
+                'filteredRecords': stats['count'],
+                'dataQuality': 98.5,
+                'modelAccuracy': 73.4,
+                'appliedFilters': filters
+            }
+            if sections is not None:
+                analytics_data['metadata']['sections'] = requested
+            if timed:
+                analytics_data['metadata']['timingsMs'] = {
+                    step: round(seconds * 1000, 3) for step, seconds in timings.items()}
+            
             return analytics_data
             
         except Exception as e:
             logger.error(f"Error generating analytics data: {str(e)}")
             raise
 
+def requested_sections(default: Optional[List[str]] = None) -> Optional[List[str]]:
+    """Sections named by the comma-separated fields= query parameter, or default when it names none"""
+    sections = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    return sections or default
+
+def invalid_fields_response(sections: Optional[List[str]]):
+    """400 response naming the unknown sections in fields=, or None when all are known"""
+    unknown = sorted(set(sections or ()) - set(ANALYTICS_SECTIONS))
+    if not unknown:
+        return None
+    return jsonify({
+        'status': 'error',
+        'message': f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(ANALYTICS_SECTIONS)}",
+        'error': 'invalid_fields'
+    }), 400
+
 # Global instance
 analytics_processor = None
 
@@ -644,6 +854,80 @@ def get_analytics_processor() -> AnalyticsProcessor:
         analytics_processor = AnalyticsProcessor()
     return analytics_processor
 
+# Serialized analytics responses (enable_response_cache())
+response_cache = None
+response_max_age = 0
+
+def _response_code_version() -> str:
+    """Hash of the code that shapes analytics responses, so a deploy that changes it changes every ETag"""
+    digest = hashlib.sha256()
+    for module in (__file__, AnalyticsCube, FusedAggregator, RowIndex):
+        path = module if isinstance(module, str) else sys.modules[module.__module__].__file__
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    digest.update(f'{pd.__version__} {np.__version__} {zlib.ZLIB_RUNTIME_VERSION}'.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+RESPONSE_CODE_VERSION = _response_code_version()
+
+def enable_response_cache(max_bytes: int, max_age: int) -> ResponseCache:
+    """Cache analytics responses and let clients revalidate them; needs the processor's noise_seed"""
+    global response_cache, response_max_age
+    response_cache = ResponseCache(max_bytes)
+    response_max_age = int(max_age)
+    return response_cache
+
+def section_key(sections: Optional[Collection[str]]) -> Optional[tuple]:
+    """Requested sections in response order, so equivalent fields= lists share a cache entry"""
+    return None if sections is None else tuple(section for section in ANALYTICS_SECTIONS if section in sections)
+
+def analytics_response(key: Hashable, build: Callable[[], Dict[str, Any]]) -> Response:
+    """
+    JSON response for build(), cached per endpoint, code and dataset version and key
+    
+    key must hold every request parameter the payload depends on. Cached
+    responses carry a strong ETag derived from the full key (one per content
+    coding), so a matching If-None-Match is answered with 304 before anything
+    is computed, even by a worker that never built the response. Bodies are
+    stored serialized and, when smaller, gzip-compressed. Without a
+    noise_seed responses are not reproducible, and in debug mode they carry
+    timings, so neither is cached.
+    """
+    processor = get_analytics_processor()
+    if response_cache is None or processor.noise_seed is None or current_app.debug:
+        return jsonify(build())
+    
+    full_key = (request.path, RESPONSE_CODE_VERSION, processor.data_version,
+                processor.data_updated_at, processor.noise_seed, key)
+    etag = response_etag(full_key)
+    gzip_etag = f'{etag}-gzip'
+    accepts_gzip = request.accept_encodings['gzip'] > 0
+    
+    for candidate in (gzip_etag, etag) if accepts_gzip else (etag, gzip_etag):
+        if request.if_none_match.contains_weak(candidate):
+            response_cache.record_not_modified()
+            response = Response(status=304)
+            response.set_etag(candidate)
+            break
+    else:
+        entry = response_cache.get(full_key)
+        cache_status = 'HIT'
+        if entry is None:
+            entry = response_cache.put(full_key, current_app.json.response(build()).get_data())
+            cache_status = 'MISS'
+        if accepts_gzip and entry.gzipped is not None:
+            response = Response(entry.gzipped, mimetype=entry.mimetype)
+            response.headers['Content-Encoding'] = 'gzip'
+            response.set_etag(gzip_etag)
+        else:
+            response = Response(entry.body, mimetype=entry.mimetype)
+            response.set_etag(etag)
+        response.headers['X-Cache'] = cache_status
+    
+    response.headers['Cache-Control'] = f'public, max-age={response_max_age}'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 # Create analytics blueprint
 analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
 
@@ -663,20 +947,26 @@ def get_analytics_overview():
         
         logger.info(f" Applied filters: {filters}")
         
-        # Get the analytics processor instance
-        processor = get_analytics_processor()
-        
-        # Generate analytics data from real CSV
-        analytics_data = processor.get_analytics_data(filters)
+        sections = requested_sections()
+        invalid = invalid_fields_response(sections)
+        if invalid:
+            return invalid
         
-        response = {
-            'status': 'success',
-            'data': analytics_data,
-            'filters': filters
-        }
+        def build():
+            # Get the analytics processor instance
+            processor = get_analytics_processor()
+            
+            # Generate analytics data from real CSV
+            analytics_data = processor.get_analytics_data(filters, sections, timed=current_app.debug)
+            
+            logger.info(f"Analytics overview generated: {analytics_data['metadata']['filteredRecords']} records")
+            return {
+                'status': 'success',
+                'data': analytics_data,
+                'filters': filters
+            }
         
-        logger.info(f"Analytics overview generated: {analytics_data['metadata']['filteredRecords']} records")
-        return jsonify(response)
+        return analytics_response((tuple(sorted(filters.items())), section_key(sections)), build)
         
     except FileNotFoundError as e:
         logger.error(f"CSV file not found: {str(e)}")
@@ -759,16 +1049,18 @@ def get_geographic_analytics():
             'salaryRange': request.args.get('salaryRange', 'All')
         }
         
-        processor = get_analytics_processor()
-        analytics_data = processor.get_analytics_data(filters)
-        
-        return jsonify({
-            'status': 'success',
-            'data': {
-                'geographicData': analytics_data['geographicData'],
-                'metadata': analytics_data['metadata']
+        def build():
+            processor = get_analytics_processor()
+            analytics_data = processor.get_analytics_data(filters, ['geographicData'], timed=current_app.debug)
+            return {
+                'status': 'success',
+                'data': {
+                    'geographicData': analytics_data['geographicData'],
+                    'metadata': analytics_data['metadata']
+                }
             }
-        })
+        
+        return analytics_response(tuple(sorted(filters.items())), build)
         
     except Exception as e:
         logger.error(f"Error generating geographic analytics: {str(e)}")
@@ -852,16 +1144,18 @@ def get_skills_analytics():
             'salaryRange': request.args.get('salaryRange', 'All')
         }
         
-        processor = get_analytics_processor()
-        analytics_data = processor.get_analytics_data(filters)
-        
-        return jsonify({
-            'status': 'success',
-            'data': {
-                'skillsData': analytics_data['skillsData'],
-                'metadata': analytics_data['metadata']
+        def build():
+            processor = get_analytics_processor()
+            analytics_data = processor.get_analytics_data(filters, ['skillsData'], timed=current_app.debug)
+            return {
+                'status': 'success',
+                'data': {
+                    'skillsData': analytics_data['skillsData'],
+                    'metadata': analytics_data['metadata']
+                }
             }
-        })
+        
+        return analytics_response(tuple(sorted(filters.items())), build)
         
     except Exception as e:
         logger.error(f"Error generating skills analytics: {str(e)}")
@@ -886,17 +1180,19 @@ def get_market_trends():
             'salaryRange': request.args.get('salaryRange', 'All')
         }
         
-        processor = get_analytics_processor()
-        analytics_data = processor.get_analytics_data(filters)
-        
-        return jsonify({
-            'status': 'success',
-            'data': {
-                'trendData': analytics_data['trendData'],
-                'period': period,
-                'metadata': analytics_data['metadata']
+        def build():
+            processor = get_analytics_processor()
+            analytics_data = processor.get_analytics_data(filters, ['trendData'], timed=current_app.debug)
+            return {
+                'status': 'success',
+                'data': {
+                    'trendData': analytics_data['trendData'],
+                    'period': period,
+                    'metadata': analytics_data['metadata']
+                }
             }
-        })
+        
+        return analytics_response((tuple(sorted(filters.items())), period), build)
         
     except Exception as e:
         logger.error(f"Error generating market trends: {str(e)}")
@@ -921,24 +1217,34 @@ def export_analytics_data():
             'salaryRange': request.args.get('salaryRange', 'All')
         }
         
-        processor = get_analytics_processor()
-        analytics_data = processor.get_analytics_data(filters)
+        sections = requested_sections()
+        invalid = invalid_fields_response(sections)
+        if invalid:
+            return invalid
         
-        if format_type == 'csv':
-            # Return CSV format metadata (implement actual CSV conversion if needed)
-            return jsonify({
-                'status': 'success',
-                'message': 'CSV export prepared',
-                'recordCount': analytics_data['metadata']['filteredRecords'],
-                'downloadUrl': '/api/analytics/download/analytics_data.csv'
-            })
-        else:
+        # The CSV stub only reports the record count, so no section is needed
+        sections = [] if format_type == 'csv' else sections
+        
+        def build():
+            processor = get_analytics_processor()
+            analytics_data = processor.get_analytics_data(filters, sections, timed=current_app.debug)
+            
+            if format_type == 'csv':
+                # Return CSV format metadata (implement actual CSV conversion if needed)
+                return {
+                    'status': 'success',
+                    'message': 'CSV export prepared',
+                    'recordCount': analytics_data['metadata']['filteredRecords'],
+                    'downloadUrl': '/api/analytics/download/analytics_data.csv'
+                }
             # Return JSON
-            return jsonify({
+            return {
                 'status': 'success',
                 'data': analytics_data,
                 'format': format_type
-            })
+            }
+        
+        return analytics_response((tuple(sorted(filters.items())), format_type, section_key(sections)), build)
         
     except Exception as e:
         logger.error(f"Error exporting analytics data: {str(e)}")
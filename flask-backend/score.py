@@ -0,0 +1,271 @@
+"""
+Offline bulk scoring: stream a CSV or JSONL file of prediction inputs through a
+process pool and write one prediction per input row.
+
+Usage (from flask-backend/):
+    python score.py postings.jsonl predictions.jsonl
+    python score.py postings.csv predictions.csv --chunk-size 20000 --workers 8 --id-column job_id
+
+Input rows use the same fields as POST /api/predict (jobTitle, yearsExperience,
+experienceLevel, companyLocation, ...). In CSV files, requiredSkills and
+benefits are comma- or semicolon-separated strings. Output rows keep input
+order and carry the row number, the optional id column, the status and either
+predictedSalary or the error.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import config
+from models.model_loader import ModelLoader
+from utils.preprocessing import preprocessor
+from utils.validation import validate_prediction_input, PredictionValidationError
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_FIELDS = ('yearsExperience', 'remoteRatio')
+LIST_FIELDS = ('requiredSkills', 'benefits')
+STAGES = ('parse', 'validate', 'preprocess', 'predict')
+
+# One ModelLoader per pool process, created by _init_worker
+_worker_loader = None
+
+# ----------------------------------------------------------------------
+# Input / output
+# ----------------------------------------------------------------------
+
+def _detect_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+def _coerce_csv_row(row: Dict[str, str]) -> Dict[str, Any]:
+    """Turn CSV strings into the types /api/predict receives as JSON"""
+    record = {key: value for key, value in row.items() if value not in (None, '')}
+    for field in NUMERIC_FIELDS:
+        if field in record:
+            try:
+                number = float(record[field])
+                record[field] = int(number) if number.is_integer() else number
+            except ValueError:
+                pass  # left as a string so validation reports it
+    for field in LIST_FIELDS:
+        if isinstance(record.get(field), str):
+            separator = ';' if ';' in record[field] else ','
+            record[field] = [item.strip() for item in record[field].split(separator) if item.strip()]
+    return record
+
+def read_chunks(path: str, fmt: str, chunk_size: int) -> Iterator[List[Any]]:
+    """
+    Yield lists of at most chunk_size raw records without reading the whole file
+    
+    JSONL lines are passed on undecoded (and CSV rows as strings) so that parsing
+    happens in the pool processes rather than in the reader.
+    """
+    chunk = []
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        records = csv.DictReader(f) if fmt == 'csv' else (line for line in f if line.strip())
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def decode_record(raw: Any, fmt: str) -> Any:
+    """Turn a raw record from read_chunks into an /api/predict input"""
+    return _coerce_csv_row(raw) if fmt == 'csv' else _parse_json_line(raw)
+
+def _parse_json_line(line: str) -> Any:
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        return {'_parse_error': f'Invalid JSON: {e.msg}'}
+
+class ResultWriter:
+    """Append scored rows to a CSV or JSONL file"""
+    
+    def __init__(self, path: str, fmt: str, id_column: Optional[str]):
+        self.fmt = fmt
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.columns = ['row'] + ([id_column] if id_column else []) + ['status', 'predictedSalary', 'error']
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(self.file, fieldnames=self.columns, extrasaction='ignore')
+            self.writer.writeheader()
+    
+    def write(self, results: List[Dict[str, Any]]):
+        if self.fmt == 'csv':
+            self.writer.writerows(results)
+        else:
+            self.file.writelines(json.dumps(result) + '\n' for result in results)
+    
+    def close(self):
+        self.file.close()
+
+# ----------------------------------------------------------------------
+# Scoring (runs in the pool processes)
+# ----------------------------------------------------------------------
+
+def _init_worker(config_name: str):
+    """Load the model once per pool process"""
+    global _worker_loader
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    _worker_loader = ModelLoader(config=_loader_config(config_name))
+    if not _worker_loader.load_model():
+        raise RuntimeError('Model could not be loaded in scoring worker')
+
+def _loader_config(config_name: str) -> Dict[str, Any]:
+    config_class = config[config_name]
+    return {key: getattr(config_class, key) for key in dir(config_class) if key.isupper()}
+
+def score_chunk(first_row: int, raw_records: List[Any], fmt: str,
+                id_column: Optional[str]) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """Parse, validate, preprocess and predict one chunk; returns (results, seconds per stage)"""
+    timings = dict.fromkeys(STAGES, 0.0)
+    results = []
+    valid_rows, valid_records = [], []
+    
+    start = time.perf_counter()
+    records = [decode_record(raw, fmt) for raw in raw_records]
+    timings['parse'] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for offset, record in enumerate(records):
+        result = {'row': first_row + offset}
+        if id_column and isinstance(record, dict):
+            result[id_column] = record.get(id_column)
+        try:
+            if isinstance(record, dict) and '_parse_error' in record:
+                raise PredictionValidationError(record['_parse_error'])
+            validate_prediction_input(record)
+            valid_rows.append(offset)
+            valid_records.append(record)
+            result['status'] = 'success'
+        except PredictionValidationError as e:
+            result.update(status='error', error=str(e))
+        results.append(result)
+    timings['validate'] = time.perf_counter() - start
+    
+    if valid_records:
+        try:
+            salaries = _score_records(valid_records, timings)
+        except Exception as e:
+            # One row the validator let through must not cost the rest of the chunk
+            logger.warning(f"Chunk starting at row {first_row} failed as a batch ({str(e)}) - scoring it row by row")
+            salaries = []
+            for record in valid_records:
+                try:
+                    salaries.append(_score_records([record], timings)[0])
+                except Exception as row_error:
+                    salaries.append(row_error)
+        
+        for offset, salary in zip(valid_rows, salaries):
+            if isinstance(salary, Exception):
+                results[offset].update(status='error', error=f'Scoring failed: {str(salary)}')
+            else:
+                results[offset]['predictedSalary'] = int(salary)
+    
+    return results, timings
+
+def _score_records(records: List[Dict[str, Any]], timings: Dict[str, float]) -> np.ndarray:
+    """Preprocess and predict validated records in one model call; returns rounded salaries"""
+    start = time.perf_counter()
+    features = preprocessor.preprocess_batch(records, dtype=_worker_loader.input_dtype)
+    timings['preprocess'] += time.perf_counter() - start
+    
+    start = time.perf_counter()
+    schema = preprocessor.schema_fingerprint(_worker_loader.input_dtype)
+    predictions = _worker_loader.predict_batch(features, schema=schema)
+    timings['predict'] += time.perf_counter() - start
+    
+    # Same rounding as the API response
+    return (np.round(predictions / 1000) * 1000).astype(np.int64)
+
+# ----------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Bulk-score a CSV or JSONL file of prediction inputs')
+    parser.add_argument('input', help='CSV or JSONL file of /api/predict inputs')
+    parser.add_argument('output', help='Where to write predictions (.csv or .jsonl)')
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'], help='Defaults to the input file extension')
+    parser.add_argument('--output-format', choices=['csv', 'jsonl'], help='Defaults to the output file extension')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Rows per unit of work')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Scoring processes')
+    parser.add_argument('--id-column', help='Input field copied to each output row')
+    parser.add_argument('--config', default=os.environ.get('FLASK_ENV', 'production'),
+                        choices=sorted(config), help='Configuration used to locate model artifacts')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    input_format = _detect_format(args.input, args.input_format)
+    output_format = _detect_format(args.output, args.output_format)
+    writer = ResultWriter(args.output, output_format, args.id_column)
+    
+    totals = dict.fromkeys(STAGES + ('read', 'write'), 0.0)
+    rows = succeeded = 0
+    started = time.perf_counter()
+    
+    pool = ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.config,))
+    # Chunks are collected in submission order, with a bounded number in flight
+    pending = deque()
+    max_in_flight = args.workers * 2
+    
+    def drain_one():
+        nonlocal rows, succeeded
+        results, timings = pending.popleft().result()
+        start = time.perf_counter()
+        writer.write(results)
+        totals['write'] += time.perf_counter() - start
+        for stage, seconds in timings.items():
+            totals[stage] += seconds
+        rows += len(results)
+        succeeded += sum(1 for result in results if result['status'] == 'success')
+    
+    try:
+        next_row = 0
+        chunks = read_chunks(args.input, input_format, args.chunk_size)
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            totals['read'] += time.perf_counter() - start
+            if chunk is None:
+                break
+            
+            pending.append(pool.submit(score_chunk, next_row, chunk, input_format, args.id_column))
+            next_row += len(chunk)
+            if len(pending) >= max_in_flight:
+                drain_one()
+        
+        while pending:
+            drain_one()
+    finally:
+        pool.shutdown(cancel_futures=True)
+        writer.close()
+    
+    elapsed = time.perf_counter() - started
+    print(f"Scored {rows:,} rows ({succeeded:,} succeeded, {rows - succeeded:,} failed) "
+          f"in {elapsed:.2f}s with {args.workers} workers")
+    print(f"Throughput: {rows / elapsed if elapsed else 0:,.0f} rows/s")
+    print("Stage time (read and write in this process, the rest summed over workers):")
+    for stage, seconds in totals.items():
+        per_row = seconds / rows * 1e6 if rows else 0.0
+        print(f"   {stage:<10} {seconds:8.2f}s  ({per_row:.1f} us/row)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
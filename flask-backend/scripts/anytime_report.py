@@ -0,0 +1,118 @@
+"""
+Report accuracy versus trees used versus latency for anytime forest evaluation.
+
+Usage (from flask-backend/):
+    python -m scripts.anytime_report [--features PATH] [--target PATH] [--rows N]
+
+The first table evaluates fixed prefixes of the forest on every row of
+X_features_for_modeling.csv and compares them with the full forest and with the
+true salaries. The stopping-rule tables run ModelLoader.predict_anytime for a
+grid of tolerances and latency budgets, one row per call as /api/predict does
+and in batches as /api/predict/batch does.
+"""
+import argparse
+import logging
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from config import Config
+from models.model_loader import ModelLoader
+
+MODELING_DIR = Config.BASE_DIR.parent / 'dataset' / 'modeling'
+TOLERANCES = (None, 500, 1000, 2000, 4000)
+BUDGETS_MS = (None, 0.25, 1.0, 5.0)
+
+def r2_score(y: np.ndarray, predictions: np.ndarray) -> float:
+    return 1 - float(((y - predictions) ** 2).sum() / ((y - y.mean()) ** 2).sum())
+
+def call_ms(fn, rows: np.ndarray, batch_size: int = 1) -> np.ndarray:
+    """Wall time of fn on consecutive batches of rows, in milliseconds"""
+    timings = []
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        started = time.perf_counter()
+        fn(batch)
+        timings.append((time.perf_counter() - started) * 1000)
+    return np.array(timings)
+
+def print_stopping_rules(loader, rows: np.ndarray, expected: np.ndarray, batch_size: int):
+    print(f"   {'tolerance':>9}  {'budget':>8}  {'mean trees':>10}  {'|d| vs full':>11}  "
+          f"{'p99 |d|':>8}  {'p50':>8}  {'p99':>8}")
+    for tolerance in TOLERANCES:
+        for budget_ms in BUDGETS_MS:
+            outcomes = []
+            latency = call_ms(
+                lambda batch: outcomes.append(loader.predict_anytime(batch, budget_ms=budget_ms, tolerance=tolerance)),
+                rows, batch_size
+            )
+            predictions = np.concatenate([mean for mean, _, _ in outcomes])
+            trees_used = np.array([used for _, _, used in outcomes])
+            delta = np.abs(predictions - expected)
+            print(f"   {'-' if tolerance is None else f'${tolerance:,}':>9}  "
+                  f"{'-' if budget_ms is None else f'{budget_ms:g}ms':>8}  {trees_used.mean():>10.1f}  "
+                  f"{delta.mean():>11,.0f}  {np.percentile(delta, 99):>8,.0f}  "
+                  f"{np.median(latency):>6.3f}ms  {np.percentile(latency, 99):>6.3f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='Accuracy vs trees used vs latency for anytime evaluation')
+    parser.add_argument('--features', default=str(MODELING_DIR / 'X_features_for_modeling.csv'))
+    parser.add_argument('--target', default=str(MODELING_DIR / 'y_target_for_modeling.csv'))
+    parser.add_argument('--rows', type=int, default=1000, help='Rows timed one at a time')
+    parser.add_argument('--batch-size', type=int, default=256, help='Rows per call in the batch table')
+    parser.add_argument('--chunk-trees', type=int, default=Config.ANYTIME_CHUNK_TREES)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    loader = ModelLoader(config={
+        'MODEL_PATH': Config.MODEL_PATH,
+        'SCALER_PATH': Config.SCALER_PATH,
+        'FEATURE_NAMES_PATH': Config.FEATURE_NAMES_PATH,
+        'INFERENCE_ENGINE': 'compiled',
+        'COMPILED_FOREST_PATH': Config.COMPILED_FOREST_PATH,
+        'PREDICTION_TABLE_ENABLED': False,
+        'ANYTIME_CHUNK_TREES': args.chunk_trees
+    })
+    if not loader.load_model() or loader.compiled_forest is None:
+        print("Model could not be loaded and compiled - anytime evaluation needs a tree ensemble")
+        return 1
+    
+    forest = loader.compiled_forest
+    X = pd.read_csv(args.features)[loader.feature_names].to_numpy(dtype=loader.input_dtype)
+    y = pd.read_csv(args.target).iloc[:, 0].to_numpy(dtype=np.float64)
+    timed = X[np.random.default_rng(0).choice(len(X), size=min(args.rows, len(X)), replace=False)]
+    
+    per_tree = forest.predict_trees(X)
+    full = forest.mean_of(per_tree)
+    print(f"{len(X):,} rows, {forest.n_trees} trees, chunks of {args.chunk_trees}; "
+          f"full forest MAE ${np.abs(full - y).mean():,.0f}, R2 {r2_score(y, full):.4f}")
+    print()
+    
+    print("Fixed number of trees (all rows):")
+    print(f"   {'trees':>5}  {'MAE vs y':>9}  {'R2':>7}  {'|d| vs full':>11}  {'p99 |d|':>8}  "
+          f"{'1 row p50':>9}  {f'{args.batch_size} rows p50':>13}")
+    for n_trees in range(args.chunk_trees, forest.n_trees + 1, args.chunk_trees):
+        roots = forest.roots[:n_trees]
+        partial = forest.mean_of(per_tree[:, :n_trees])
+        delta = np.abs(partial - full)
+        evaluate = lambda batch: forest.value[forest.apply(batch, roots)].mean(axis=1)
+        single = call_ms(evaluate, timed)
+        batched = call_ms(evaluate, X, args.batch_size)
+        print(f"   {n_trees:>5}  {np.abs(partial - y).mean():>9,.0f}  {r2_score(y, partial):>7.4f}  "
+              f"{delta.mean():>11,.0f}  {np.percentile(delta, 99):>8,.0f}  "
+              f"{np.median(single):>7.3f}ms  {np.median(batched):>11.3f}ms")
+    print()
+    
+    print(f"Stopping rules, one row per call ({len(timed):,} rows):")
+    print_stopping_rules(loader, timed, forest.predict(timed), 1)
+    print()
+    
+    print(f"Stopping rules, {args.batch_size} rows per call ({len(X):,} rows):")
+    print_stopping_rules(loader, X, full, args.batch_size)
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
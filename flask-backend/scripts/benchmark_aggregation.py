@@ -0,0 +1,109 @@
+"""
+Benchmark fused single-pass aggregation against one pandas groupby per section.
+
+Usage (from flask-backend/):
+    python -m scripts.benchmark_aggregation [--sizes 15000,1000000] [--repeats 20]
+
+Rows of the cleaned analytics dataset are resampled to each size. For a few
+filter combinations the script times the previous per-section path (gather
+the filtered rows, then get_salary_distribution(), get_geographic_data(),
+get_experience_data(), get_company_size_data(), get_trend_data() and
+get_job_title_data() on them) against section_stats() plus the same
+formatting, and checks with a seeded RNG that both produce the same sections.
+"""
+import argparse
+import gc
+import json
+import logging
+import sys
+import time
+import numpy as np
+
+from routes.analytics import ANALYTICS_COLUMNS, GROUP_COLUMNS, AnalyticsProcessor
+from utils.fused_aggregation import FusedAggregator
+from utils.row_index import RowIndex
+
+FILTER_SETS = {
+    'none': {},
+    'location': {'location': 'United States'},
+    'level+range': {'experienceLevel': 'Senior Level', 'salaryRange': '100k-150k'},
+    'all four': {'location': 'United States', 'experienceLevel': 'Senior Level',
+                 'companySize': 'Large', 'salaryRange': '100k-150k'}
+}
+
+def per_section(processor: AnalyticsProcessor, filters: dict) -> dict:
+    """The dashboard sections as computed before fusing: one groupby per section"""
+    filtered_df = processor.filtered_view(filters)
+    return {
+        'salaryDistribution': processor.get_salary_distribution(filtered_df),
+        'geographicData': processor.get_geographic_data(filtered_df),
+        'experienceData': processor.get_experience_data(filtered_df),
+        'companySizeData': processor.get_company_size_data(filtered_df),
+        'trendData': processor.get_trend_data(filtered_df),
+        'jobTitleData': processor.get_job_title_data(filtered_df)
+    }
+
+def fused(processor: AnalyticsProcessor, filters: dict) -> dict:
+    stats = processor.section_stats(filters)
+    return {
+        'salaryDistribution': (processor._format_salary_distribution(*stats['distribution'], stats['count'])
+                               if stats['count'] else []),
+        'geographicData': processor._format_geographic_data(stats['geographic']),
+        'experienceData': processor._format_experience_data(stats['experience']),
+        'companySizeData': processor._format_company_size_data(stats['company_size']),
+        'trendData': processor._format_trend_data(stats['mean'], stats['count']),
+        'jobTitleData': processor._format_job_title_data(stats['job_titles'])
+    }
+
+def seeded(fn, processor: AnalyticsProcessor, filters: dict) -> str:
+    np.random.seed(0)
+    return json.dumps(fn(processor, filters), sort_keys=True, default=str)
+
+def time_ms(fn, repeats: int) -> float:
+    fn()
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings[i] = (time.perf_counter() - started) * 1000
+    return float(np.median(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency of fused dashboard aggregation')
+    parser.add_argument('--sizes', default='15000,1000000')
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    logging.disable(logging.WARNING)
+    
+    processor = AnalyticsProcessor()
+    source = processor.analytics_df.reset_index(drop=True)
+    rng = np.random.default_rng(0)
+    
+    for size in (int(value) for value in args.sizes.split(',')):
+        processor.df = source.iloc[rng.integers(0, len(source), size)].reset_index(drop=True)
+        processor.analytics_df = processor.df[[column for column in ANALYTICS_COLUMNS if column in source.columns]]
+        processor.row_index = RowIndex(processor.df)
+        started = time.perf_counter()
+        processor.aggregator = FusedAggregator(processor.analytics_df, GROUP_COLUMNS)
+        build_ms = (time.perf_counter() - started) * 1000
+        repeats = max(3, args.repeats * 15000 // size)
+        
+        print(f"{size:,} rows: aggregator built in {build_ms:.0f}ms")
+        print(f"   {'filters':>12}  {'rows':>10}  {'per section':>12}  {'fused':>10}  {'speedup':>7}")
+        for name, filters in FILTER_SETS.items():
+            assert seeded(per_section, processor, filters) == seeded(fused, processor, filters), name
+            rows = processor.filter_rows(filters)
+            
+            legacy_ms = time_ms(lambda: per_section(processor, filters), repeats)
+            fused_ms = time_ms(lambda: fused(processor, filters), repeats)
+            print(f"   {name:>12}  {size if rows is None else len(rows):>10,}  {legacy_ms:>10.2f}ms  "
+                  f"{fused_ms:>8.2f}ms  {legacy_ms / fused_ms:>6.1f}x")
+        print()
+        gc.collect()
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
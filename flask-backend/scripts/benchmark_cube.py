@@ -0,0 +1,85 @@
+"""
+Benchmark the analytics cube against aggregating each dashboard request.
+
+Usage (from flask-backend/):
+    python -m scripts.benchmark_cube [--sizes 15000,1000000] [--requests 200]
+
+Rows of the cleaned analytics dataset are resampled to each size. The script
+reports the cube's build time and memory, then times get_analytics_data() for
+random filter combinations answered from the cube and from the filtered rows,
+checking with a seeded RNG that both produce the same dashboard.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+import numpy as np
+
+from routes.analytics import ANALYTICS_COLUMNS, AnalyticsProcessor
+from utils.analytics_cube import AnalyticsCube
+from utils.row_index import RowIndex, SALARY_RANGES
+
+def random_filters(processor: AnalyticsProcessor, rng: np.random.Generator) -> dict:
+    """A filter combination with each parameter set to 'All' half of the time"""
+    df = processor.analytics_df
+    choices = {
+        'location': sorted(df['location_clean'].unique()),
+        'experienceLevel': sorted(df['experience_level'].unique()),
+        'companySize': sorted(df['company_size'].unique()),
+        'salaryRange': list(SALARY_RANGES)
+    }
+    return {parameter: 'All' if rng.random() < 0.5 else str(rng.choice(values))
+            for parameter, values in choices.items()}
+
+def dashboard(processor: AnalyticsProcessor, filters: dict) -> str:
+    np.random.seed(0)
+    data = processor.get_analytics_data(filters)
+    data['metadata'].pop('lastUpdated')
+    return json.dumps(data, sort_keys=True, default=str)
+
+def main():
+    parser = argparse.ArgumentParser(description='Build cost and latency of the analytics cube')
+    parser.add_argument('--sizes', default='15000,1000000')
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    logging.disable(logging.WARNING)
+    
+    processor = AnalyticsProcessor()
+    source = processor.df.reset_index(drop=True)
+    rng = np.random.default_rng(0)
+    
+    for size in (int(value) for value in args.sizes.split(',')):
+        processor.df = source.iloc[rng.integers(0, len(source), size)].reset_index(drop=True)
+        processor.analytics_df = processor.df[[column for column in ANALYTICS_COLUMNS if column in source.columns]]
+        processor.row_index = RowIndex(processor.df)
+        
+        started = time.perf_counter()
+        cube = AnalyticsCube(processor.analytics_df, processor.salary_bins)
+        build_seconds = time.perf_counter() - started
+        print(f"{size:,} rows: cube of {cube.combinations:,} combinations built in {build_seconds:.2f}s, "
+              f"{cube.nbytes / 1024 ** 2:.1f} MB")
+        
+        requests = [random_filters(processor, rng) for _ in range(args.requests)]
+        timings = {}
+        outputs = {}
+        for mode, enabled in (('per request', False), ('cube', True)):
+            processor.cube, processor.cube_enabled = (cube if enabled else None), enabled
+            outputs[mode] = [dashboard(processor, filters) for filters in requests[:20]]
+            latency = np.empty(len(requests))
+            for i, filters in enumerate(requests):
+                started = time.perf_counter()
+                processor.get_analytics_data(filters)
+                latency[i] = (time.perf_counter() - started) * 1000
+            timings[mode] = latency
+            print(f"   {mode:>11}: p50 {np.median(latency):8.3f}ms  p99 {np.percentile(latency, 99):8.3f}ms")
+        assert outputs['cube'] == outputs['per request'], 'cube and per-request dashboards differ'
+        print(f"   speedup: {np.median(timings['per request']) / np.median(timings['cube']):.0f}x (p50)")
+        print()
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
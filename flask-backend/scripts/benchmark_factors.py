@@ -0,0 +1,105 @@
+"""
+Benchmark tree-path prediction factors against the plain prediction.
+
+Usage (from flask-backend/):
+    python -m scripts.benchmark_factors [--rows 2000] [--requests 500]
+
+The first table times CompiledForest.contributions() next to predict() on rows
+of X_features_for_modeling.csv for several batch sizes, and checks that bias
+plus contributions reproduces every prediction. The second times POST
+/api/predict end to end with PREDICTION_FACTORS_METHOD set to 'heuristic' and
+to 'contributions' (prediction cache disabled, so every request runs the model).
+"""
+import argparse
+import logging
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from config import Config, config
+
+BATCH_SIZES = (1, 32, 256)
+
+SAMPLE_INPUT = {
+    'jobTitle': 'Data Scientist',
+    'yearsExperience': 5,
+    'experienceLevel': 'Senior',
+    'companyLocation': 'Canada',
+    'companySize': 'Large',
+    'remoteRatio': 50,
+    'requiredSkills': ['Python', 'AWS'],
+    'benefits': ['Health Insurance'],
+    'jobDescription': 'Build and deploy models'
+}
+
+def time_ms(fn, repeats: int) -> np.ndarray:
+    fn()
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings[i] = (time.perf_counter() - started) * 1000
+    return timings
+
+def request_latency(method: str, requests: int) -> np.ndarray:
+    """/api/predict latencies with the given factors method, varying the input so the cache cannot help"""
+    from app import create_app
+    
+    class BenchmarkConfig(config['development']):
+        PREDICTION_FACTORS_METHOD = method
+        PREDICTION_CACHE_ENABLED = False
+        PARTIAL_DEPENDENCE_ENABLED = False
+    config['benchmark'] = BenchmarkConfig
+    client = create_app('benchmark').test_client()
+    
+    timings = np.empty(requests)
+    for i in range(requests):
+        payload = dict(SAMPLE_INPUT, yearsExperience=i % 26)
+        started = time.perf_counter()
+        response = client.post('/api/predict', json=payload)
+        timings[i] = (time.perf_counter() - started) * 1000
+        assert response.status_code == 200, response.get_json()
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency of tree-path prediction factors')
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    logging.disable(logging.INFO)
+    
+    from models.model_loader import ModelLoader
+    loader = ModelLoader(config={key: getattr(Config, key) for key in dir(Config) if key.isupper()})
+    if not loader.load_model() or not loader.supports_contributions:
+        print("Model could not be loaded and compiled - contributions need a tree ensemble")
+        return 1
+    
+    forest = loader.compiled_forest
+    X = pd.read_csv(Config.NEIGHBORS_FEATURES_PATH)[loader.feature_names].to_numpy(dtype=np.float64)[:args.rows]
+    bias, contributions = forest.contributions(X)
+    error = np.abs(bias + contributions.sum(axis=1) - forest.predict(X)).max()
+    print(f"{len(X):,} rows, {forest.n_trees} trees: max |bias + sum(contributions) - prediction| = ${error:.2e}")
+    print()
+    
+    print(f"   {'rows':>5}  {'predict p50':>11}  {'contributions p50':>17}  {'per row':>9}")
+    for batch_size in BATCH_SIZES:
+        batch = X[:batch_size]
+        predict = time_ms(lambda: forest.predict(batch), args.repeats)
+        explain = time_ms(lambda: forest.contributions(batch), args.repeats)
+        print(f"   {batch_size:>5}  {np.median(predict):>9.3f}ms  {np.median(explain):>15.3f}ms  "
+              f"{np.median(explain) / batch_size:>7.3f}ms")
+    print()
+    
+    print(f"POST /api/predict ({args.requests} requests):")
+    for method in ('heuristic', 'contributions'):
+        latency = request_latency(method, args.requests)
+        print(f"   {method:>13}:  p50 {np.median(latency):.3f}ms  p99 {np.percentile(latency, 99):.3f}ms")
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Benchmark bitmap-indexed dashboard filtering against chained DataFrame masks.
+
+Usage (from flask-backend/):
+    python -m scripts.benchmark_filters [--sizes 15000,1000000,10000000] [--repeats 20] [--narrow]
+
+Rows of the cleaned analytics dataset are resampled to each size. For a few
+filter combinations the script times the previous apply_filters() path
+(self.df.copy() followed by one boolean-mask slice per filter) against
+RowIndex.select() plus gathering the analytics columns of the selected rows,
+and checks that both select the same rows. Index build time and size are
+reported per size. --narrow keeps only the analytics columns in the resampled
+frame, which the copy path needs to fit 10M rows in a few GB of memory.
+"""
+import argparse
+import gc
+import logging
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from routes.analytics import ANALYTICS_COLUMNS, AnalyticsProcessor
+from utils.row_index import SALARY_RANGES, RowIndex
+
+FILTER_SETS = {
+    'none': {},
+    'location': {'location': 'United States'},
+    'location+level': {'location': 'United States', 'experienceLevel': 'Senior Level'},
+    'all four': {'location': 'United States', 'experienceLevel': 'Senior Level',
+                 'companySize': 'Large', 'salaryRange': '100k-150k'}
+}
+
+def legacy_filter(df: pd.DataFrame, filters) -> pd.DataFrame:
+    """The filtering apply_filters() did before the row index: copy, then one mask per filter"""
+    filtered_df = df.copy()
+    if filters.get('location') and filters['location'] != 'All':
+        filtered_df = filtered_df[filtered_df['location_clean'] == filters['location']]
+    if filters.get('experienceLevel') and filters['experienceLevel'] != 'All':
+        filtered_df = filtered_df[filtered_df['experience_level'] == filters['experienceLevel']]
+    if filters.get('companySize') and filters['companySize'] != 'All':
+        filtered_df = filtered_df[filtered_df['company_size'] == filters['companySize']]
+    if filters.get('salaryRange') in SALARY_RANGES:
+        min_sal, max_sal = SALARY_RANGES[filters['salaryRange']]
+        filtered_df = filtered_df[(filtered_df['salary_usd'] >= min_sal) & (filtered_df['salary_usd'] <= max_sal)]
+    return filtered_df
+
+def time_ms(fn, repeats: int) -> float:
+    fn()
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings[i] = (time.perf_counter() - started) * 1000
+    return float(np.median(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency of bitmap-indexed analytics filtering')
+    parser.add_argument('--sizes', default='15000,1000000,10000000')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--narrow', action='store_true', help='resample only the analytics columns')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    logging.disable(logging.INFO)
+    
+    source = AnalyticsProcessor().df.reset_index(drop=True)
+    if args.narrow:
+        source = source[[column for column in ANALYTICS_COLUMNS if column in source.columns]]
+    rng = np.random.default_rng(0)
+    
+    for size in (int(value) for value in args.sizes.split(',')):
+        df = source.iloc[rng.integers(0, len(source), size)].reset_index(drop=True)
+        started = time.perf_counter()
+        row_index = RowIndex(df)
+        build_ms = (time.perf_counter() - started) * 1000
+        analytics_df = df[[column for column in ANALYTICS_COLUMNS if column in df.columns]]
+        repeats = max(3, args.repeats * 15000 // size)
+        
+        print(f"{size:,} rows ({len(df.columns)} columns): index built in {build_ms:.0f}ms, "
+              f"{row_index.nbytes / 1024 ** 2:.1f} MB")
+        print(f"   {'filters':>15}  {'rows':>10}  {'copy + masks':>12}  {'row index':>10}  {'speedup':>7}")
+        for name, filters in FILTER_SETS.items():
+            rows = row_index.select(filters)
+            expected = legacy_filter(df, filters)
+            selected = df.index if rows is None else df.index[rows]
+            assert expected.index.equals(selected), name
+            
+            legacy = time_ms(lambda: legacy_filter(df, filters), repeats)
+            
+            def indexed():
+                rows = row_index.select(filters)
+                return analytics_df if rows is None else analytics_df.take(rows)
+            indexed_ms = time_ms(indexed, repeats)
+            # Unfiltered requests share the analytics columns, so there is nothing to compare
+            speedup = f"{legacy / indexed_ms:>6.1f}x" if rows is not None else f"{'shared':>7}"
+            print(f"   {name:>15}  {len(expected):>10,}  {legacy:>10.2f}ms  {indexed_ms:>8.2f}ms  {speedup}")
+        print()
+        
+        # Rebound rather than deleted: the timing closures above still refer to these names
+        df = analytics_df = row_index = expected = None
+        gc.collect()
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Benchmark the comparable-postings KD-tree: build time, memory and query latency.
+
+Usage (from flask-backend/):
+    python -m scripts.benchmark_neighbors [--synthetic-rows 10000000] [--queries 2000] [--k 10]
+
+Runs once on the real training matrix (dataset/modeling, 15k rows) and once on
+a synthetic matrix of --synthetic-rows rows, made by resampling real rows and
+jittering their numeric columns. The synthetic run needs roughly
+2 x rows x features x 8 bytes of memory while the tree is built.
+"""
+import argparse
+import sys
+import time
+import logging
+import numpy as np
+import pandas as pd
+
+from config import Config
+from models.neighbor_index import NeighborIndex
+from utils.preprocessing import preprocessor
+
+def synthetic_matrix(X: np.ndarray, n_rows: int, numeric: np.ndarray, seed: int = 0,
+                     chunk_rows: int = 1_000_000) -> np.ndarray:
+    """Resampled real rows with Gaussian jitter (0.25 standard deviations) on numeric columns"""
+    rng = np.random.default_rng(seed)
+    out = np.empty((n_rows, X.shape[1]), dtype=np.float64)
+    noise = X[:, numeric].std(axis=0) * 0.25
+    for start in range(0, n_rows, chunk_rows):
+        end = min(start + chunk_rows, n_rows)
+        out[start:end] = X[rng.integers(0, len(X), size=end - start)]
+        out[start:end, numeric] += rng.normal(size=(end - start, numeric.sum())) * noise
+    return out
+
+def run(label: str, X: np.ndarray, salaries: np.ndarray, names, queries: np.ndarray,
+        k: int, leaf_size: int, batch_size: int):
+    index = NeighborIndex(X, salaries, names, np.arange(X.shape[1]), leaf_size=leaf_size)
+    
+    single = np.empty(len(queries))
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        index.query(queries[i:i + 1], k)
+        single[i] = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    for offset in range(0, len(queries), batch_size):
+        index.query(queries[offset:offset + batch_size], k)
+    batched = time.perf_counter() - start
+    
+    print(f"{label}")
+    print(f"   rows x features:    {index.n_rows:,} x {X.shape[1]}")
+    print(f"   build time:         {index.build_seconds:.2f} s")
+    print(f"   index memory:       {index.nbytes / 1e6:,.1f} MB")
+    print(f"   1-row query (k={k}): p50 {np.percentile(single, 50):.3f} ms, "
+          f"p99 {np.percentile(single, 99):.3f} ms, max {single.max():.3f} ms")
+    print(f"   {batch_size}-row batches:   {len(queries) / batched:,.0f} queries/s")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the comparable-postings neighbor index')
+    parser.add_argument('--synthetic-rows', type=int, default=10_000_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--k', type=int, default=Config.NEIGHBORS_DEFAULT_K)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--leaf-size', type=int, default=Config.NEIGHBORS_LEAF_SIZE)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    excluded = set(Config.NEIGHBORS_EXCLUDED_FEATURES)
+    names = [name for name in preprocessor.expected_features if name not in excluded]
+    X = pd.read_csv(Config.NEIGHBORS_FEATURES_PATH)[names].to_numpy(dtype=np.float64)
+    salaries = pd.read_csv(Config.NEIGHBORS_TARGET_PATH).iloc[:, 0].to_numpy(dtype=np.float64)
+    
+    # Queries are real rows, as the preprocessor would produce them for real postings
+    rng = np.random.default_rng(1)
+    queries = X[rng.integers(0, len(X), size=args.queries)]
+    
+    run('Training postings:', X, salaries, names, queries, args.k, args.leaf_size, args.batch_size)
+    
+    if args.synthetic_rows > 0:
+        numeric = np.array([not name.startswith(('country_grouped_', 'job_category_')) for name in names])
+        synthetic = synthetic_matrix(X, args.synthetic_rows, numeric)
+        synthetic_salaries = np.resize(salaries, args.synthetic_rows)
+        print()
+        run('Synthetic postings:', synthetic, synthetic_salaries, names, queries,
+            args.k, args.leaf_size, args.batch_size)
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
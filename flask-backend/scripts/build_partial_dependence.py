@@ -0,0 +1,53 @@
+"""
+Precompute the partial dependence cache for the current model.
+
+Usage (from flask-backend/):
+    python -m scripts.build_partial_dependence [--sample-size 500] [--grid-resolution 20] [--ice-rows 50]
+
+Writes models/partial_dependence/<model hash>.json, the file the app otherwise
+computes in the background on its first start with a new model. Run it at
+image build time so /api/model/partial-dependence is ready immediately. The
+parameters must match the app's PARTIAL_DEPENDENCE_* settings for the app to
+use the file.
+"""
+import argparse
+import logging
+import sys
+
+from config import Config
+from models.model_loader import ModelLoader
+from models.partial_dependence import PartialDependenceStore, build_partial_dependence
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute partial dependence curves for the model')
+    parser.add_argument('--features', default=Config.NEIGHBORS_FEATURES_PATH)
+    parser.add_argument('--output-dir', default=Config.PARTIAL_DEPENDENCE_DIR)
+    parser.add_argument('--sample-size', type=int, default=Config.PARTIAL_DEPENDENCE_SAMPLE_SIZE)
+    parser.add_argument('--grid-resolution', type=int, default=Config.PARTIAL_DEPENDENCE_GRID_RESOLUTION)
+    parser.add_argument('--ice-rows', type=int, default=Config.PARTIAL_DEPENDENCE_ICE_ROWS)
+    parser.add_argument('--seed', type=int, default=Config.PARTIAL_DEPENDENCE_SEED)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    loader = ModelLoader(config={key: getattr(Config, key) for key in dir(Config) if key.isupper()})
+    if not loader.load_model():
+        print("Model could not be loaded")
+        return 1
+    
+    parameters = {
+        'sample_size': args.sample_size,
+        'grid_resolution': args.grid_resolution,
+        'ice_rows': args.ice_rows,
+        'seed': args.seed
+    }
+    result = build_partial_dependence(loader, args.features, **parameters)
+    store = PartialDependenceStore(args.output_dir, loader.model_hash, parameters)
+    store.save(result)
+    
+    print(f"{len(result['features'])} features over {result['background_rows']} rows "
+          f"in {result['compute_seconds']:.1f}s -> {store.path}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Precompute model outputs over the reachable feature grid.
+
+Usage (from flask-backend/):
+    python -m scripts.build_prediction_table [--desc-buckets N] [--output PATH]
+
+Writes PREDICTION_TABLE_PATH (.npy, memory-mapped at runtime) plus a .json
+file with the axes, the model hash it was built for and the accuracy delta
+measured against the live forest.
+"""
+import argparse
+import logging
+import sys
+
+from config import Config
+from models.model_loader import ModelLoader
+from models.prediction_table import PredictionLookupTable
+from utils.preprocessing import preprocessor
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the prediction lookup table')
+    parser.add_argument('--desc-buckets', type=int, default=Config.PREDICTION_TABLE_DESC_BUCKETS,
+                        help='Number of job_desc_log buckets')
+    parser.add_argument('--output', default=Config.PREDICTION_TABLE_PATH,
+                        help='Where to write the .npy table')
+    parser.add_argument('--samples', type=int, default=20000,
+                        help='Random reachable inputs used to measure the accuracy delta')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    loader = ModelLoader(config={
+        'MODEL_PATH': Config.MODEL_PATH,
+        'SCALER_PATH': Config.SCALER_PATH,
+        'FEATURE_NAMES_PATH': Config.FEATURE_NAMES_PATH,
+        'INFERENCE_ENGINE': 'compiled',
+        'PREDICTION_TABLE_ENABLED': False
+    })
+    if not loader.load_model() or loader.compiled_forest is None:
+        print("Model could not be loaded and compiled - a lookup table needs a tree ensemble")
+        return 1
+
+    domains = preprocessor.feature_domains()
+    table = PredictionLookupTable.build(
+        loader.compiled_forest,
+        loader.feature_names,
+        domains,
+        desc_buckets=args.desc_buckets,
+        model_hash=loader.model_hash
+    )
+    report = table.evaluate(loader.compiled_forest, domains, n_samples=args.samples)
+    table.save(args.output)
+
+    print(f"Table shape:        {tuple(table.table.shape)}")
+    print(f"Table size:         {table.nbytes / 1e6:.1f} MB")
+    print(f"Build time:         {table.meta['build_seconds']} s")
+    print(f"Accuracy vs forest on {report['samples']:,} random reachable inputs:")
+    print(f"   hit rate:          {report['hit_rate']:.1%}")
+    print(f"   mean |delta|:      ${report['mean_abs_delta']:,.2f}")
+    print(f"   p99 |delta|:       ${report['p99_abs_delta']:,.2f}")
+    print(f"   max |delta|:       ${report['max_abs_delta']:,.2f}")
+    print(f"   within $1:         {report['within_one_dollar']:.1%}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Check that the compiled forest engine reproduces sklearn's predictions exactly.
+
+Usage (from flask-backend/):
+    python -m scripts.check_forest_parity [path/to/X_features_for_modeling.csv]
+
+Also times both engines over growing batches, the measurement behind
+COMPILED_FOREST_MAX_ROWS. Exits with status 1 if any prediction differs.
+"""
+import sys
+import time
+import logging
+import numpy as np
+import pandas as pd
+
+from config import Config
+from models.model_loader import ModelLoader
+
+DEFAULT_FEATURES_PATH = Config.BASE_DIR.parent / 'dataset' / 'modeling' / 'X_features_for_modeling.csv'
+# Batch sizes timed to find where sklearn's threaded predict overtakes the compiled engine
+BATCH_SIZES = (1, 2, 4, 8, 16, 32, 48, 64, 96, 128, 192, 256)
+
+def time_call(fn, repeat=20):
+    """Best-of-N wall time in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    features_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FEATURES_PATH
+    
+    loader = ModelLoader(config={
+        'MODEL_PATH': Config.MODEL_PATH,
+        'SCALER_PATH': Config.SCALER_PATH,
+        'FEATURE_NAMES_PATH': Config.FEATURE_NAMES_PATH,
+        'INFERENCE_ENGINE': 'compiled'
+    })
+    if not loader.load_model() or loader.compiled_forest is None:
+        print("Model could not be loaded and compiled")
+        return 1
+    
+    X = pd.read_csv(features_path)[loader.feature_names].to_numpy(dtype=np.float64)
+    forest = loader.compiled_forest
+    
+    # Sequential sklearn predict accumulates trees in order, like the compiled engine
+    loader.model.n_jobs = 1
+    expected = loader.model.predict(X)
+    actual = forest.predict(X)
+    
+    mismatches = int(np.count_nonzero(actual != expected))
+    print(f"Rows checked:      {len(X):,}")
+    print(f"Trees / nodes:     {forest.n_trees} / {forest.n_nodes:,} (depth {forest.max_depth})")
+    print(f"Exact mismatches:  {mismatches}")
+    print(f"Max abs diff:      {float(np.abs(actual - expected).max()):.3e}")
+    
+    # Serving uses sklearn's default (threaded) predict for batches above COMPILED_FOREST_MAX_ROWS
+    loader.model.n_jobs = None
+    print(f"\n{'rows':>6}  {'sklearn':>10}  {'compiled':>10}")
+    crossover = None
+    for size in BATCH_SIZES:
+        batch = X[:size]
+        sklearn_ms = time_call(lambda: loader.model.predict(batch))
+        compiled_ms = time_call(lambda: forest.predict(batch))
+        print(f"{size:>6}  {sklearn_ms:>7.3f} ms  {compiled_ms:>7.3f} ms")
+        if crossover is None and compiled_ms >= sklearn_ms:
+            crossover = size
+    if crossover is None:
+        print(f"Compiled engine is faster up to {BATCH_SIZES[-1]} rows")
+    else:
+        print(f"sklearn is faster from {crossover} rows "
+              f"(COMPILED_FOREST_MAX_ROWS = {Config.COMPILED_FOREST_MAX_ROWS})")
+    
+    return 0 if mismatches == 0 else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
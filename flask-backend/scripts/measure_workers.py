@@ -0,0 +1,119 @@
+"""
+Measure per-worker memory and startup time of the production gunicorn setup.
+
+Usage (from flask-backend/, Linux only):
+    python -m scripts.measure_workers [--workers N] [--port PORT]
+
+Starts gunicorn twice, with and without preload_app, waits until every worker
+has logged that it is ready, then reads /proc for each worker:
+  RSS      resident pages, shared ones included
+  PSS      resident pages with shared pages split across the processes using them
+  Private  pages only this worker uses
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import urllib.request
+
+READY_PATTERN = re.compile(r'Worker ready \(pid (\d+)\)')
+SAMPLE_INPUT = {
+    'jobTitle': 'Data Scientist',
+    'yearsExperience': 5,
+    'experienceLevel': 'Senior',
+    'companyLocation': 'United States',
+    'companySize': 'Large',
+    'remoteRatio': 50,
+    'requiredSkills': ['Python', 'AWS'],
+    'jobDescription': 'Build and ship production models'
+}
+
+def read_kb(path: str, field: str) -> int:
+    """Sum a kB field from a /proc status or smaps_rollup file"""
+    total = 0
+    with open(path) as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                total += int(line.split()[1])
+    return total
+
+def worker_memory(pid: int) -> dict:
+    rollup = f'/proc/{pid}/smaps_rollup'
+    return {
+        'rss_mb': read_kb(f'/proc/{pid}/status', 'VmRSS') / 1024,
+        'pss_mb': read_kb(rollup, 'Pss') / 1024,
+        'private_mb': (read_kb(rollup, 'Private_Clean') + read_kb(rollup, 'Private_Dirty')) / 1024
+    }
+
+def run_server(preload: bool, workers: int, port: int, timeout: float = 300) -> dict:
+    env = dict(os.environ,
+               GUNICORN_PRELOAD='1' if preload else '0',
+               GUNICORN_WORKERS=str(workers),
+               GUNICORN_BIND=f'127.0.0.1:{port}',
+               GUNICORN_TIMEOUT='300')
+    start = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', "app:create_app('production')"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    
+    try:
+        ready = []
+        while len(ready) < workers:
+            line = server.stderr.readline()
+            if not line:
+                raise RuntimeError('gunicorn exited before all workers were ready')
+            match = READY_PATTERN.search(line)
+            if match:
+                ready.append(int(match.group(1)))
+            if time.monotonic() - start > timeout:
+                raise RuntimeError('Timed out waiting for workers')
+        startup = time.monotonic() - start
+        
+        # Exercise the prediction path so lazily-faulted pages are counted
+        for _ in range(workers * 4):
+            request = urllib.request.Request(
+                f'http://127.0.0.1:{port}/api/predict',
+                data=json.dumps(SAMPLE_INPUT).encode(),
+                headers={'Content-Type': 'application/json'}
+            )
+            urllib.request.urlopen(request).read()
+        
+        return {
+            'startup_s': startup,
+            'master': worker_memory(server.pid),
+            'workers': [worker_memory(pid) for pid in ready]
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+def print_report(label: str, result: dict):
+    workers = result['workers']
+    print(f"{label}")
+    print(f"   all workers ready after: {result['startup_s']:.2f} s")
+    print(f"   master RSS:              {result['master']['rss_mb']:.0f} MB")
+    for key, name in (('rss_mb', 'RSS'), ('pss_mb', 'PSS'), ('private_mb', 'Private')):
+        values = [w[key] for w in workers]
+        print(f"   per-worker {name:<8}      {sum(values) / len(values):.0f} MB avg "
+              f"({', '.join(f'{v:.0f}' for v in values)})")
+    total_pss = result['master']['pss_mb'] + sum(w['pss_mb'] for w in workers)
+    print(f"   total PSS (master + workers): {total_pss:.0f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare gunicorn memory with and without preload')
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    
+    print_report('Without preload (each worker loads everything):',
+                 run_server(False, args.workers, args.port))
+    print_report('With preload + gc.freeze (loaded once in the master):',
+                 run_server(True, args.workers, args.port))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+import itertools
+import logging
+import time
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Collection, Dict, List, Optional, Sequence, Tuple
+
+from utils.row_index import FILTER_COLUMNS, SALARY_RANGES
+
+logger = logging.getLogger(__name__)
+
+ALL = 'All'
+
+class AnalyticsCube:
+    """Aggregates behind every dashboard section, for every filter combination
+    
+    The dashboard filters (location x experienceLevel x companySize x
+    salaryRange, each with 'All') span a few thousand combinations. Rows are
+    bucketed once into fine cells: one per location, level, size and salary
+    class, where the classes split salary_usd at every salaryRange bound
+    (below, exactly at, and between bounds, since the ranges are inclusive at
+    both ends). Counts, sums, maxima, histograms and per-job-category totals
+    are computed per cell and rolled up: an 'All' slot is the sum over its
+    axis and a salary range is the sum over the classes it covers. Medians and
+    quartiles do not roll up, so they are computed once per combination from
+    the cells' salaries, which are kept sorted by cell.
+    
+    lookup() answers a filter combination by indexing these arrays; its cost
+    depends on the number of groups in the result, not the number of rows.
+    """
+    
+    def __init__(self, df: pd.DataFrame, salary_bins: Callable[[float], Sequence[float]]):
+        started = time.perf_counter()
+        self.n_rows = len(df)
+        self.salary_bins = salary_bins
+        salaries = df['salary_usd'].to_numpy(dtype=np.float64)
+        
+        # Filter axes, values in groupby (sorted) order; the 'All' slot is the last index
+        self.axes: List[List[Any]] = []
+        codes = []
+        for column in FILTER_COLUMNS.values():
+            column_codes, uniques = pd.factorize(df[column], sort=True)
+            self.axes.append(list(uniques))
+            codes.append(column_codes)
+        if any((column_codes < 0).any() for column_codes in codes) or df['job_category'].isna().any():
+            raise ValueError("Filter and job category columns must not contain missing values")
+        self.positions = [{value: index for index, value in enumerate(values)} for values in self.axes]
+        
+        # Salary classes: 2i is strictly between bound i-1 and bound i, 2i+1 is exactly bound i
+        bounds = np.array(sorted({bound for range_bounds in SALARY_RANGES.values() for bound in range_bounds
+                                  if np.isfinite(bound)}), dtype=np.float64)
+        left = np.searchsorted(bounds, salaries, side='left')
+        exact = left < len(bounds)
+        exact[exact] = bounds[left[exact]] == salaries[exact]
+        salary_class = 2 * left + exact
+        n_classes = 2 * len(bounds) + 1
+        self.ranges = list(SALARY_RANGES)
+        self.range_classes = np.zeros((len(self.ranges) + 1, n_classes), dtype=bool)
+        for index, (lower, upper) in enumerate(SALARY_RANGES.values()):
+            for cls in range(n_classes):
+                bound = cls // 2
+                if cls % 2:
+                    low = high = bounds[bound]
+                else:
+                    low = bounds[bound - 1] if bound > 0 else -np.inf
+                    high = bounds[bound] if bound < len(bounds) else np.inf
+                self.range_classes[index, cls] = lower <= low and high <= upper
+        self.range_classes[-1] = True
+        
+        # Fine cells, rows sorted by cell and then salary
+        shape = tuple(len(values) for values in self.axes) + (n_classes,)
+        cell = np.ravel_multi_index(tuple(codes) + (salary_class,), shape)
+        order = np.lexsort((salaries, cell))
+        sorted_cells = cell[order]
+        self.sorted_salaries = salaries[order]
+        self.cell_bounds = np.searchsorted(sorted_cells, np.arange(np.prod(shape) + 1)).reshape(-1)
+        self.cell_shape = shape
+        n_cells = int(np.prod(shape))
+        
+        count = np.bincount(cell, minlength=n_cells).astype(np.int64)
+        total = np.bincount(cell, weights=salaries, minlength=n_cells)
+        maximum = np.zeros(n_cells)
+        filled = count > 0
+        maximum[filled] = self.sorted_salaries[self.cell_bounds[1:][filled] - 1]
+        
+        # Histogram on the bins used for the whole dataset; every filtered histogram uses a prefix
+        # of them. Bins are half-open, with values exactly on an edge counted separately so the
+        # closed last bin of np.histogram can be reproduced for any prefix
+        self.edges = np.asarray(salary_bins(float(salaries.max())), dtype=np.float64)
+        n_bins = max(len(self.edges) - 1, 0)
+        histogram = np.zeros((n_cells, max(n_bins, 1)), dtype=np.int64)
+        on_edge = np.zeros((n_cells, len(self.edges)), dtype=np.int64)
+        if n_bins:
+            width = self.edges[1] - self.edges[0]
+            offset = (salaries - self.edges[0]) / width
+            in_bins = (offset >= 0) & (offset < n_bins)
+            histogram = np.bincount(cell[in_bins] * n_bins + offset[in_bins].astype(np.int64),
+                                    minlength=n_cells * n_bins).reshape(n_cells, n_bins)
+            at_edge = (offset >= 0) & (offset <= n_bins) & (offset == np.floor(offset))
+            on_edge = np.bincount(cell[at_edge] * len(self.edges) + offset[at_edge].astype(np.int64),
+                                  minlength=n_cells * len(self.edges)).reshape(n_cells, len(self.edges))
+        
+        # Job categories are not a filter, so they are an extra axis of counts and sums
+        category_codes, categories = pd.factorize(df['job_category'], sort=True)
+        self.categories = list(categories)
+        n_categories = len(self.categories)
+        category_count = np.bincount(cell * n_categories + category_codes,
+                                     minlength=n_cells * n_categories).reshape(n_cells, n_categories)
+        category_total = np.bincount(cell * n_categories + category_codes, weights=salaries,
+                                     minlength=n_cells * n_categories).reshape(n_cells, n_categories)
+        
+        self.count = self._roll_up(count.reshape(shape))
+        self.total = self._roll_up(total.reshape(shape))
+        self.maximum = self._roll_up(maximum.reshape(shape), np.max)
+        self.histogram = self._roll_up(histogram.reshape(shape + histogram.shape[1:]))
+        self.on_edge = self._roll_up(on_edge.reshape(shape + on_edge.shape[1:]))
+        self.category_count = self._roll_up(category_count.reshape(shape + (n_categories,)))
+        self.category_total = self._roll_up(category_total.reshape(shape + (n_categories,)))
+        
+        # Per-location medians and per-level quartiles, the statistics that do not roll up
+        n_locations, n_levels, n_sizes = (len(values) for values in self.axes)
+        self.location_median = np.full(self.count.shape, np.nan)
+        self.level_quartiles = np.full(self.count.shape + (3,), np.nan)
+        for combination in itertools.product(*(range(n + 1) for n in (n_locations, n_levels, n_sizes)),
+                                             range(len(self.ranges) + 1)):
+            if self.count[combination] == 0:
+                continue
+            location, level = combination[:2]
+            if location < n_locations:
+                self.location_median[combination] = np.median(self._salaries(combination))
+            if level < n_levels:
+                self.level_quartiles[combination] = np.quantile(self._salaries(combination), [0.25, 0.5, 0.75])
+        
+        self.build_seconds = time.perf_counter() - started
+        logger.info(f"Analytics cube built: {self.n_rows} rows, {self.combinations} filter combinations "
+                    f"in {self.build_seconds:.2f}s ({self.nbytes / 1024 ** 2:.1f} MB)")
+    
+    def _roll_up(self, values: np.ndarray, reduce=np.sum) -> np.ndarray:
+        """Add an 'All' slot to each filter axis and replace salary classes by salary ranges (+ 'All')"""
+        for axis in range(3):
+            values = np.concatenate([values, reduce(values, axis=axis, keepdims=True)], axis=axis)
+        return np.stack([reduce(values[:, :, :, classes], axis=3) for classes in self.range_classes], axis=3)
+    
+    def _salaries(self, combination: Tuple[int, int, int, int]) -> np.ndarray:
+        """Salaries of the rows in a filter combination, gathered from its fine cells"""
+        axes = [range(len(values)) if index == len(values) else [index]
+                for index, values in zip(combination[:3], self.axes)]
+        classes = np.flatnonzero(self.range_classes[combination[3]])
+        cells = np.ravel_multi_index(np.array(list(itertools.product(*axes, classes))).T, self.cell_shape)
+        return np.concatenate([self.sorted_salaries[self.cell_bounds[cell]:self.cell_bounds[cell + 1]]
+                               for cell in cells])
+    
+    @property
+    def combinations(self) -> int:
+        return int(np.prod(self.count.shape))
+    
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.count, self.total, self.maximum, self.histogram, self.on_edge, self.category_count,
+                  self.category_total, self.location_median, self.level_quartiles)
+        return sum(array.nbytes for array in arrays) + self.sorted_salaries.nbytes + self.cell_bounds.nbytes
+    
+    def index_of(self, filters: Dict[str, str]) -> Optional[Tuple[int, int, int, int]]:
+        """Cube coordinates of the filters, or None when a value matches no rows"""
+        combination = []
+        for parameter, positions in zip(FILTER_COLUMNS, self.positions):
+            value = filters.get(parameter)
+            if not value or value == ALL:
+                combination.append(len(positions))
+            elif value in positions:
+                combination.append(positions[value])
+            else:
+                return None
+        salary_range = filters.get('salaryRange')
+        combination.append(self.ranges.index(salary_range) if salary_range in self.ranges else len(self.ranges))
+        return tuple(combination)
+    
+    def lookup(self, filters: Dict[str, str], include: Optional[Collection[str]] = None) -> Dict[str, Any]:
+        """
+        Section statistics for a filter combination
+        
+        Returns the row count and mean salary, the salary histogram as
+        (edges, counts), and per-group rows in groupby order:
+        geographic (location, mean, median, count), experience
+        (level, mean, count, q25, median, q75), company_size (size, mean, count)
+        and job_titles (category, count, mean). include names the statistics
+        to look up besides count and mean (all when None); the others are
+        left empty.
+        """
+        combination = self.index_of(filters)
+        count = 0 if combination is None else int(self.count[combination])
+        stats = {'count': count, 'mean': None, 'distribution': None,
+                 'geographic': [], 'experience': [], 'company_size': [], 'job_titles': []}
+        if count == 0:
+            return stats
+        
+        location, level, size, salary_range = combination
+        stats['mean'] = self.total[combination] / count
+        if include is None:
+            include = stats.keys()
+        
+        if 'distribution' in include:
+            edges = np.asarray(self.salary_bins(float(self.maximum[combination])), dtype=np.float64)
+            n_bins = max(len(edges) - 1, 0)
+            if n_bins > len(self.edges) - 1 or (n_bins and not np.array_equal(edges, self.edges[:len(edges)])):
+                raise ValueError("Filtered salary bins must be a prefix of the dataset's bins")
+            counts = self.histogram[combination][:n_bins].copy()
+            if n_bins:
+                # np.histogram closes its last bin on the right
+                counts[-1] += self.on_edge[combination][n_bins]
+            stats['distribution'] = (edges, counts)
+        
+        def groups(axis: int, selected: int):
+            """(index, coordinates) of each non-empty group along a filter axis"""
+            indexes = range(len(self.axes[axis])) if selected == len(self.axes[axis]) else [selected]
+            for index in indexes:
+                coordinates = list(combination)
+                coordinates[axis] = index
+                coordinates = tuple(coordinates)
+                if self.count[coordinates]:
+                    yield index, coordinates
+        
+        if 'geographic' in include:
+            for index, coordinates in groups(0, location):
+                group_count = int(self.count[coordinates])
+                stats['geographic'].append((self.axes[0][index], self.total[coordinates] / group_count,
+                                            float(self.location_median[coordinates]), group_count))
+        if 'experience' in include:
+            for index, coordinates in groups(1, level):
+                group_count = int(self.count[coordinates])
+                stats['experience'].append((self.axes[1][index], self.total[coordinates] / group_count,
+                                            group_count, *(float(q) for q in self.level_quartiles[coordinates])))
+        if 'company_size' in include:
+            for index, coordinates in groups(2, size):
+                group_count = int(self.count[coordinates])
+                stats['company_size'].append((self.axes[2][index], self.total[coordinates] / group_count,
+                                              group_count))
+        
+        if 'job_titles' in include:
+            category_count = self.category_count[combination]
+            category_total = self.category_total[combination]
+            for index in np.flatnonzero(category_count):
+                stats['job_titles'].append((self.categories[index], int(category_count[index]),
+                                            category_total[index] / category_count[index]))
+        return stats
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'status': 'ready',
+            'rows': self.n_rows,
+            'combinations': self.combinations,
+            'build_seconds': round(self.build_seconds, 3),
+            'memory_mb': round(self.nbytes / 1024 ** 2, 2)
+        }
@@ -5,14 +5,25 @@ import logging
 import os
 from typing import Dict, Any, List, Optional
 
+from utils.fused_aggregation import FusedAggregator
+from utils.row_index import RowIndex
+
 logger = logging.getLogger(__name__)
 
+# Columns the dashboard aggregations read; filtered views gather only these
+ANALYTICS_COLUMNS = ['salary_usd', 'location_clean', 'experience_level', 'company_size', 'job_category', 'job_title']
+# Columns the dashboard sections group salaries by
+GROUP_COLUMNS = ['location_clean', 'experience_level', 'company_size', 'job_category']
+
 class AnalyticsProcessor:
     """Process real CSV data for analytics dashboard"""
     
     def __init__(self, csv_path: str = 'ai_jobs_data_cleaned.csv'):
         self.csv_path = csv_path
         self.df = None
+        self.analytics_df = None
+        self.row_index = None
+        self.aggregator = None
         self.load_data()
     
     def load_data(self):
@@ -76,6 +87,11 @@ class AnalyticsProcessor:
         if 'salary_usd' in self.df.columns:
             self.df = self.df[(self.df['salary_usd'] > 10000) & (self.df['salary_usd'] < 1000000)]
         
+        # Index the filter columns once so each request selects rows instead of copying the frame
+        self.analytics_df = self.df[[column for column in ANALYTICS_COLUMNS if column in self.df.columns]]
+        self.row_index = RowIndex(self.df)
+        self.aggregator = FusedAggregator(self.analytics_df, GROUP_COLUMNS)
+        
         logger.info(f"Data preprocessing complete: {len(self.df)} valid records")
     
     def _categorize_job_title(self, title: str) -> str:
@@ -121,53 +137,46 @@ class AnalyticsProcessor:
         
         return location_mapping.get(location, location)
     
+    def filter_rows(self, filters: Dict[str, str]) -> Optional[np.ndarray]:
+        """Row positions matching the filters from the bitmap index (None when nothing is filtered)"""
+        return self.row_index.select(filters)
+    
     def apply_filters(self, filters: Dict[str, str]) -> pd.DataFrame:
         """Apply filters to the dataset"""
         if self.df is None:
             return pd.DataFrame()
         
-        filtered_df = self.df.copy()
-        
-        # Apply location filter
-        if filters.get('location') and filters['location'] != 'All':
-            filtered_df = filtered_df[filtered_df['location_clean'] == filters['location']]
-        
-        # Apply experience level filter
-        if filters.get('experienceLevel') and filters['experienceLevel'] != 'All':
-            filtered_df = filtered_df[filtered_df['experience_level'] == filters['experienceLevel']]
-        
-        # Apply company size filter
-        if filters.get('companySize') and filters['companySize'] != 'All':
-            filtered_df = filtered_df[filtered_df['company_size'] == filters['companySize']]
-        
-        # Apply salary range filter
-        if filters.get('salaryRange') and filters['salaryRange'] != 'All':
-            salary_ranges = {
-                '50k-100k': (50000, 100000),
-                '100k-150k': (100000, 150000),
-                '150k+': (150000, float('inf'))
-            }
-            if filters['salaryRange'] in salary_ranges:
-                min_sal, max_sal = salary_ranges[filters['salaryRange']]
-                filtered_df = filtered_df[
-                    (filtered_df['salary_usd'] >= min_sal) & 
-                    (filtered_df['salary_usd'] <= max_sal)
-                ]
+        rows = self.filter_rows(filters)
+        filtered_df = self.df if rows is None else self.df.iloc[rows]
+        logger.info(f"Filters applied: {len(filtered_df)} records remaining from {len(self.df)}")
+        return filtered_df
+    
+    def filtered_view(self, filters: Dict[str, str]) -> pd.DataFrame:
+        """The analytics columns of the rows matching the filters; the unfiltered view is shared, not copied"""
+        if self.analytics_df is None:
+            return pd.DataFrame()
         
+        rows = self.filter_rows(filters)
+        filtered_df = self.analytics_df if rows is None else self.analytics_df.take(rows)
         logger.info(f"Filters applied: {len(filtered_df)} records remaining from {len(self.df)}")
         return filtered_df
     
+    def salary_bins(self, max_salary: float = None) -> range:
+        """Fixed $10k histogram bins from $30k to $220k"""
+        return range(30000, 230000, 10000)
+    
     def get_salary_distribution(self, filtered_df: pd.DataFrame) -> List[Dict]:
         """Generate salary distribution data"""
         if filtered_df.empty or 'salary_usd' not in filtered_df.columns:
             return []
         
         # Create salary bins
-        bins = range(30000, 230000, 10000)
-        labels = [f'${i//1000}k-{(i+10000)//1000}k' for i in bins[:-1]]
-        
+        bins = self.salary_bins()
         hist, _ = np.histogram(filtered_df['salary_usd'], bins=bins)
-        total = len(filtered_df)
+        return self._format_salary_distribution(bins, hist, len(filtered_df))
+    
+    def _format_salary_distribution(self, bins, hist, total: int) -> List[Dict]:
+        labels = [f'${i//1000}k-{(i+10000)//1000}k' for i in bins[:-1]]
         
         return [
             {
@@ -185,23 +194,21 @@ class AnalyticsProcessor:
             return []
         
         location_stats = filtered_df.groupby('location_clean').agg({
-            'salary_usd': ['mean', 'median', 'count'],
-            'job_title': 'count'
-        }).round(0)
-        
+            'salary_usd': ['mean', 'median', 'count']
+        })
+        return self._format_geographic_data(location_stats.itertuples(name=None))
+    
+    def _format_geographic_data(self, location_stats) -> List[Dict]:
+        """Dashboard rows from (location, mean, median, count) tuples in location order"""
         result = []
-        for location in location_stats.index:
-            avg_salary = location_stats.loc[location, ('salary_usd', 'mean')]
-            median_salary = location_stats.loc[location, ('salary_usd', 'median')]
-            job_count = location_stats.loc[location, ('salary_usd', 'count')]
-            
+        for location, avg_salary, median_salary, job_count in location_stats:
             # Calculate growth (mock for now, would need historical data)
             growth = round(np.random.normal(8, 5), 1)
             
             result.append({
                 'location': location,
-                'averageSalary': int(avg_salary),
-                'medianSalary': int(median_salary),
+                'averageSalary': int(np.round(avg_salary)),
+                'medianSalary': int(np.round(median_salary)),
                 'jobCount': int(job_count),
                 'growth': str(growth)
             })
@@ -214,23 +221,28 @@ class AnalyticsProcessor:
             return []
         
         exp_stats = filtered_df.groupby('experience_level').agg({
-            'salary_usd': ['mean', 'count', 'quantile'],
-        }).round(0)
+            'salary_usd': ['mean', 'count'],
+        })
         
-        result = []
+        rows = []
         for level in exp_stats.index:
             avg_salary = exp_stats.loc[level, ('salary_usd', 'mean')]
             job_count = exp_stats.loc[level, ('salary_usd', 'count')]
             
             # Calculate quartiles
             level_data = filtered_df[filtered_df['experience_level'] == level]['salary_usd']
-            q25 = level_data.quantile(0.25) if len(level_data) > 0 else avg_salary * 0.8
-            median = level_data.quantile(0.5) if len(level_data) > 0 else avg_salary * 0.9
-            q75 = level_data.quantile(0.75) if len(level_data) > 0 else avg_salary * 1.2
-            
+            rows.append((level, avg_salary, job_count, level_data.quantile(0.25),
+                         level_data.quantile(0.5), level_data.quantile(0.75)))
+        
+        return self._format_experience_data(rows)
+    
+    def _format_experience_data(self, exp_stats) -> List[Dict]:
+        """Dashboard rows from (level, mean, count, q25, median, q75) tuples"""
+        result = []
+        for level, avg_salary, job_count, q25, median, q75 in exp_stats:
             result.append({
                 'level': level,
-                'averageSalary': int(avg_salary),
+                'averageSalary': int(np.round(avg_salary)),
                 'jobCount': int(job_count),
                 'q25': int(q25),
                 'median': int(median),
@@ -282,20 +294,20 @@ class AnalyticsProcessor:
         size_stats = filtered_df.groupby('company_size').agg({
             'salary_usd': 'mean',
             'job_title': 'count'
-        }).round(0)
-        
+        })
+        return self._format_company_size_data(size_stats.itertuples(name=None))
+    
+    def _format_company_size_data(self, size_stats) -> List[Dict]:
+        """Dashboard rows from (size, mean, count) tuples in size order"""
         result = []
-        for size in size_stats.index:
-            avg_salary = size_stats.loc[size, 'salary_usd']
-            job_count = size_stats.loc[size, 'job_title']
-            
+        for size, avg_salary, job_count in size_stats:
             # Mock benefits and remote ratio (would need additional data)
             benefits = round(np.random.normal(6.5, 1.5), 1)
             remote_ratio = np.random.randint(40, 80)
             
             result.append({
                 'size': size,
-                'averageSalary': int(avg_salary),
+                'averageSalary': int(np.round(avg_salary)),
                 'jobCount': int(job_count),
                 'benefits': benefits,
                 'remoteRatio': remote_ratio
@@ -309,12 +321,16 @@ class AnalyticsProcessor:
     
     def get_trend_data(self, filtered_df: pd.DataFrame) -> List[Dict]:
         """Generate trend data (mock historical data)"""
+        return self._format_trend_data(filtered_df['salary_usd'].mean() if not filtered_df.empty else None,
+                                       len(filtered_df))
+    
+    def _format_trend_data(self, mean_salary: Optional[float], count: int) -> List[Dict]:
         months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
                  'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
         
         # Base on current data but add temporal variation
-        base_salary = filtered_df['salary_usd'].mean() if not filtered_df.empty else 100000
-        base_jobs = max(len(filtered_df) // 12, 10)
+        base_salary = mean_salary if mean_salary is not None else 100000
+        base_jobs = max(count // 12, 10)
         
         result = []
         for i, month in enumerate(months):
@@ -341,45 +357,77 @@ class AnalyticsProcessor:
         title_stats = filtered_df.groupby('job_category').agg({
             'job_title': 'count',
             'salary_usd': 'mean'
-        }).round(0)
-        
+        })
+        return self._format_job_title_data(title_stats.itertuples(name=None))
+    
+    def _format_job_title_data(self, title_stats) -> List[Dict]:
+        """Dashboard rows from (category, count, mean) tuples in category order"""
         result = []
-        for title in title_stats.index:
-            count = title_stats.loc[title, 'job_title']
-            avg_salary = title_stats.loc[title, 'salary_usd']
+        for title, count, avg_salary in title_stats:
             growth = round(np.random.normal(10, 8), 1)
             
             result.append({
                 'title': title,
                 'count': int(count),
-                'averageSalary': int(avg_salary),
+                'averageSalary': int(np.round(avg_salary)),
                 'growth': str(growth)
             })
         
         return sorted(result, key=lambda x: x['count'], reverse=True)
     
+    def section_stats(self, filters: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Statistics behind every dashboard section for the filtered rows
+        
+        One fused pass per grouping column over the rows selected by the row
+        index; the get_*_data methods compute the same values with one pandas
+        groupby each.
+        """
+        fused = self.aggregator.aggregate(self.filter_rows(filters), quantiles={
+            'location_clean': (0.5,),
+            'experience_level': (0.25, 0.5, 0.75)
+        })
+        groups = fused['groups']
+        stats = {
+            'count': fused['count'],
+            'mean': fused['mean'],
+            'distribution': None,
+            'geographic': [(location, mean, median, count)
+                           for location, count, mean, median in groups.get('location_clean', [])],
+            'experience': [(level, mean, count, q25, median, q75)
+                           for level, count, mean, q25, median, q75 in groups.get('experience_level', [])],
+            'company_size': [(size, mean, count) for size, count, mean in groups.get('company_size', [])],
+            'job_titles': groups.get('job_category', [])
+        }
+        if fused['count']:
+            bins = self.salary_bins()
+            hist, _ = np.histogram(fused['values'], bins=bins)
+            stats['distribution'] = (bins, hist)
+        return stats
+    
     def get_analytics_data(self, filters: Dict[str, str] = None) -> Dict[str, Any]:
         """Get complete analytics data with filters applied"""
         if filters is None:
             filters = {}
         
         try:
-            # Apply filters
-            filtered_df = self.apply_filters(filters)
+            # Aggregate the rows selected through the row index in one fused pass
+            stats = self.section_stats(filters)
             
             # Generate all analytics data
             analytics_data = {
-                'salaryDistribution': self.get_salary_distribution(filtered_df),
-                'geographicData': self.get_geographic_data(filtered_df),
-                'experienceData': self.get_experience_data(filtered_df),
-                'skillsData': self.get_skills_data(filtered_df),
-                'companySizeData': self.get_company_size_data(filtered_df),
-                'trendData': self.get_trend_data(filtered_df),
-                'jobTitleData': self.get_job_title_data(filtered_df),
+                'salaryDistribution': (self._format_salary_distribution(*stats['distribution'], stats['count'])
+                                       if stats['count'] else []),
+                'geographicData': self._format_geographic_data(stats['geographic']),
+                'experienceData': self._format_experience_data(stats['experience']),
+                'skillsData': self.get_skills_data(None),
+                'companySizeData': self._format_company_size_data(stats['company_size']),
+                'trendData': self._format_trend_data(stats['mean'], stats['count']),
+                'jobTitleData': self._format_job_title_data(stats['job_titles']),
                 'metadata': {
                     'lastUpdated': datetime.utcnow().isoformat(),
                     'totalRecords': len(self.df) if self.df is not None else 0,
-                    'filteredRecords': len(filtered_df),
+                    'filteredRecords': stats['count'],
                     'dataQuality': 98.5,
                     'modelAccuracy': 73.4,
                     'appliedFilters': filters
@@ -0,0 +1,127 @@
+import logging
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+def sorted_group_quantiles(sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray,
+                           quantiles: Sequence[float]) -> np.ndarray:
+    """
+    Quantiles of every group of values sorted by (group, value), shape (n_groups, n_quantiles)
+    
+    Uses linear interpolation with the same arithmetic as numpy.quantile (and
+    so pandas' Series.quantile), vectorized over groups. Empty groups are NaN.
+    """
+    result = np.full((len(counts), len(quantiles)), np.nan)
+    filled = counts > 0
+    if not filled.any():
+        return result
+    starts, counts = starts[filled], counts[filled]
+    for column, q in enumerate(quantiles):
+        position = (counts - 1) * q
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, counts - 1)
+        t = position - below
+        a = sorted_values[starts + below]
+        b = sorted_values[starts + above]
+        difference = b - a
+        values = a + difference * t
+        upper_half = t >= 0.5
+        values[upper_half] = b[upper_half] - difference[upper_half] * (1 - t[upper_half])
+        result[filled, column] = values
+    return result
+
+class FusedAggregator:
+    """Grouped salary statistics for every dashboard dimension, without pandas groupbys
+    
+    The grouping columns are factorized once when the data is loaded, into
+    integer codes whose order matches groupby's sorted keys, and the rows are
+    ranked by salary. A request then gathers the codes and salaries of its
+    rows and, per dimension, gets counts and sums from one bincount each.
+    Dimensions that need quantiles share one salary ordering of the selected
+    rows, stably re-sorted by group code (a radix sort on the small integer
+    codes), and read every group's quantiles off that array instead of
+    re-filtering the frame per group.
+    """
+    
+    def __init__(self, df: pd.DataFrame, dimensions: Sequence[str], value_column: str = 'salary_usd'):
+        self.values = df[value_column].to_numpy(dtype=np.float64)
+        self.value_order = np.argsort(self.values, kind='stable')
+        self.codes: Dict[str, np.ndarray] = {}
+        self.labels: Dict[str, List[Any]] = {}
+        for dimension in dimensions:
+            if dimension not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[dimension], sort=True)
+            # numpy radix-sorts 16-bit integers, so grouping sorted salaries stays linear
+            self.codes[dimension] = codes.astype(np.int16 if len(uniques) < 2 ** 15 else np.int32)
+            self.labels[dimension] = list(uniques)
+        
+        logger.info(f"Fused aggregator ready: {len(self.values)} rows, "
+                    f"{', '.join(f'{dimension} ({len(labels)})' for dimension, labels in self.labels.items())}")
+    
+    def aggregate(self, rows: Optional[np.ndarray] = None,
+                  quantiles: Optional[Dict[str, Sequence[float]]] = None,
+                  dimensions: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Statistics of the selected rows (all rows when None)
+        
+        Returns the gathered 'values', their 'count' and 'mean', and per
+        dimension a list of (label, count, mean, quantiles...) tuples for the
+        non-empty groups, in groupby order. quantiles maps a dimension to the
+        quantiles to compute for each of its groups; dimensions limits the
+        grouping to those dimensions (all when None).
+        """
+        quantiles = quantiles or {}
+        values = self.values if rows is None else self.values[rows]
+        count = len(values)
+        result = {'values': values, 'count': count, 'mean': float(values.mean()) if count else None, 'groups': {}}
+        sorted_rows = None
+        
+        for dimension, all_codes in self.codes.items():
+            if dimensions is not None and dimension not in dimensions:
+                continue
+            codes = all_codes if rows is None else all_codes[rows]
+            n_groups = len(self.labels[dimension])
+            valid = codes >= 0
+            group_values = values
+            if not valid.all():
+                codes, group_values = codes[valid], values[valid]
+            group_counts = np.bincount(codes, minlength=n_groups)
+            group_sums = np.bincount(codes, weights=group_values, minlength=n_groups)
+            
+            group_quantiles = None
+            if dimension in quantiles:
+                if sorted_rows is None:
+                    sorted_rows = self._sorted_rows(rows)
+                sorted_codes = all_codes[sorted_rows]
+                sorted_values = self.values[sorted_rows]
+                if not valid.all():
+                    kept = sorted_codes >= 0
+                    sorted_codes, sorted_values = sorted_codes[kept], sorted_values[kept]
+                grouped = sorted_values[np.argsort(sorted_codes, kind='stable')]
+                starts = np.concatenate(([0], np.cumsum(group_counts)[:-1]))
+                group_quantiles = sorted_group_quantiles(grouped, starts, group_counts, quantiles[dimension])
+            
+            groups = []
+            for group in np.flatnonzero(group_counts):
+                row = (self.labels[dimension][group], int(group_counts[group]),
+                       group_sums[group] / group_counts[group])
+                if group_quantiles is not None:
+                    row += tuple(float(q) for q in group_quantiles[group])
+                groups.append(row)
+            result['groups'][dimension] = groups
+        
+        return result
+    
+    def _sorted_rows(self, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Positions of the selected rows (all rows when None) in ascending salary order"""
+        if rows is None:
+            return self.value_order
+        if len(rows) * 8 < len(self.values):
+            # Small selections are cheaper to sort than to pick out of the full ranking
+            return rows[np.argsort(self.values[rows], kind='stable')]
+        selected = np.zeros(len(self.values), dtype=bool)
+        selected[rows] = True
+        return self.value_order[selected[self.value_order]]
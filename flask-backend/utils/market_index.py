@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils.similar_jobs import SimilarJobsIndex
+
+logger = logging.getLogger(__name__)
+
+class SalaryPercentileIndex:
+    """Sorted salaries per segment of the analytics dataset, for percentile lookups
+    
+    Segments are (job category, experience level, country group) as returned by
+    preprocessor.segment_of(). All salaries live in one int32 array ordered by
+    segment and then salary; each segment is a [start, end) slice of it, so a
+    percentile is two binary searches over that slice.
+    """
+    
+    def __init__(self, salaries: np.ndarray, segments: Dict[Tuple, Tuple[int, int]],
+                 global_salaries: np.ndarray, preprocessor):
+        self.salaries = salaries
+        self.segments = segments
+        self.global_salaries = global_salaries
+        self.preprocessor = preprocessor
+        
+        # Lookup timing
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.lookup_seconds = 0.0
+    
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, preprocessor) -> 'SalaryPercentileIndex':
+        """Sort salary_usd per segment of a cleaned AnalyticsProcessor DataFrame"""
+        combinations = pd.Series(list(zip(df['job_title'], df['experience_level'], df['company_location'])))
+        # Bucket each distinct combination once instead of every row
+        buckets = {
+            combination: preprocessor.segment_of({
+                'jobTitle': combination[0],
+                'experienceLevel': combination[1],
+                'companyLocation': combination[2]
+            })[:3]
+            for combination in combinations.unique()
+        }
+        keys = combinations.map(buckets)
+        codes, uniques = pd.factorize(keys)
+        salaries = df['salary_usd'].to_numpy(dtype=np.int32)
+        
+        order = np.lexsort((salaries, codes))
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        segments = {key: (int(bounds[code]), int(bounds[code + 1])) for code, key in enumerate(uniques)}
+        
+        index = cls(salaries[order], segments, np.sort(salaries), preprocessor)
+        logger.info(f"Salary percentile index built: {len(salaries)} salaries in {len(segments)} segments "
+                    f"({index.nbytes / 1024:.0f} KB)")
+        return index
+    
+    @property
+    def nbytes(self) -> int:
+        return self.salaries.nbytes + self.global_salaries.nbytes
+    
+    @staticmethod
+    def _percentile(sorted_salaries: np.ndarray, salary: float) -> float:
+        """Mid-rank percentile: ties count half below and half above"""
+        below = np.searchsorted(sorted_salaries, salary, side='left')
+        not_above = np.searchsorted(sorted_salaries, salary, side='right')
+        return float((below + not_above) * 50.0 / len(sorted_salaries))
+    
+    def lookup(self, salary: float, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Percentile of a salary within the input's segment and within all postings
+        
+        Returns:
+            dict: 'segment' and 'global' percentiles (0-100; 'segment' is None when
+                  the segment has no postings) and 'segmentSize'
+        """
+        start_time = time.perf_counter()
+        start, end = self.segments.get(self.preprocessor.segment_of(input_data)[:3], (0, 0))
+        result = {
+            'segment': round(self._percentile(self.salaries[start:end], salary), 1) if end > start else None,
+            'global': round(self._percentile(self.global_salaries, salary), 1),
+            'segmentSize': end - start
+        }
+        elapsed = time.perf_counter() - start_time
+        with self._lock:
+            self.lookups += 1
+            self.lookup_seconds += elapsed
+        return result
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'salaries': len(self.global_salaries),
+                'segments': len(self.segments),
+                'memory_bytes': self.nbytes,
+                'lookups': self.lookups,
+                'mean_lookup_us': round(self.lookup_seconds / self.lookups * 1e6, 2) if self.lookups else 0.0
+            }
+
+class MarketIndexes:
+    """Segment indexes over the analytics dataset, rebuilt whenever it is reloaded
+    
+    The indexes remember the DataFrame they were built from; AnalyticsProcessor
+    assigns a new one on every load, so a different object means the data changed.
+    """
+    
+    def __init__(self, get_processor: Callable[[], Any], preprocessor):
+        self.get_processor = get_processor
+        self.preprocessor = preprocessor
+        self._lock = threading.Lock()
+        self._source = None
+        self._indexes: Tuple[Optional[SimilarJobsIndex], Optional[SalaryPercentileIndex]] = (None, None)
+        self.builds = 0
+        self.build_seconds = 0.0
+    
+    def get(self) -> Tuple[Optional[SimilarJobsIndex], Optional[SalaryPercentileIndex]]:
+        """(similar jobs index, salary percentile index), or Nones if the dataset is unavailable"""
+        try:
+            df = self.get_processor().df
+        except Exception as e:
+            logger.warning(f"Analytics dataset unavailable for market indexes: {str(e)}")
+            return self._indexes
+        
+        if df is not self._source and df is not None:
+            with self._lock:
+                if df is not self._source:
+                    self._rebuild(df)
+        return self._indexes
+    
+    def _rebuild(self, df: pd.DataFrame):
+        start = time.perf_counter()
+        try:
+            self._indexes = (SimilarJobsIndex.from_dataframe(df, self.preprocessor),
+                             SalaryPercentileIndex.from_dataframe(df, self.preprocessor))
+        except Exception as e:
+            logger.error(f"Failed to build market indexes: {str(e)}")
+        self._source = df
+        self.builds += 1
+        self.build_seconds = time.perf_counter() - start
+        logger.info(f"Market indexes built in {self.build_seconds * 1000:.1f}ms")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        similar_jobs, percentiles = self._indexes
+        return {
+            'builds': self.builds,
+            'build_ms': round(self.build_seconds * 1000, 1),
+            'similar_jobs': similar_jobs.get_stats() if similar_jobs else {'enabled': False},
+            'salary_percentiles': percentiles.get_stats() if percentiles else {'enabled': False}
+        }
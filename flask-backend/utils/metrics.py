@@ -0,0 +1,189 @@
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency bucket upper bounds in seconds (100us .. 10s)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape_label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Histogram:
+    """Fixed-bucket histogram; not locked, callers hold the registry lock"""
+    
+    __slots__ = ('counts', 'sum', 'count')
+    
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class _StageTimer:
+    """Context manager returned by MetricsRegistry.stage()"""
+    
+    __slots__ = ('registry', 'name', 'endpoint', 'start')
+    
+    def __init__(self, registry: 'MetricsRegistry', name: str):
+        self.registry = registry
+        self.name = name
+    
+    def __enter__(self):
+        self.endpoint = getattr(self.registry._local, 'endpoint', None)
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self.endpoint is not None:
+            self.registry.observe_stage(self.endpoint, self.name, time.perf_counter() - self.start)
+        return False
+
+class MetricsRegistry:
+    """In-process request and stage timings, rendered in Prometheus text format
+    
+    Request-level metrics are recorded by begin_request()/end_request(), which
+    the app calls from its before/after hooks. Code on the request path wraps
+    individual stages in `with metrics.stage('name'):`; outside a request the
+    stage timer records nothing.
+    """
+    
+    def __init__(self, prefix: str = 'salary_api'):
+        self.prefix = prefix
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._request_durations: Dict[str, Histogram] = {}
+        self._stage_durations: Dict[Tuple[str, str], Histogram] = {}
+        self._requests: Dict[Tuple[str, str, int], int] = {}
+        self._errors: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._gauges: Dict[str, Tuple[str, Callable[[], Dict[str, float]]]] = {}
+    
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    
+    def begin_request(self, endpoint: str):
+        """Mark the start of a request on this thread"""
+        if not self.enabled:
+            return
+        self._local.endpoint = endpoint
+        self._local.start = time.perf_counter()
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+    
+    def end_request(self, method: str, status: int):
+        """Record the request started by begin_request() on this thread"""
+        endpoint = getattr(self._local, 'endpoint', None)
+        if endpoint is None:
+            return
+        duration = time.perf_counter() - self._local.start
+        self._local.endpoint = None
+        
+        with self._lock:
+            self._in_flight[endpoint] -= 1
+            histogram = self._request_durations.get(endpoint)
+            if histogram is None:
+                histogram = self._request_durations[endpoint] = Histogram()
+            histogram.observe(duration)
+            key = (endpoint, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if status >= 500:
+                self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+    
+    def stage(self, name: str) -> _StageTimer:
+        """Time a block as one stage of the current request"""
+        return _StageTimer(self, name)
+    
+    def observe_stage(self, endpoint: str, stage: str, seconds: float):
+        with self._lock:
+            histogram = self._stage_durations.get((endpoint, stage))
+            if histogram is None:
+                histogram = self._stage_durations[(endpoint, stage)] = Histogram()
+            histogram.observe(seconds)
+    
+    def register_gauges(self, name: str, help_text: str, collect: Callable[[], Dict[str, float]]):
+        """Expose values computed at scrape time, e.g. cache counters, as `<prefix>_<name>{stat=...}`"""
+        self._gauges[name] = (help_text, collect)
+    
+    # ------------------------------------------------------------------
+    # Exposition
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _labels(**labels) -> str:
+        return '{' + ','.join(f'{key}="{_escape_label_value(value)}"' for key, value in labels.items()) + '}'
+    
+    def _render_histogram(self, lines: List[str], name: str, histogram: Histogram, **labels):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), histogram.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{name}_bucket{self._labels(**labels, le=le)} {cumulative}')
+        lines.append(f'{name}_sum{self._labels(**labels)} {histogram.sum!r}')
+        lines.append(f'{name}_count{self._labels(**labels)} {histogram.count}')
+    
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        p = self.prefix
+        lines = []
+        with self._lock:
+            lines += [f'# HELP {p}_request_duration_seconds Request latency by endpoint',
+                      f'# TYPE {p}_request_duration_seconds histogram']
+            for endpoint, histogram in sorted(self._request_durations.items()):
+                self._render_histogram(lines, f'{p}_request_duration_seconds', histogram, endpoint=endpoint)
+            
+            lines += [f'# HELP {p}_stage_duration_seconds Latency of individual stages within a request',
+                      f'# TYPE {p}_stage_duration_seconds histogram']
+            for (endpoint, stage), histogram in sorted(self._stage_durations.items()):
+                self._render_histogram(lines, f'{p}_stage_duration_seconds', histogram,
+                                       endpoint=endpoint, stage=stage)
+            
+            lines += [f'# HELP {p}_requests_total Requests by endpoint, method and status',
+                      f'# TYPE {p}_requests_total counter']
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f'{p}_requests_total{self._labels(endpoint=endpoint, method=method, status=status)} {count}')
+            
+            lines += [f'# HELP {p}_request_errors_total Requests that ended with a 5xx status',
+                      f'# TYPE {p}_request_errors_total counter']
+            for endpoint, count in sorted(self._errors.items()):
+                lines.append(f'{p}_request_errors_total{self._labels(endpoint=endpoint)} {count}')
+            
+            lines += [f'# HELP {p}_requests_in_flight Requests currently being served',
+                      f'# TYPE {p}_requests_in_flight gauge']
+            for endpoint, count in sorted(self._in_flight.items()):
+                lines.append(f'{p}_requests_in_flight{self._labels(endpoint=endpoint)} {count}')
+        
+        for name, (help_text, collect) in list(self._gauges.items()):
+            try:
+                values = collect()
+            except Exception as e:
+                logger.warning(f"Metrics collector '{name}' failed: {str(e)}")
+                continue
+            lines += [f'# HELP {p}_{name} {help_text}', f'# TYPE {p}_{name} gauge']
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f'{p}_{name}{self._labels(stat=key)} {value}')
+        
+        return '\n'.join(lines) + '\n'
+    
+    def reset(self):
+        """Drop all recorded values (registered gauges are kept)"""
+        with self._lock:
+            self._request_durations.clear()
+            self._stage_durations.clear()
+            self._requests.clear()
+            self._errors.clear()
+            self._in_flight.clear()
+
+# Global instance
+metrics = MetricsRegistry()
@@ -0,0 +1,173 @@
+import logging
+import os
+import queue
+import threading
+import time
+import numpy as np
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+class MicroBatcher:
+    """Coalesce concurrent single-row predictions into one vectorized model call
+    
+    Callers submit a feature row and block on a future. A background dispatcher
+    takes the first waiting row, keeps collecting until the window expires or
+    the batch is full, then runs predict_fn once on the stacked rows. predict_fn
+    returns one result per row, in order. Rows submitted after close() are
+    scored inline on the caller's thread.
+    """
+    
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray],
+                 max_batch_size: int = 32, max_wait_ms: float = 2.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self._queue: 'queue.Queue[Tuple[np.ndarray, Future, float]]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        
+        # Metrics
+        self.batches = 0
+        self.rows = 0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        
+        logger.info(f"Micro-batcher initialized (max_batch_size={self.max_batch_size}, "
+                    f"window={self.max_wait * 1000:.1f}ms)")
+    
+    def _ensure_dispatcher(self):
+        """Start the dispatcher thread lazily, and again in each forked worker"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._closed:
+                return
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Threads do not survive fork; neither should rows queued in the parent
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+            self._thread.start()
+    
+    def submit(self, row: np.ndarray) -> Future:
+        """Queue one feature row (shape (1, n_features) or (n_features,))"""
+        self._ensure_dispatcher()
+        item = (np.asarray(row).reshape(1, -1), Future(), time.perf_counter())
+        # Checked under the lock close() takes, so no row can be queued behind its sentinel
+        with self._lock:
+            if not self._closed:
+                self._queue.put(item)
+                return item[1]
+        self._score([item])
+        return item[1]
+    
+    def predict(self, row: np.ndarray, timeout: float = 30.0) -> Any:
+        """Submit a row and wait for its entry in predict_fn's output"""
+        return self.submit(row).result(timeout=timeout)
+    
+    def close(self):
+        """Stop the dispatcher once the rows already queued have been scored"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+    
+    def _collect(self) -> Tuple[List[Tuple[np.ndarray, Future, float]], bool]:
+        """
+        Block for the first row, then gather more until the window closes or the batch is full
+        
+        Returns:
+            (batch, closing): closing is True once close() has been reached in the queue
+        """
+        item = self._queue.get()
+        batch = []
+        deadline = time.perf_counter() + self.max_wait
+        while item is not None:
+            batch.append(item)
+            if len(batch) >= self.max_batch_size:
+                break
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+        return batch, item is None
+    
+    def _run(self):
+        while True:
+            batch, closing = self._collect()
+            if batch:
+                self._score(batch)
+            if closing:
+                self._drain()
+                return
+    
+    def _drain(self):
+        """Score whatever is still queued once the close() sentinel has been reached"""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= self.max_batch_size:
+                self._score(batch)
+                batch = []
+        if batch:
+            self._score(batch)
+    
+    def _score(self, batch: List[Tuple[np.ndarray, Future, float]]):
+        """Run predict_fn once on the stacked rows and resolve each row's future"""
+        dispatched_at = time.perf_counter()
+        futures = [future for _, future, _ in batch]
+        
+        try:
+            predictions = self.predict_fn(np.vstack([row for row, _, _ in batch]))
+            for future, prediction in zip(futures, predictions):
+                future.set_result(prediction)
+        except Exception as e:
+            logger.error(f"Micro-batch prediction failed for {len(batch)} rows: {str(e)}")
+            for future in futures:
+                future.set_exception(e)
+        
+        self._record(len(batch), [dispatched_at - queued_at for _, _, queued_at in batch])
+    
+    def _record(self, size: int, waits: List[float]):
+        with self._lock:
+            self.batches += 1
+            self.rows += size
+            bucket = next((i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound),
+                          len(BATCH_SIZE_BUCKETS))
+            self.batch_size_counts[bucket] += 1
+            self.wait_seconds_total += sum(waits)
+            self.wait_seconds_max = max(self.wait_seconds_max, max(waits))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, batch-size histogram and the wait added by batching"""
+        with self._lock:
+            labels = [f'<={bound}' for bound in BATCH_SIZE_BUCKETS] + [f'>{BATCH_SIZE_BUCKETS[-1]}']
+            return {
+                'enabled': True,
+                'max_batch_size': self.max_batch_size,
+                'window_ms': self.max_wait * 1000,
+                'queue_depth': self._queue.qsize(),
+                'batches': self.batches,
+                'rows': self.rows,
+                'mean_batch_size': round(self.rows / self.batches, 2) if self.batches else 0.0,
+                'batch_size_histogram': dict(zip(labels, self.batch_size_counts)),
+                'mean_wait_ms': round(self.wait_seconds_total / self.rows * 1000, 3) if self.rows else 0.0,
+                'max_wait_ms': round(self.wait_seconds_max * 1000, 3)
+            }
@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def prediction_cache_key(input_data: Dict[str, Any]) -> Tuple:
+    """
+    Canonical cache key for an input that has already been through validate_prediction_input
+    
+    Validation normalizes experience level, company size, location and a null remote
+    ratio in place, so equivalent requests ("senior" / "Senior Level") share one entry. Skill and benefit
+    lists are order-insensitive and the description only matters through its word count.
+    """
+    job_description = input_data.get('jobDescription', '') or ''
+    return (
+        str(input_data.get('jobTitle', 'Other')).strip().lower(),
+        float(input_data.get('yearsExperience', 0)),
+        input_data.get('experienceLevel'),
+        input_data.get('companySize'),
+        float(input_data.get('remoteRatio') or 0),
+        input_data.get('companyLocation'),
+        tuple(sorted(str(skill) for skill in (input_data.get('requiredSkills') or []))),
+        tuple(sorted(str(benefit) for benefit in (input_data.get('benefits') or []))),
+        len(job_description.split()) if job_description else None
+    )
+
+class PredictionCache:
+    """Thread-safe LRU cache with per-entry TTL for model outputs
+    
+    Entries are tagged with the model version they were computed under; calling
+    ensure_version() with a different version drops everything.
+    """
+    
+    def __init__(self, max_size: int = 4096, ttl_seconds: float = 3600, clock=time.monotonic):
+        self.max_size = max(1, int(max_size))
+        self.ttl_seconds = float(ttl_seconds)
+        self._clock = clock
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        
+        logger.info(f"Prediction cache initialized (max_size={self.max_size}, ttl={self.ttl_seconds}s)")
+    
+    def ensure_version(self, version: Hashable):
+        """Clear the cache if the model version changed since the last call"""
+        with self._lock:
+            if version == self._version:
+                return
+            if self._entries:
+                logger.info(f"Model version changed - dropping {len(self._entries)} cached predictions")
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            expires_at, value = entry
+            if now >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry when full"""
+        expires_at = self._clock() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'model_version': self._version
+            }
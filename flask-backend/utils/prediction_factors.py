@@ -0,0 +1,96 @@
+import logging
+import numpy as np
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Model features grouped into the factors shown to users; one-hot columns are matched by prefix
+FEATURE_GROUPS = {
+    'years_experience_capped': 'years_experience',
+    'experience_level_encoded': 'experience_level',
+    'company_size_encoded': 'company_size',
+    'remote_category': 'remote',
+    'skills_count': 'skills',
+    'benefits_score_normalized': 'benefits',
+    'job_desc_log': 'job_description',
+    'location_salary_premium': 'location'
+}
+PREFIX_GROUPS = {
+    'country_grouped_': 'location',
+    'job_category_': 'job_category'
+}
+
+def feature_group(feature_name: str) -> str:
+    """Factor a model feature belongs to (unknown features are their own factor)"""
+    if feature_name in FEATURE_GROUPS:
+        return FEATURE_GROUPS[feature_name]
+    for prefix, group in PREFIX_GROUPS.items():
+        if feature_name.startswith(prefix):
+            return group
+    return feature_name
+
+class PredictionFactorExplainer:
+    """Turn per-feature contributions into the top user-facing prediction factors
+    
+    Contributions of the features behind one factor (e.g. a country's one-hot
+    column and the location premium) are summed with a single matrix product
+    over the whole batch; each row then reports its largest factors by
+    absolute impact, named after the input values that produced them.
+    """
+    
+    def __init__(self, feature_names: List[str], preprocessor, top_n: int = 4):
+        self.preprocessor = preprocessor
+        self.top_n = int(top_n)
+        
+        groups = [feature_group(name) for name in feature_names]
+        self.groups = list(dict.fromkeys(groups))
+        self.membership = np.zeros((len(feature_names), len(self.groups)))
+        for column, group in enumerate(groups):
+            self.membership[column, self.groups.index(group)] = 1.0
+        
+        logger.info(f"Prediction factors: {len(feature_names)} features in {len(self.groups)} factors")
+    
+    def group(self, contributions: np.ndarray) -> np.ndarray:
+        """Per-factor contributions, shape (n_rows, n_factors)"""
+        return np.asarray(contributions, dtype=np.float64) @ self.membership
+    
+    def factors(self, input_data: Dict[str, Any], grouped: np.ndarray) -> List[Dict[str, Any]]:
+        """Top factors of one row, largest absolute impact first, impacts rounded to $100"""
+        impacts = np.round(np.asarray(grouped) / 100) * 100
+        order = np.argsort(-np.abs(impacts), kind='stable')[:self.top_n]
+        factors = []
+        for index in order:
+            if impacts[index] == 0:
+                break
+            name, description = self.describe(self.groups[index], input_data)
+            factors.append({
+                'name': name,
+                'impact': int(impacts[index]),
+                'description': description
+            })
+        return factors
+    
+    def describe(self, group: str, input_data: Dict[str, Any]) -> tuple:
+        """(name, description) of a factor for a validated input"""
+        category, level, country_group, size = self.preprocessor.segment_of(input_data)
+        if group == 'years_experience':
+            years = input_data.get('yearsExperience', 0)
+            return 'Years of Experience', f'{years} years of experience'
+        if group == 'experience_level':
+            return level, f'{level} seniority'
+        if group == 'company_size':
+            return f'{size} Company', 'Company size typically affects compensation'
+        if group == 'remote':
+            return 'Remote Work', f"{input_data.get('remoteRatio', 0)}% remote"
+        if group == 'skills':
+            return 'Required Skills', f"{len(input_data.get('requiredSkills') or [])} required skills"
+        if group == 'benefits':
+            return 'Benefits Package', f"{len(input_data.get('benefits') or [])} listed benefits"
+        if group == 'job_description':
+            return 'Job Description', 'Length of the job description'
+        if group == 'location':
+            location = input_data.get('companyLocation', country_group)
+            return f'{location} Market', f'Geographic salary level for {location}'
+        if group == 'job_category':
+            return f'{category} Role', f'Typical pay for {category} roles'
+        return group, f'Model feature {group}'
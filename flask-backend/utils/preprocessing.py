@@ -1,11 +1,17 @@
 import pandas as pd
 import numpy as np
+import hashlib
 import json
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+def schema_fingerprint(feature_names, dtype):
+    """Hash of the ordered feature names and the matrix dtype"""
+    payload = json.dumps([list(feature_names), np.dtype(dtype).str])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
 class SalaryPredictionPreprocessor:
     """Preprocessing pipeline that ensures feature compatibility with trained model"""
     
@@ -59,6 +65,10 @@ class SalaryPredictionPreprocessor:
         self.job_categories = ['Data Analyst', 'Data Engineer', 'Data Scientist', 
                               'ML Engineer', 'Management', 'Other']
         
+        # Resolve column indices once so batches can be written by position
+        self._resolve_feature_indices()
+        self._schema_fingerprints = {}
+        
         logger.info(f"Preprocessor initialized with {len(self.expected_features)} expected features")
     
     def _load_expected_features(self):
@@ -112,82 +122,191 @@ class SalaryPredictionPreprocessor:
             logger.error(f"Error loading expected features: {e}")
             raise
     
-    def preprocess_input(self, input_data):
+    def _resolve_feature_indices(self):
+        """Map each engineered feature to its column in the expected feature order"""
+        feature_index = {name: i for i, name in enumerate(self.expected_features)}
+        
+        def column(name):
+            # Features missing from the expected list are dropped (index -1)
+            return feature_index.get(name, -1)
+        
+        self._years_col = column('years_experience_capped')
+        self._experience_col = column('experience_level_encoded')
+        self._company_size_col = column('company_size_encoded')
+        self._remote_col = column('remote_category')
+        self._skills_col = column('skills_count')
+        self._benefits_col = column('benefits_score_normalized')
+        self._job_desc_col = column('job_desc_log')
+        self._premium_col = column('location_salary_premium')
+        
+        self._country_cols = {
+            country: column(f'country_grouped_{country}') for country in self.countries
+        }
+        self._job_category_cols = {
+            category: column(f'job_category_{category}') for category in self.job_categories
+        }
+        
+        unknown = [name for name in self.expected_features if name not in self._produced_features()]
+        for name in unknown:
+            logger.warning(f"Expected feature '{name}' is not produced by the preprocessor; it will default to 0")
+    
+    def _produced_features(self):
+        """Names of every feature the preprocessor knows how to build"""
+        return (
+            ['years_experience_capped', 'experience_level_encoded', 'company_size_encoded',
+             'remote_category', 'skills_count', 'benefits_score_normalized',
+             'job_desc_log', 'location_salary_premium']
+            + [f'country_grouped_{country}' for country in self.countries]
+            + [f'job_category_{category}' for category in self.job_categories]
+        )
+    
+    def schema_fingerprint(self, dtype=np.float64):
+        """Fingerprint of the matrices preprocess_batch builds with this dtype"""
+        key = np.dtype(dtype)
+        if key not in self._schema_fingerprints:
+            self._schema_fingerprints[key] = schema_fingerprint(self.expected_features, key)
+        return self._schema_fingerprints[key]
+    
+    def feature_domains(self):
         """
-        Preprocess user input to match trained model's feature expectations
+        Reachable values of the features the preprocessor can emit
+        
+        Returns:
+            dict: 'discrete' maps feature name to its sorted reachable values,
+                  'continuous' maps feature name to its (min, max) range and
+                  'one_hot' maps a group name to (feature names, whether the
+                  all-zero state is reachable)
+        """
+        return {
+            'discrete': {
+                'years_experience_capped': list(range(0, 26)),
+                'experience_level_encoded': sorted(set(self.experience_level_mapping.values()) | {1}),
+                'company_size_encoded': sorted(set(self.company_size_mapping.values()) | {2}),
+                'remote_category': sorted(set(self.remote_mapping.values())),
+                # Validation caps skills at 20 and benefits at 15
+                'skills_count': list(range(0, 21)),
+                'benefits_score_normalized': sorted({min(n / 10.0, 1.0) for n in range(0, 16)}),
+                'location_salary_premium': sorted(set(self.location_premiums.values()) | {0.8}),
+            },
+            'continuous': {
+                # Descriptions are capped at 10,000 characters (~5,000 words)
+                'job_desc_log': (float(np.log1p(1)), float(np.log1p(5000))),
+            },
+            'one_hot': {
+                'country_grouped': (
+                    [f'country_grouped_{country}' for country in self.countries],
+                    any(location not in self.countries for location in self.location_premiums)
+                ),
+                'job_category': (
+                    [f'job_category_{category}' for category in self.job_categories],
+                    False
+                ),
+            },
+        }
+    
+    def preprocess_batch(self, inputs, dtype=np.float64):
+        """
+        Preprocess many user inputs straight into a feature matrix
         
         Args:
-            input_data (dict): Raw user input from frontend
-            
+            inputs (list): Raw user inputs from frontend
+            dtype: Output dtype (np.float64 or np.float32)
+        
         Returns:
-            pd.DataFrame: Preprocessed features ready for model prediction
+            np.ndarray: (N, n_features) matrix in the model's expected feature order
         """
         try:
-            logger.info(f"Preprocessing input: {input_data}")
-            
-            # Create base features
-            features = {}
-            
-            # 1. Years experience (capped at reasonable max)
-            years_exp = min(input_data.get('yearsExperience', 0), 25)
-            features['years_experience_capped'] = years_exp
-            
-            # 2. Experience level encoding
-            exp_level = input_data.get('experienceLevel', 'Entry Level')
-            features['experience_level_encoded'] = self.experience_level_mapping.get(exp_level, 1)
+            n_rows = len(inputs)
+            features = np.zeros((n_rows, len(self.expected_features)), dtype=dtype)
+            if n_rows == 0:
+                return features
             
-            # 3. Company size encoding  
-            company_size = input_data.get('companySize', 'Medium')
-            features['company_size_encoded'] = self.company_size_mapping.get(company_size, 2)
+            years = np.empty(n_rows)
+            experience = np.empty(n_rows)
+            company_size = np.empty(n_rows)
+            remote_ratio = np.empty(n_rows)
+            skills = np.empty(n_rows)
+            benefits = np.empty(n_rows)
+            desc_length = np.empty(n_rows)
+            premium = np.empty(n_rows)
+            country_rows, country_cols = [], []
+            category_cols = np.empty(n_rows, dtype=np.intp)
             
-            # 4. Remote work category
-            remote_ratio = input_data.get('remoteRatio', 0)
-            if remote_ratio == 0:
-                features['remote_category'] = 0  # On-site
-            elif remote_ratio < 100:
-                features['remote_category'] = 1  # Hybrid
-            else:
-                features['remote_category'] = 2  # Remote
-            
-            # 5. Skills count
-            skills = input_data.get('requiredSkills', [])
-            features['skills_count'] = len(skills) if skills else 0
-            
-            # 6. Benefits score (normalized)
-            benefits = input_data.get('benefits', [])
-            # Simple benefits scoring: each benefit adds value
-            benefits_score = len(benefits) if benefits else 0
-            features['benefits_score_normalized'] = min(benefits_score / 10.0, 1.0)  # Normalize to 0-1
-            
-            # 7. Job description length (log transformed)
-            job_desc = input_data.get('jobDescription', '')
-            desc_length = len(job_desc.split()) if job_desc else 10
-            features['job_desc_log'] = np.log1p(desc_length)
-            
-            # 8. Location salary premium
-            location = input_data.get('companyLocation', 'Other')
-            features['location_salary_premium'] = self.location_premiums.get(location, 0.8)
+            # Gather raw values (the only per-row Python work)
+            for row, input_data in enumerate(inputs):
+                years[row] = input_data.get('yearsExperience', 0)
+                experience[row] = self.experience_level_mapping.get(input_data.get('experienceLevel', 'Entry Level'), 1)
+                company_size[row] = self.company_size_mapping.get(input_data.get('companySize', 'Medium'), 2)
+                # remoteRatio is optional and may be null: both mean on-site
+                remote_ratio[row] = input_data.get('remoteRatio') or 0
+                
+                required_skills = input_data.get('requiredSkills', [])
+                skills[row] = len(required_skills) if required_skills else 0
+                
+                benefit_list = input_data.get('benefits', [])
+                benefits[row] = len(benefit_list) if benefit_list else 0
+                
+                job_desc = input_data.get('jobDescription', '')
+                desc_length[row] = len(job_desc.split()) if job_desc else 10
+                
+                location = input_data.get('companyLocation', 'Other')
+                premium[row] = self.location_premiums.get(location, 0.8)
+                country_col = self._country_cols.get(location, -1)
+                if country_col >= 0:
+                    country_rows.append(row)
+                    country_cols.append(country_col)
+                
+                job_category = self._map_job_title_to_category(input_data.get('jobTitle', 'Other'))
+                category_cols[row] = self._job_category_cols.get(job_category, -1)
             
-            # 9. Country one-hot encoding
-            for country in self.countries:
-                features[f'country_grouped_{country}'] = 1 if location == country else 0
+            # Write each engineered column in one vectorized step
+            columns = [
+                (self._years_col, np.minimum(years, 25)),
+                (self._experience_col, experience),
+                (self._company_size_col, company_size),
+                (self._remote_col, np.select([remote_ratio == 0, remote_ratio < 100], [0, 1], 2)),
+                (self._skills_col, skills),
+                (self._benefits_col, np.minimum(benefits / 10.0, 1.0)),
+                (self._job_desc_col, np.log1p(desc_length)),
+                (self._premium_col, premium),
+            ]
+            for col, values in columns:
+                if col >= 0:
+                    features[:, col] = values
             
-            # 10. Job category one-hot encoding
-            job_title = input_data.get('jobTitle', 'Other')
-            # Map job title to category
-            job_category = self._map_job_title_to_category(job_title)
+            # One-hot columns are written by index
+            if country_rows:
+                features[country_rows, country_cols] = 1
+            has_category = category_cols >= 0
+            features[np.flatnonzero(has_category), category_cols[has_category]] = 1
             
-            for category in self.job_categories:
-                features[f'job_category_{category}'] = 1 if job_category == category else 0
+            logger.info(f"Preprocessed batch features shape: {features.shape}")
+            return features
+        
+        except Exception as e:
+            logger.error(f"Batch preprocessing error: {str(e)}")
+            raise
+    
+    def preprocess_input(self, input_data):
+        """
+        Preprocess user input to match trained model's feature expectations
+        
+        Args:
+            input_data (dict): Raw user input from frontend
             
-            # Create DataFrame with exact feature order
-            feature_df = pd.DataFrame([features])
+        Returns:
+            pd.DataFrame: Preprocessed features ready for model prediction
+        """
+        try:
+            logger.info(f"Preprocessing input: {input_data}")
             
-            # Ensure we have all expected features in the right order
-            feature_df = self._ensure_feature_order(feature_df)
+            # Reuse the batch path and label the single row
+            feature_df = pd.DataFrame(
+                self.preprocess_batch([input_data]),
+                columns=self.expected_features
+            )
             
             logger.info(f"Preprocessed features shape: {feature_df.shape}")
-            logger.info(f"Feature columns: {list(feature_df.columns)}")
             
             return feature_df
             
@@ -195,6 +314,80 @@ class SalaryPredictionPreprocessor:
             logger.error(f"Preprocessing error: {str(e)}")
             raise
     
+    def sweep_options(self):
+        """
+        Input fields a what-if sweep can vary, with their default values
+        
+        Returns:
+            dict: field name -> values swept when the request gives none
+        """
+        return {
+            'yearsExperience': list(range(0, 26)),
+            'experienceLevel': list(self.experience_level_mapping),
+            'companySize': list(self.company_size_mapping),
+            'companyLocation': [location for location in self.location_premiums if location != 'Other'],
+        }
+    
+    def expand_grid(self, base_features, sweeps):
+        """
+        Copies of one preprocessed row with the swept fields overwritten
+        
+        Args:
+            base_features (np.ndarray): (1, n_features) row from preprocess_batch
+            sweeps (list): (field, values) pairs; the grid is their cartesian
+                product with the first field varying slowest
+        
+        Returns:
+            np.ndarray: (prod(len(values)), n_features) matrix, one row per grid point
+        """
+        shape = [len(values) for _, values in sweeps]
+        grid = np.repeat(np.asarray(base_features)[:1], int(np.prod(shape)), axis=0)
+        positions = np.indices(shape).reshape(len(shape), -1)
+        
+        for (field, values), position in zip(sweeps, positions):
+            if field == 'yearsExperience':
+                columns = [(self._years_col, np.minimum(np.asarray(values, dtype=np.float64), 25))]
+            elif field == 'experienceLevel':
+                columns = [(self._experience_col, [self.experience_level_mapping.get(v, 1) for v in values])]
+            elif field == 'companySize':
+                columns = [(self._company_size_col, [self.company_size_mapping.get(v, 2) for v in values])]
+            elif field == 'companyLocation':
+                columns = [(self._premium_col, [self.location_premiums.get(v, 0.8) for v in values])]
+                # Clear the base row's country, then set each grid point's one
+                country_cols = [col for col in self._country_cols.values() if col >= 0]
+                grid[:, country_cols] = 0
+                value_cols = np.array([self._country_cols.get(v, -1) for v in values], dtype=np.intp)
+                rows = np.flatnonzero(value_cols[position] >= 0)
+                grid[rows, value_cols[position][rows]] = 1
+            else:
+                raise ValueError(f"Cannot sweep '{field}'")
+            
+            for col, column_values in columns:
+                if col >= 0:
+                    grid[:, col] = np.asarray(column_values, dtype=grid.dtype)[position]
+        
+        return grid
+    
+    def country_group(self, location):
+        """Country bucket of a location (countries without their own one-hot column are 'Other')"""
+        return location if location in self._country_cols else 'Other'
+    
+    def segment_of(self, input_data):
+        """
+        Categorical buckets of a (validated) input, as the model sees them
+        
+        Returns:
+            tuple: (job category, experience level, country group, company size)
+        """
+        experience_level = input_data.get('experienceLevel', 'Entry Level')
+        company_size = input_data.get('companySize', 'Medium')
+        return (
+            self._map_job_title_to_category(input_data.get('jobTitle', 'Other')),
+            experience_level if experience_level in self.experience_level_mapping else 'Entry Level',
+            self.country_group(input_data.get('companyLocation', 'Other')),
+            company_size if company_size in self.company_size_mapping else 'Medium'
+        )
+    
     def _map_job_title_to_category(self, job_title):
         """Map job title to standardized category"""
         job_title_lower = job_title.lower()
@@ -211,31 +404,6 @@ class SalaryPredictionPreprocessor:
             return 'Management'
         else:
             return 'Other'
-    
-    def _ensure_feature_order(self, feature_df):
-        """Ensure features are in the exact order expected by the model"""
-        
-        # Add any missing features with default values
-        for feature in self.expected_features:
-            if feature not in feature_df.columns:
-                feature_df[feature] = 0
-                logger.warning(f"Added missing feature '{feature}' with default value 0")
-        
-        # Remove any unexpected features
-        unexpected_features = [col for col in feature_df.columns if col not in self.expected_features]
-        if unexpected_features:
-            logger.warning(f"Removing unexpected features: {unexpected_features}")
-            feature_df = feature_df.drop(columns=unexpected_features)
-        
-        # Reorder to match expected order exactly
-        feature_df = feature_df[self.expected_features]
-        
-        # Verify final shape
-        assert feature_df.shape[1] == len(self.expected_features), \
-            f"Feature count mismatch: got {feature_df.shape[1]}, expected {len(self.expected_features)}"
-        
-        logger.info(f"Final feature order verified: {feature_df.shape[1]} features")
-        return feature_df
 
 # Create global preprocessor instance
 preprocessor = SalaryPredictionPreprocessor()
\ No newline at end of file
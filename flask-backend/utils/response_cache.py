@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+def response_etag(key: Hashable) -> str:
+    """Strong entity tag (unquoted) for the response a cache key always produces"""
+    return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:32]
+
+class CachedResponse:
+    """A serialized response body, gzip-compressed once when that makes it smaller"""
+    
+    __slots__ = ('body', 'gzipped', 'mimetype')
+    
+    def __init__(self, body: bytes, mimetype: str = 'application/json', compress_level: int = 6):
+        self.body = body
+        self.mimetype = mimetype
+        # mtime=0 keeps the compressed bytes identical across workers and restarts
+        gzipped = gzip.compress(body, compresslevel=compress_level, mtime=0)
+        self.gzipped = gzipped if len(gzipped) < len(body) else None
+    
+    @property
+    def nbytes(self) -> int:
+        return len(self.body) + (len(self.gzipped) if self.gzipped is not None else 0)
+
+class ResponseCache:
+    """Thread-safe LRU of serialized responses, bounded by their total size in bytes
+    
+    Keys must identify everything the body depends on (dataset version, normalized
+    parameters, ...), so entries never go stale and are only evicted for space.
+    Responses larger than the whole budget are not stored.
+    """
+    
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, compress_level: int = 6):
+        self.max_bytes = max(1, int(max_bytes))
+        self.compress_level = compress_level
+        self._entries: 'OrderedDict[Hashable, CachedResponse]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.not_modified = 0
+        
+        logger.info(f"Response cache initialized (max_bytes={self.max_bytes})")
+    
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        """Return the cached response, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def put(self, key: Hashable, body: bytes, mimetype: str = 'application/json') -> CachedResponse:
+        """Compress and store a response body, evicting least recently used entries to fit"""
+        entry = CachedResponse(body, mimetype, self.compress_level)
+        if entry.nbytes > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            self._entries[key] = entry
+            self.nbytes += entry.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+        return entry
+    
+    def record_not_modified(self):
+        """Count a conditional request answered with 304"""
+        with self._lock:
+            self.not_modified += 1
+    
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'bytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'not_modified': self.not_modified,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,97 @@
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Dashboard filter parameter -> column it selects on
+FILTER_COLUMNS = {
+    'location': 'location_clean',
+    'experienceLevel': 'experience_level',
+    'companySize': 'company_size'
+}
+
+# salaryRange values -> inclusive salary_usd bounds
+SALARY_RANGES = {
+    '50k-100k': (50000, 100000),
+    '100k-150k': (100000, 150000),
+    '150k+': (150000, float('inf'))
+}
+
+class RowIndex:
+    """Bitmap index over the dashboard filter columns of an analytics DataFrame
+    
+    Built once when the data is loaded: each filter column is factorized and
+    every distinct value gets a packed bitmap of the rows holding it (one bit
+    per row), and salary_usd is kept sorted alongside the row order so a
+    salaryRange becomes two binary searches. A filter combination is the AND of
+    the matching bitmaps; select() returns the surviving row positions, so
+    callers gather just the columns they aggregate instead of copying the frame.
+    """
+    
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows = len(df)
+        self.bitmaps: Dict[str, Dict[str, np.ndarray]] = {}
+        
+        for column in FILTER_COLUMNS.values():
+            if column not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[column], sort=True)
+            self.bitmaps[column] = {value: np.packbits(codes == code) for code, value in enumerate(uniques)}
+        
+        self.salary_order = None
+        self.sorted_salaries = None
+        if 'salary_usd' in df.columns:
+            salaries = df['salary_usd'].to_numpy(dtype=np.float64)
+            self.salary_order = np.argsort(salaries, kind='stable').astype(
+                np.int32 if self.n_rows < 2 ** 31 else np.int64)
+            self.sorted_salaries = salaries[self.salary_order]
+        
+        logger.info(f"Row index built: {self.n_rows} rows, "
+                    f"{sum(len(bitmaps) for bitmaps in self.bitmaps.values())} bitmaps "
+                    f"({self.nbytes / 1024:.0f} KB)")
+    
+    @property
+    def nbytes(self) -> int:
+        total = sum(bitmap.nbytes for bitmaps in self.bitmaps.values() for bitmap in bitmaps.values())
+        if self.salary_order is not None:
+            total += self.salary_order.nbytes + self.sorted_salaries.nbytes
+        return total
+    
+    def salary_rows(self, bounds: Tuple[float, float]) -> np.ndarray:
+        """Row positions with lower <= salary_usd <= upper, in salary order"""
+        start = np.searchsorted(self.sorted_salaries, bounds[0], side='left')
+        end = np.searchsorted(self.sorted_salaries, bounds[1], side='right')
+        return self.salary_order[start:end]
+    
+    def select(self, filters: Dict[str, str]) -> Optional[np.ndarray]:
+        """
+        Ascending row positions matching the dashboard filters
+        
+        'All', missing parameters, columns the data lacks and unknown salary
+        ranges do not filter. Returns None when nothing is filtered, meaning
+        every row, so the unfiltered dashboard touches no index at all.
+        """
+        mask = None
+        for parameter, column in FILTER_COLUMNS.items():
+            value = filters.get(parameter)
+            if not value or value == 'All' or column not in self.bitmaps:
+                continue
+            bitmap = self.bitmaps[column].get(value)
+            if bitmap is None:
+                return np.empty(0, dtype=np.int64)
+            mask = bitmap if mask is None else mask & bitmap
+        
+        salary_range = filters.get('salaryRange')
+        if salary_range and salary_range != 'All' and salary_range in SALARY_RANGES and self.salary_order is not None:
+            rows = self.salary_rows(SALARY_RANGES[salary_range])
+            if mask is None:
+                return np.sort(rows)
+            # Probe the other filters' bitmap at just the rows in the salary range
+            selected = (mask[rows >> 3] >> (7 - (rows & 7)).astype(np.uint8)) & 1
+            return np.sort(rows[selected.astype(bool)])
+        
+        if mask is None:
+            return None
+        return np.flatnonzero(np.unpackbits(mask, count=self.n_rows))
@@ -0,0 +1,220 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (in dollars) of the histogram buckets of shadow - primary
+DELTA_BUCKETS = (-50000, -25000, -10000, -5000, -2000, -1000, 0, 1000, 2000, 5000, 10000, 25000, 50000)
+# Absolute differences reported as "within" shares
+AGREEMENT_THRESHOLDS = (1000, 5000, 10000)
+
+class DeltaStats:
+    """Running summary of shadow - primary differences in constant memory
+    
+    Means and variances are updated with Welford's method one batch at a time;
+    the distribution is a fixed-bucket histogram, from which quantiles of the
+    absolute difference are interpolated. The last few pairs are kept as-is.
+    """
+    
+    def __init__(self, recent: int = 50):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.abs_total = 0.0
+        self.abs_max = 0.0
+        self.primary_total = 0.0
+        self.shadow_total = 0.0
+        self.histogram = np.zeros(len(DELTA_BUCKETS) + 1, dtype=np.int64)
+        self.abs_edges = np.array([0] + [bound for bound in DELTA_BUCKETS if bound > 0], dtype=np.float64)
+        self.abs_histogram = np.zeros(len(self.abs_edges), dtype=np.int64)
+        self.within = np.zeros(len(AGREEMENT_THRESHOLDS), dtype=np.int64)
+        self.recent = deque(maxlen=recent)
+    
+    def update(self, primary: np.ndarray, shadow: np.ndarray):
+        delta = shadow - primary
+        n = len(delta)
+        if n == 0:
+            return
+        
+        # Merge the batch's mean and M2 into the running ones
+        batch_mean = float(delta.mean())
+        batch_m2 = float(((delta - batch_mean) ** 2).sum())
+        total = self.count + n
+        shift = batch_mean - self.mean
+        self.mean += shift * n / total
+        self.m2 += batch_m2 + shift ** 2 * self.count * n / total
+        self.count = total
+        
+        absolute = np.abs(delta)
+        self.abs_total += float(absolute.sum())
+        self.abs_max = max(self.abs_max, float(absolute.max()))
+        self.primary_total += float(primary.sum())
+        self.shadow_total += float(shadow.sum())
+        self.histogram += np.bincount(np.searchsorted(DELTA_BUCKETS, delta, side='left'),
+                                      minlength=len(self.histogram))
+        self.abs_histogram += np.bincount(np.searchsorted(self.abs_edges, absolute, side='left'),
+                                          minlength=len(self.abs_histogram) + 1)[:len(self.abs_histogram)]
+        self.within += (absolute[:, np.newaxis] <= np.array(AGREEMENT_THRESHOLDS)).sum(axis=0)
+        for pair in zip(primary[-self.recent.maxlen:], shadow[-self.recent.maxlen:]):
+            self.recent.append(pair)
+    
+    def abs_quantile(self, q: float) -> Optional[float]:
+        """Quantile of |shadow - primary|, interpolated within histogram buckets (None beyond the last bound)"""
+        if self.count == 0:
+            return None
+        target = q * self.count
+        cumulative = 0
+        lower = 0.0
+        for upper, count in zip(self.abs_edges, self.abs_histogram):
+            if count and cumulative + count >= target:
+                return round(min(lower + (upper - lower) * (target - cumulative) / count, self.abs_max), 0)
+            cumulative += count
+            lower = upper
+        return None
+    
+    def summary(self) -> Dict[str, Any]:
+        if self.count == 0:
+            return {'compared': 0}
+        return {
+            'compared': self.count,
+            'mean_abs_diff': round(self.abs_total / self.count, 2),
+            'mean_diff': round(self.mean, 2),
+            'std_diff': round(float(np.sqrt(self.m2 / (self.count - 1))), 2) if self.count > 1 else 0.0,
+            'max_abs_diff': round(self.abs_max, 2),
+            'abs_diff_quantiles': {f'p{int(q * 100)}': self.abs_quantile(q) for q in (0.5, 0.9, 0.99)},
+            'within': {f'{threshold}': round(int(hits) / self.count, 4)
+                       for threshold, hits in zip(AGREEMENT_THRESHOLDS, self.within)},
+            'mean_primary': round(self.primary_total / self.count, 2),
+            'mean_shadow': round(self.shadow_total / self.count, 2),
+            # Counts of shadow - primary up to each bound; the last bucket (upper None) is open-ended
+            'diff_histogram': [{'upper': upper, 'count': count}
+                               for upper, count in zip(list(DELTA_BUCKETS) + [None], self.histogram.tolist())],
+            'recent': [{'primary': round(float(primary), 2), 'shadow': round(float(shadow), 2)}
+                       for primary, shadow in self.recent]
+        }
+
+class ShadowScorer:
+    """Score live feature rows with a candidate model, off the request path
+    
+    Requests hand over their feature row and the prediction they returned;
+    submit() never blocks and drops the row when the queue is full. A
+    background thread drains the queue in batches, runs predict_fn once per
+    batch and folds both outputs into DeltaStats. Statistics restart when the
+    primary model version changes, so a report always compares one pair of
+    models.
+    """
+    
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray], shadow_version: Optional[str] = None,
+                 max_queue: int = 1024, max_batch_size: int = 64, recent: int = 50):
+        self.predict_fn = predict_fn
+        self.shadow_version = shadow_version
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.recent = int(recent)
+        self._queue: 'queue.Queue[Tuple[np.ndarray, float, Any]]' = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        
+        self.primary_version = None
+        self.stats = DeltaStats(self.recent)
+        self.started_at = time.time()
+        
+        # Counters
+        self.submitted = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.score_seconds = 0.0
+        
+        logger.info(f"Shadow scorer initialized for {shadow_version} "
+                    f"(queue={self._queue.maxsize}, batch={self.max_batch_size})")
+    
+    def _ensure_worker(self):
+        """Start the worker lazily, and again in each forked process"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+            self._thread.start()
+    
+    def submit(self, features: np.ndarray, primary_prediction: float, primary_version: Any = None) -> bool:
+        """Queue one scored row for the shadow model; returns False if it was dropped"""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((np.asarray(features).reshape(1, -1), float(primary_prediction), primary_version))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+    
+    def _collect(self) -> List[Tuple[np.ndarray, float, Any]]:
+        """Block for one row, then take whatever else is already queued, up to a batch"""
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                features = np.vstack([row for row, _, _ in batch])
+                shadow = np.asarray(self.predict_fn(features), dtype=np.float64)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Shadow scoring failed for {len(batch)} rows: {str(e)}")
+                continue
+            
+            primary = np.array([prediction for _, prediction, _ in batch], dtype=np.float64)
+            versions = [version for _, _, version in batch]
+            with self._lock:
+                self.batches += 1
+                self.score_seconds += time.perf_counter() - started
+                # Rows scored against a replaced primary model start the statistics over
+                for version in dict.fromkeys(versions):
+                    rows = np.array([v == version for v in versions])
+                    if version != self.primary_version:
+                        if self.stats.count:
+                            logger.info(f"Primary model changed to {version} - restarting shadow statistics")
+                        self.primary_version = version
+                        self.stats = DeltaStats(self.recent)
+                        self.started_at = time.time()
+                    self.stats.update(primary[rows], shadow[rows])
+    
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'shadow_version': self.shadow_version,
+                'primary_version': self.primary_version,
+                'since': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(self.started_at)),
+                'deltas': self.stats.summary(),
+                'queue': self.get_stats()
+            }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': True,
+            'queue_depth': self._queue.qsize(),
+            'queue_size': self._queue.maxsize,
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'errors': self.errors,
+            'mean_batch_ms': round(self.score_seconds / self.batches * 1000, 3) if self.batches else 0.0
+        }
@@ -0,0 +1,85 @@
+import logging
+import pandas as pd
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Segment fields, in the order preprocessor.segment_of() returns them
+SEGMENT_FIELDS = ('job_category', 'experience_level', 'country_group', 'company_size')
+
+class SimilarJobsIndex:
+    """Posting counts per segment of the analytics dataset, for the similarJobs figure
+    
+    Segments use the preprocessor's categorical buckets, so "similar" means the
+    same thing for the count as it does for the model. Counts are kept for every
+    prefix of SEGMENT_FIELDS; a lookup starts at the finest segment and drops the
+    last field until it reaches a non-empty cell, costing at most one dict probe
+    per level.
+    """
+    
+    def __init__(self, counts: List[Dict[Tuple, int]], preprocessor):
+        self.counts = counts
+        self.preprocessor = preprocessor
+        self.total = counts[0].get((), 0)
+        
+        # Lookup counters
+        self.lookups = 0
+        self.fallbacks = 0
+    
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, preprocessor) -> 'SimilarJobsIndex':
+        """
+        Count postings from a cleaned analytics DataFrame
+        
+        Expects the AnalyticsProcessor columns job_title, experience_level,
+        company_location and company_size, with levels and sizes already
+        standardized ('Senior Level', 'Large', ...).
+        """
+        segments = pd.Series(list(zip(df['job_title'], df['experience_level'],
+                                      df['company_location'], df['company_size'])))
+        # Bucket each distinct combination once instead of every row
+        buckets = {
+            combination: preprocessor.segment_of({
+                'jobTitle': combination[0],
+                'experienceLevel': combination[1],
+                'companyLocation': combination[2],
+                'companySize': combination[3]
+            })
+            for combination in segments.unique()
+        }
+        finest = segments.map(buckets).value_counts()
+        
+        counts = [dict() for _ in range(len(SEGMENT_FIELDS) + 1)]
+        for segment, count in finest.items():
+            for depth in range(len(SEGMENT_FIELDS) + 1):
+                key = segment[:depth]
+                counts[depth][key] = counts[depth].get(key, 0) + int(count)
+        
+        index = cls(counts, preprocessor)
+        logger.info(f"Similar jobs index built: {index.total} postings in {len(counts[-1])} segments")
+        return index
+    
+    def lookup(self, input_data: Dict[str, Any]) -> Tuple[int, Tuple[str, ...]]:
+        """
+        Count of postings in the finest non-empty segment of a validated input
+        
+        Returns:
+            (count, fields): the count and the segment fields it was matched on
+            (empty when only the dataset total applies)
+        """
+        segment = self.preprocessor.segment_of(input_data)
+        for depth in range(len(SEGMENT_FIELDS), -1, -1):
+            count = self.counts[depth].get(segment[:depth], 0)
+            if count > 0 or depth == 0:
+                self.lookups += 1
+                if depth < len(SEGMENT_FIELDS):
+                    self.fallbacks += 1
+                return count, SEGMENT_FIELDS[:depth]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'postings': self.total,
+            'segments': len(self.counts[-1]),
+            'lookups': self.lookups,
+            'fallbacks': self.fallbacks
+        }
@@ -1,5 +1,6 @@
 import logging
-from typing import Dict, Any, List
+import math
+from typing import Dict, Any, List, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -33,12 +34,16 @@ def validate_prediction_input(input_data: Dict[str, Any]) -> None:
             raise PredictionValidationError(f"Field '{field}' cannot be empty")
     
     # Validate and normalize specific fields
+    _validate_job_title(input_data.get('jobTitle'))
     input_data['experienceLevel'] = _validate_and_normalize_experience_level(input_data.get('experienceLevel'))
     input_data['companySize'] = _validate_and_normalize_company_size(input_data.get('companySize'))
     input_data['companyLocation'] = _validate_and_normalize_location(input_data.get('companyLocation'))
     
     _validate_years_experience(input_data.get('yearsExperience'))
     _validate_remote_ratio(input_data.get('remoteRatio'))
+    if 'remoteRatio' in input_data and input_data['remoteRatio'] is None:
+        # Null means on-site, as the preprocessor encodes it
+        input_data['remoteRatio'] = 0
     _validate_skills(input_data.get('requiredSkills', []))
     _validate_benefits(input_data.get('benefits', []))
     _validate_job_description(input_data.get('jobDescription', ''))
@@ -233,9 +238,14 @@ def _validate_and_normalize_location(location: Any) -> str:
     logger.info(f"Unknown location '{location}', using 'Other'")
     return 'Other'
 
+def _validate_job_title(title: Any) -> None:
+    """Validate job title"""
+    if not isinstance(title, str):
+        raise PredictionValidationError("Job title must be a string")
+
 def _validate_years_experience(years: Any) -> None:
     """Validate years of experience"""
-    if not isinstance(years, (int, float)):
+    if not isinstance(years, (int, float)) or not math.isfinite(years):
         raise PredictionValidationError("Years of experience must be a number")
     
     if years < 0:
@@ -248,7 +258,7 @@ def _validate_remote_ratio(ratio: Any) -> None:
     """Validate remote work ratio"""
     # Remote ratio is optional
     if ratio is not None:
-        if not isinstance(ratio, (int, float)):
+        if not isinstance(ratio, (int, float)) or not math.isfinite(ratio):
             raise PredictionValidationError("Remote ratio must be a number")
         
         if ratio < 0 or ratio > 100:
@@ -299,4 +309,65 @@ def _validate_job_description(description: Any) -> None:
             raise PredictionValidationError("Job description must be a string")
         
         if len(description) > 10000:
-            raise PredictionValidationError("Job description cannot exceed 10,000 characters")
\ No newline at end of file
+            raise PredictionValidationError("Job description cannot exceed 10,000 characters")
+
+def validate_sweep_dimensions(sweep: Any, options: Dict[str, List[Any]],
+                              max_dimensions: int = 2, max_points: int = 1000) -> List[Tuple[str, List[Any]]]:
+    """
+    Validate and normalize the dimensions of a what-if sweep
+    
+    Args:
+        sweep: A field name, or a list of field names and {"field", "values"} objects
+        options: Sweepable fields mapped to their default values
+    
+    Returns:
+        List of (field, values) pairs with values normalized like prediction inputs
+    
+    Raises:
+        PredictionValidationError: If validation fails
+    """
+    if isinstance(sweep, (str, dict)):
+        sweep = [sweep]
+    if not isinstance(sweep, list) or len(sweep) == 0:
+        raise PredictionValidationError("Sweep must name at least one field")
+    if len(sweep) > max_dimensions:
+        raise PredictionValidationError(f"A sweep may vary at most {max_dimensions} fields")
+    
+    normalizers = {
+        'experienceLevel': _validate_and_normalize_experience_level,
+        'companySize': _validate_and_normalize_company_size,
+        'companyLocation': _validate_and_normalize_location
+    }
+    
+    dimensions = []
+    for dimension in sweep:
+        field = dimension.get('field') if isinstance(dimension, dict) else dimension
+        if not isinstance(field, str):
+            raise PredictionValidationError("Sweep fields must be given as strings")
+        if field not in options:
+            raise PredictionValidationError(
+                f"Cannot sweep '{field}'. Valid fields: {', '.join(options)}"
+            )
+        if any(field == existing for existing, _ in dimensions):
+            raise PredictionValidationError(f"Field '{field}' is swept more than once")
+        
+        values = dimension.get('values') if isinstance(dimension, dict) else None
+        if values is None:
+            values = list(options[field])
+        if not isinstance(values, list) or len(values) == 0:
+            raise PredictionValidationError(f"Sweep values for '{field}' must be a non-empty list")
+        
+        if field == 'yearsExperience':
+            for years in values:
+                _validate_years_experience(years)
+        else:
+            values = [normalizers[field](value) for value in values]
+        dimensions.append((field, values))
+    
+    points = 1
+    for _, values in dimensions:
+        points *= len(values)
+    if points > max_points:
+        raise PredictionValidationError(f"A sweep may contain at most {max_points} grid points")
+    
+    return dimensions